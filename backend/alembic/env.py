@@ -1,9 +1,11 @@
+import io
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
+from alembic.runtime.migration import MigrationContext
 
 # Import all models for Alembic to detect
 import sys
@@ -11,8 +13,14 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.models.user import User  # Import all models here
+from app.models.token import RefreshToken, TokenRevocation
+from app.models.media import Media
+from app.models.interaction import Interaction
+from app.models.upload import UploadSession
+from app.models.transcode import TranscodeJob
 from app.db.session import Base
 from app.core.config import settings
+from app.db.migrations import MigrationPlan, set_timeouts
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -74,14 +82,57 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        if context.get_x_argument(as_dictionary=True).get("dry_run", "").lower() == "true":
+            run_migrations_dry_run(connection)
+            return
+
+        # Fail fast rather than queue every query behind a migration's lock
+        set_timeouts(connection)
+        # Lets create_index_concurrently and backfill commit mid-migration
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            transaction_per_migration=True,
         )
 
         with context.begin_transaction():
             context.run_migrations()
 
 
+def run_migrations_dry_run(connection) -> None:
+    """Render the pending migrations as SQL and print their estimated cost.
+
+    ``alembic -x dry_run=true upgrade head``; nothing is executed, the
+    connection is only read for the current revision and table statistics.
+
+    """
+    current = MigrationContext.configure(connection).get_current_heads()
+    if len(current) > 1:
+        raise RuntimeError(f"The dry run needs a single current revision, found {current}")
+    buffer = io.StringIO()
+    plan = MigrationPlan(connection)
+
+    def on_version_apply(ctx, step, heads, run_args):
+        plan.add_script(step.up_revision_id, buffer.getvalue())
+        buffer.seek(0)
+        buffer.truncate()
+
+    context.configure(
+        url=connection.engine.url,
+        target_metadata=target_metadata,
+        as_sql=True,
+        literal_binds=True,
+        output_buffer=buffer,
+        starting_rev=current[0] if current else None,
+        transaction_per_migration=True,
+        on_version_apply=on_version_apply,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+    connection.rollback()
+    print(plan.report())
+
+
 if context.is_offline_mode():
     run_migrations_offline()
 else:
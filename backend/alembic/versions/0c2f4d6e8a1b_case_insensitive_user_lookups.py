@@ -0,0 +1,53 @@
+"""Case-insensitive email and username uniqueness
+
+Revision ID: 0c2f4d6e8a1b
+Revises: 5a1c7e93d2b4
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migrations import backfill, create_index_concurrently, drop_index_concurrently, is_offline
+
+
+# revision identifiers, used by Alembic.
+revision = '0c2f4d6e8a1b'
+down_revision = '5a1c7e93d2b4'
+branch_labels = None
+depends_on = None
+
+
+def _case_duplicates(conn, column):
+    return conn.execute(sa.text(
+        f"SELECT lower({column}) AS key, count(*) FROM users "
+        f"GROUP BY lower({column}) HAVING count(*) > 1 ORDER BY 1 LIMIT 20"
+    )).fetchall()
+
+
+def upgrade():
+    # The unique indexes below cannot be built while accounts differ only by
+    # case; those need a manual merge or rename first
+    if not is_offline():
+        conn = op.get_bind()
+        for column in ('email', 'username'):
+            duplicates = _case_duplicates(conn, column)
+            if duplicates:
+                listing = ', '.join(f"{key} ({count})" for key, count in duplicates)
+                raise RuntimeError(f"users.{column} has case-insensitive duplicates: {listing}")
+
+    # Backfill: new accounts store emails lower-cased, bring old rows in line
+    backfill('users', 'email = lower(email)', 'email <> lower(email)')
+
+    create_index_concurrently('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=True)
+    create_index_concurrently('ix_users_username_lower', 'users', [sa.text('lower(username)')], unique=True)
+    # Superseded: lower() uniqueness implies exact uniqueness
+    drop_index_concurrently('ix_users_email', table_name='users')
+    drop_index_concurrently('ix_users_username', table_name='users')
+
+
+def downgrade():
+    create_index_concurrently('ix_users_username', 'users', ['username'], unique=True)
+    create_index_concurrently('ix_users_email', 'users', ['email'], unique=True)
+    drop_index_concurrently('ix_users_username_lower', table_name='users')
+    drop_index_concurrently('ix_users_email_lower', table_name='users')
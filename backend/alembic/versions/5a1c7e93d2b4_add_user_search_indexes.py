@@ -0,0 +1,42 @@
+"""Add user search indexes
+
+Revision ID: 5a1c7e93d2b4
+Revises: b633c094e1af
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = '5a1c7e93d2b4'
+down_revision = 'b633c094e1af'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Trigram similarity (%, similarity()) and ILIKE '%x%' on usernames and names
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    create_index_concurrently(
+        'ix_users_username_trgm', 'users', [sa.text('lower(username) gin_trgm_ops')],
+        postgresql_using='gin',
+    )
+    create_index_concurrently(
+        'ix_users_full_name_trgm', 'users', [sa.text('lower(full_name) gin_trgm_ops')],
+        postgresql_using='gin',
+    )
+    # LIKE 'prefix%' for autocomplete, independent of the database collation
+    create_index_concurrently(
+        'ix_users_username_prefix', 'users', [sa.text('lower(username) text_pattern_ops')]
+    )
+
+
+def downgrade():
+    drop_index_concurrently('ix_users_username_prefix', 'users')
+    drop_index_concurrently('ix_users_full_name_trgm', 'users')
+    drop_index_concurrently('ix_users_username_trgm', 'users')
+    # The pg_trgm extension is left installed; other objects may use it
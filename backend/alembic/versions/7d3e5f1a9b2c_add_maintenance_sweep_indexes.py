@@ -0,0 +1,42 @@
+"""Add indexes for the maintenance sweeps
+
+Revision ID: 7d3e5f1a9b2c
+Revises: 0c2f4d6e8a1b
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3e5f1a9b2c'
+down_revision = '0c2f4d6e8a1b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Partial: only rows the sweeps can still act on are indexed
+    create_index_concurrently(
+        'ix_users_reset_token_expires_at', 'users', ['reset_token_expires_at'],
+        postgresql_where=sa.text('reset_token IS NOT NULL'),
+    )
+    create_index_concurrently(
+        'ix_users_verification_token_expires_at', 'users', ['verification_token_expires_at'],
+        postgresql_where=sa.text('verification_token IS NOT NULL'),
+    )
+    create_index_concurrently(
+        'ix_users_unverified_created_at', 'users', ['created_at'],
+        postgresql_where=sa.text('email_verified IS false'),
+    )
+    create_index_concurrently(op.f('ix_refresh_tokens_expires_at'), 'refresh_tokens', ['expires_at'])
+
+
+def downgrade():
+    drop_index_concurrently(op.f('ix_refresh_tokens_expires_at'), table_name='refresh_tokens')
+    drop_index_concurrently('ix_users_unverified_created_at', table_name='users')
+    drop_index_concurrently('ix_users_verification_token_expires_at', table_name='users')
+    drop_index_concurrently('ix_users_reset_token_expires_at', table_name='users')
@@ -0,0 +1,110 @@
+"""Add media and interactions, partitioned by month on Postgres
+
+Revision ID: 9b4e2c7a1f3d
+Revises: 7d3e5f1a9b2c
+Create Date: 2026-10-19
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.db.migrations import is_postgres
+from app.db.partitions import add_months, create_partition_sql, month_start
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4e2c7a1f3d'
+down_revision = '7d3e5f1a9b2c'
+branch_labels = None
+depends_on = None
+
+
+def _id_column(table):
+    if is_postgres():
+        # Identity columns are not supported on partitioned tables before
+        # Postgres 17; a sequence default is copied to every partition
+        return sa.Column('id', sa.BigInteger(), server_default=sa.text(f"nextval('{table}_id_seq')"),
+                         nullable=False)
+    return sa.Column('id', sa.Integer(), nullable=False)
+
+
+def _create_partitioned_table(table, *columns):
+    postgres = is_postgres()
+    if postgres:
+        op.execute(f"CREATE SEQUENCE {table}_id_seq")
+    op.create_table(
+        table,
+        _id_column(table),
+        *columns,
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        # The partition key must be part of the primary key
+        sa.PrimaryKeyConstraint('id', 'created_at') if postgres else sa.PrimaryKeyConstraint('id'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    if postgres:
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+
+def upgrade():
+    _create_partitioned_table(
+        'media',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('file_path', sa.String(), nullable=False),
+        sa.Column('thumbnail_path', sa.String(), nullable=True),
+        sa.Column('media_type', sa.String(length=16), nullable=False),
+        sa.Column('metadata', sa.JSON(), nullable=True),
+        sa.Column('is_private', sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    )
+    # Indexes on the parent are created on every partition
+    op.create_index(
+        'ix_media_user_id_created_at', 'media',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+    )
+    op.create_index(
+        'ix_media_public_created_at', 'media', [sa.text('created_at DESC'), sa.text('id DESC')],
+        postgresql_where=sa.text('is_private IS false'), sqlite_where=sa.text('is_private = 0'),
+    )
+
+    _create_partitioned_table(
+        'interactions',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('media_id', sa.BigInteger(), nullable=False),
+        sa.Column('interaction_type', sa.String(length=16), nullable=False),
+        sa.Column('content', sa.String(), nullable=True),
+        sa.Column('parent_id', sa.BigInteger(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    )
+    op.create_index(
+        'ix_interactions_media_id_created_at', 'interactions', ['media_id', sa.text('created_at DESC')]
+    )
+    op.create_index(
+        'ix_interactions_user_id_created_at', 'interactions', ['user_id', sa.text('created_at DESC')]
+    )
+    op.create_index(
+        'ix_interactions_parent_id', 'interactions', ['parent_id'],
+        postgresql_where=sa.text('parent_id IS NOT NULL'), sqlite_where=sa.text('parent_id IS NOT NULL'),
+    )
+
+    if is_postgres():
+        # The maintenance worker keeps creating partitions from here on
+        current = month_start(datetime.now(timezone.utc))
+        for table in ('media', 'interactions'):
+            for offset in range(settings.PARTITION_MONTHS_AHEAD + 1):
+                for statement in create_partition_sql(table, add_months(current, offset)):
+                    op.execute(statement)
+
+
+def downgrade():
+    # Drops the attached partitions too; archived ones are left alone
+    op.drop_table('interactions')
+    op.drop_table('media')
+    if is_postgres():
+        op.execute("DROP SEQUENCE IF EXISTS interactions_id_seq")
+        op.execute("DROP SEQUENCE IF EXISTS media_id_seq")
@@ -0,0 +1,53 @@
+"""Add upload_sessions for resumable uploads
+
+Revision ID: a4d8c2e6f0b3
+Revises: 9b4e2c7a1f3d
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d8c2e6f0b3'
+down_revision = '9b4e2c7a1f3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'upload_sessions',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('object_key', sa.String(), nullable=False),
+        sa.Column('storage_upload_id', sa.String(), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('content_type', sa.String(length=100), nullable=False),
+        sa.Column('media_type', sa.String(length=16), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('is_private', sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.Column('length', sa.BigInteger(), nullable=False),
+        sa.Column('upload_offset', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('parts', sa.JSON(), nullable=False),
+        sa.Column('tail_key', sa.String(), nullable=True),
+        sa.Column('tail_size', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('status', sa.String(length=16), server_default='active', nullable=False),
+        sa.Column('media_id', sa.BigInteger(), nullable=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_upload_sessions_user_id'), 'upload_sessions', ['user_id'], unique=False)
+    op.create_index(op.f('ix_upload_sessions_expires_at'), 'upload_sessions', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_upload_sessions_expires_at'), table_name='upload_sessions')
+    op.drop_index(op.f('ix_upload_sessions_user_id'), table_name='upload_sessions')
+    op.drop_table('upload_sessions')
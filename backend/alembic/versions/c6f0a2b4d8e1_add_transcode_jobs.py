@@ -0,0 +1,59 @@
+"""Add transcode_jobs, the video transcoding queue
+
+Revision ID: c6f0a2b4d8e1
+Revises: a4d8c2e6f0b3
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6f0a2b4d8e1'
+down_revision = 'a4d8c2e6f0b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'transcode_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('media_id', sa.BigInteger(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=16), server_default='queued', nullable=False),
+        sa.Column('priority', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('progress', sa.Float(), server_default='0', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('cancel_requested', sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('worker_id', sa.String(length=64), nullable=True),
+        sa.Column('run_after', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('media_id'),
+    )
+    op.create_index(op.f('ix_transcode_jobs_id'), 'transcode_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_transcode_jobs_user_id'), 'transcode_jobs', ['user_id'], unique=False)
+    op.create_index(
+        'ix_transcode_jobs_queue', 'transcode_jobs', ['priority', 'id'],
+        postgresql_where=sa.text("status = 'queued'"), sqlite_where=sa.text("status = 'queued'"),
+    )
+    op.create_index(
+        'ix_transcode_jobs_running_heartbeat', 'transcode_jobs', ['heartbeat_at'],
+        postgresql_where=sa.text("status = 'running'"), sqlite_where=sa.text("status = 'running'"),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_transcode_jobs_running_heartbeat', table_name='transcode_jobs')
+    op.drop_index('ix_transcode_jobs_queue', table_name='transcode_jobs')
+    op.drop_index(op.f('ix_transcode_jobs_user_id'), table_name='transcode_jobs')
+    op.drop_index(op.f('ix_transcode_jobs_id'), table_name='transcode_jobs')
+    op.drop_table('transcode_jobs')
@@ -0,0 +1,29 @@
+"""Add upload_sessions.locked_until, the lease held while appending
+
+Revision ID: e2a7c9d1b5f4
+Revises: c6f0a2b4d8e1
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migrations import with_lock_retries
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c9d1b5f4'
+down_revision = 'c6f0a2b4d8e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable without a default: a catalog-only change
+    with_lock_retries(lambda: op.add_column(
+        'upload_sessions', sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True)
+    ))
+
+
+def downgrade():
+    op.drop_column('upload_sessions', 'locked_until')
@@ -0,0 +1,57 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.api.v1.deps import get_current_active_superuser
+from app.core.config import settings
+from app.core.sampler import StackSampler, profile_lock
+
+router = APIRouter()
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    mode: str = Query("auto", pattern="^(auto|signal|thread)$"),
+    current_user = Depends(get_current_active_superuser)
+):
+    """
+    Sample the stacks of this worker for `seconds` and return them in
+    collapsed-stack format (feed to flamegraph.pl or speedscope)
+    """
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiling is disabled"
+        )
+    if seconds > settings.PROFILING_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds must be at most {settings.PROFILING_MAX_SECONDS}"
+        )
+    if mode == "signal" and not StackSampler.can_use_signal():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Signal sampling needs the event loop in the main thread"
+        )
+    if not profile_lock.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running on this worker"
+        )
+    try:
+        sampler = StackSampler(interval=interval_ms / 1000, mode=mode)
+        with sampler:
+            await asyncio.sleep(seconds)
+    finally:
+        profile_lock.release()
+
+    return PlainTextResponse(
+        sampler.collapsed(),
+        headers={
+            "X-Profile-Samples": str(sampler.sample_count),
+            "X-Profile-Mode": sampler.mode,
+        },
+    )
@@ -1,7 +1,11 @@
 from fastapi import APIRouter
 
-from app.api.v1 import auth, users
+from app.api.v1 import admin, auth, images, media, uploads, users
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
+api_router.include_router(media.router, prefix="/media", tags=["media"])
+api_router.include_router(uploads.router, prefix="/media/uploads", tags=["media"])
+api_router.include_router(images.router, prefix="/images", tags=["images"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
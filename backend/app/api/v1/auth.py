@@ -1,21 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
+from jose.exceptions import JWTError
 from typing import Optional
 
 from app import crud
 from app.core import security, email
 from app.core.config import settings
+from app.core.rate_limit import RateLimit
 from app.db.session import get_db
-from app.api.v1.deps import get_current_user
+from app.api.v1.deps import get_current_user, optional_oauth2_scheme
 from app.schemas import token, user
-from app.schemas.user import User
 
 router = APIRouter()
 
 
-@router.post("/login", response_model=token.Token)
+@router.post(
+    "/login",
+    response_model=token.Token,
+    dependencies=[Depends(RateLimit("login", settings.RATE_LIMIT_LOGIN))],
+)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
@@ -32,14 +38,89 @@ async def login_for_access_token(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return _issue_tokens(db, user_obj.id)
+
+
+def _issue_tokens(db: Session, user_id: int, refresh_token: Optional[str] = None) -> dict:
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        data={"sub": str(user_obj.id)}, expires_delta=access_token_expires
+        data={"sub": str(user_id)}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    if refresh_token is None:
+        refresh_token, _ = crud.token.create_refresh_token(db, user_id=user_id)
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int(access_token_expires.total_seconds()),
+    }
 
 
-@router.post("/register", response_model=dict)
+@router.post(
+    "/refresh",
+    response_model=token.Token,
+    dependencies=[Depends(RateLimit("refresh", settings.RATE_LIMIT_REFRESH))],
+)
+async def refresh_access_token(
+    refresh_in: token.RefreshRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Exchange a refresh token for a new access token and refresh token.
+    Each refresh token can be used once.
+    """
+    rotated = crud.token.rotate_refresh_token(db, token=refresh_in.refresh_token)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    refresh_token, db_token = rotated
+    user_obj = crud.user.get_user_by_id(db, user_id=db_token.user_id)
+    if user_obj is None or not user_obj.is_active:
+        crud.token.revoke_refresh_family(db, db_token.family_id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _issue_tokens(db, user_obj.id, refresh_token=refresh_token)
+
+
+@router.post("/logout", response_model=dict)
+async def logout(
+    refresh_in: token.RefreshRequest,
+    db: Session = Depends(get_db),
+    access_token: Optional[str] = Depends(optional_oauth2_scheme)
+):
+    """
+    Revoke a refresh token (and every token rotated from it) and, if sent,
+    the current access token
+    """
+    db_token = crud.token.get_refresh_token(db, token=refresh_in.refresh_token)
+    if db_token is not None:
+        crud.token.revoke_refresh_family(db, db_token.family_id)
+    if access_token:
+        try:
+            payload = security.decode_access_token(access_token)
+        except JWTError:
+            payload = None
+        if payload and payload.get("jti"):
+            crud.token.revoke_access_token(
+                db,
+                jti=payload["jti"],
+                expires_at=datetime.fromtimestamp(payload["exp"], timezone.utc),
+            )
+    return {"message": "Logged out"}
+
+
+@router.post(
+    "/register",
+    response_model=user.UserRegistered,
+    response_model_exclude_unset=True,
+    dependencies=[Depends(RateLimit("register", settings.RATE_LIMIT_REGISTER))],
+)
 async def register_user(
     user_in: user.UserCreate,
     background_tasks: BackgroundTasks,
@@ -64,8 +145,16 @@ async def register_user(
             detail="Username already taken",
         )
     
-    # Create new user
-    new_user = crud.user.create_user(db=db, user_in=user_in)
+    # Create new user; the unique lower() indexes catch a concurrent
+    # registration that passed the checks above
+    try:
+        new_user = crud.user.create_user(db=db, user_in=user_in)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email or username already registered",
+        )
     
     # Generate verification token
     verification_data = crud.user.generate_email_verification_token(db, user_id=new_user.id)
@@ -79,19 +168,23 @@ async def register_user(
             token=verification_data["verification_token"]
         )
     
-    response = {
-        "user": User.model_validate( new_user),
-        "message": "User registered successfully. Please verify your email."
-    }
+    response = user.UserRegistered(
+        user=new_user,
+        message="User registered successfully. Please verify your email."
+    )
     
     # For development environment, include the token in response
     if settings.PROJECT_NAME == "SnapWave" and verification_data:  # Check if dev environment
-        response["debug_token"] = verification_data["verification_token"]
+        response.debug_token = verification_data["verification_token"]
     
     return response
 
 
-@router.post("/password-reset/request", response_model=dict)
+@router.post(
+    "/password-reset/request",
+    response_model=dict,
+    dependencies=[Depends(RateLimit("password_reset", settings.RATE_LIMIT_PASSWORD_RESET))],
+)
 async def request_password_reset(
     reset_request: user.PasswordResetRequest,
     background_tasks: BackgroundTasks,
@@ -106,13 +199,11 @@ async def request_password_reset(
     
     reset_data = crud.user.generate_password_reset_token(db, email=reset_request.email)
     if reset_data:
-        user_obj = crud.user.get_user_by_email(db, email=reset_request.email)
-        
         # Send email with reset token in background
         background_tasks.add_task(
             email.send_password_reset_email,
             email_to=reset_data["email"],
-            username=user_obj.username,
+            username=reset_data["username"],
             token=reset_data["reset_token"]
         )
         
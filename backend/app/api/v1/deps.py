@@ -1,15 +1,19 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jose.exceptions import JWTError
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from app import crud
 from app.core.config import settings
+from app.core.security import decode_access_token
 from app.db.session import get_db
 from app.schemas import token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False
+)
 
 
 async def get_current_user(
@@ -22,9 +26,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(
-            token_data, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_access_token(token_data)
         user_id: Optional[str] = payload.get("sub")
         if user_id is None:
             raise credentials_exception
@@ -32,6 +34,11 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
+    # Checked against the in-memory revocation list; deactivated users and
+    # logged-out tokens are rejected without loading the user row
+    if crud.token.is_access_token_revoked(db, payload):
+        raise credentials_exception
+    
     user = crud.user.get_user_by_id(db, user_id=token_data.sub)
     if user is None:
         raise credentials_exception
@@ -0,0 +1,68 @@
+"""
+Resized images behind signed URLs (see app/core/images.py):
+
+    GET /images/{key}?w=&h=&fmt=&q=&exp=&sig=
+
+There is no authentication: the signature is the authorization, and the
+URLs are handed out with the media that may be seen. Responses are
+immutable for as long as the URL is valid, so a CDN in front serves
+repeats without reaching the API.
+"""
+import hashlib
+import time
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+
+from app.core import images
+from app.core.http_cache import is_not_modified
+from app.core.storage import NoSuchKey
+
+router = APIRouter()
+
+
+@router.get("/{key:path}")
+async def read_image(
+    key: str,
+    request: Request,
+    w: int = Query(..., ge=1),
+    h: int = Query(0, ge=0),
+    fmt: str = Query(...),
+    q: int = Query(...),
+    exp: int = Query(...),
+    sig: str = Query(..., max_length=64),
+):
+    """
+    A derivative of a stored image, rendered on first request
+    """
+    if not images.is_allowed(w, h, fmt, q):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported image variant"
+        )
+    if not images.verify(key, w, h, fmt, q, exp, sig):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid signature"
+        )
+
+    name = images.derivative_key(key, w, h, fmt, q)
+    headers = {
+        "ETag": '"' + hashlib.sha256(name.encode()).hexdigest()[:32] + '"',
+        "Cache-Control": f"public, max-age={max(0, exp - int(time.time()))}, immutable",
+    }
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        data = await images.get_image_pipeline().get(key, w, h, fmt, q)
+    except NoSuchKey:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found"
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Unsupported image"
+        )
+    return Response(data, media_type=images.CONTENT_TYPES[fmt], headers=headers)
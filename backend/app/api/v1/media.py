@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app import crud
+from app.api.v1.deps import get_current_active_user
+from app.core.config import settings
+from app.core.responses import ModelResponse
+from app.db.session import get_db
+from app.models.transcode import TranscodeJob
+from app.schemas import media, transcode
+from app.models.user import User
+
+router = APIRouter()
+
+
+def media_page(fetch, cursor: Optional[str], limit: int) -> ModelResponse:
+    """Run a recent-first listing and wrap it in a ``MediaPage`` response."""
+    try:
+        items, next_cursor = fetch(cursor=cursor, limit=min(limit, settings.FEED_MAX_PAGE_SIZE))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return ModelResponse({"items": items, "next_cursor": next_cursor}, media.MediaPage)
+
+
+@router.get("/feed", response_model=media.MediaPage)
+async def read_feed(
+    cursor: Optional[str] = Query(None, max_length=64),
+    limit: int = Query(settings.FEED_PAGE_SIZE, ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Public media, newest first
+    """
+    return media_page(lambda **page: crud.media.get_feed(db, **page), cursor, limit)
+
+
+async def get_user_transcode(
+    media_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> TranscodeJob:
+    job = crud.transcode.get_transcode_job(db, media_id=media_id, user_id=current_user.id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Transcode not found"
+        )
+    return job
+
+
+@router.get("/{media_id}/transcode", response_model=transcode.TranscodeJob)
+async def read_transcode(job: TranscodeJob = Depends(get_user_transcode)):
+    """
+    Status and progress of a video's transcode
+    """
+    return ModelResponse(job, transcode.TranscodeJob, headers={"Cache-Control": "no-store"})
+
+
+@router.post("/{media_id}/transcode", response_model=transcode.TranscodeJob)
+async def retry_transcode(
+    db: Session = Depends(get_db),
+    job: TranscodeJob = Depends(get_user_transcode)
+):
+    """
+    Queue a failed or cancelled transcode again
+    """
+    job = crud.transcode.retry_transcode(db, job)
+    return ModelResponse(job, transcode.TranscodeJob)
+
+
+@router.delete("/{media_id}/transcode", response_model=transcode.TranscodeJob)
+async def cancel_transcode(
+    db: Session = Depends(get_db),
+    job: TranscodeJob = Depends(get_user_transcode)
+):
+    """
+    Cancel a queued or running transcode
+    """
+    job = crud.transcode.cancel_transcode(db, job)
+    return ModelResponse(job, transcode.TranscodeJob)
@@ -0,0 +1,187 @@
+"""
+Resumable media uploads, modelled on the tus protocol (https://tus.io):
+
+    POST   /media/uploads                 create a session (JSON body)
+    HEAD   /media/uploads/{id}            Upload-Offset: bytes received so far
+    PATCH  /media/uploads/{id}            append the body at Upload-Offset
+    POST   /media/uploads/{id}/complete   create the media record
+    DELETE /media/uploads/{id}            abandon the session
+
+A PATCH whose connection drops keeps the bytes that arrived, so a client
+on a flaky network asks HEAD for the offset and continues from there.
+Storage calls run in the thread pool; see app/crud/upload.py.
+"""
+from datetime import timezone
+from email.utils import format_datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from typing import Optional
+
+from app import crud
+from app.api.v1.deps import get_current_active_user
+from app.core.config import settings
+from app.core.responses import ModelResponse
+from app.crud.upload import UploadConflict, UploadIncomplete
+from app.db.session import get_db
+from app.models.upload import UploadSession
+from app.schemas import media, upload
+from app.models.user import User
+
+router = APIRouter()
+
+TUS_VERSION = "1.0.0"
+CHUNK_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+def upload_headers(session: UploadSession) -> dict:
+    expires_at = session.expires_at
+    if expires_at.tzinfo is None:
+        # SQLite hands back naive datetimes
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return {
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(session.upload_offset),
+        "Upload-Length": str(session.length),
+        "Upload-Expires": format_datetime(expires_at, usegmt=True),
+        "Cache-Control": "no-store",
+    }
+
+
+def conflict(detail: str, session: Optional[UploadSession] = None) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=detail,
+        headers=upload_headers(session) if session is not None else None
+    )
+
+
+async def get_user_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> UploadSession:
+    session = crud.upload.get_upload(db, upload_id=upload_id, user_id=current_user.id)
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    return session
+
+
+@router.post("", response_model=upload.Upload, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    upload_in: upload.UploadCreate,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Start a resumable upload
+    """
+    if upload_in.content_type not in settings.UPLOAD_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Unsupported content type"
+        )
+    if upload_in.length > settings.UPLOAD_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Upload too large"
+        )
+    session = await run_in_threadpool(crud.upload.create_upload, db, current_user.id, upload_in)
+    headers = upload_headers(session)
+    headers["Location"] = str(request.url_for("read_upload_offset", upload_id=session.id))
+    return ModelResponse(session, upload.Upload, status_code=status.HTTP_201_CREATED, headers=headers)
+
+
+@router.head("/{upload_id}")
+async def read_upload_offset(session: UploadSession = Depends(get_user_upload)):
+    """
+    Bytes received so far, in Upload-Offset
+    """
+    return Response(status_code=status.HTTP_200_OK, headers=upload_headers(session))
+
+
+@router.get("/{upload_id}", response_model=upload.Upload)
+async def read_upload(session: UploadSession = Depends(get_user_upload)):
+    """
+    Get an upload session
+    """
+    return ModelResponse(session, upload.Upload, headers=upload_headers(session))
+
+
+@router.patch("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def append_upload(
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    content_type: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    session: UploadSession = Depends(get_user_upload)
+):
+    """
+    Append the request body at Upload-Offset
+    """
+    if content_type != CHUNK_CONTENT_TYPE:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type must be {CHUNK_CONTENT_TYPE}"
+        )
+    if session.status != "active":
+        raise conflict("Upload already completed", session)
+    if upload_offset != session.upload_offset:
+        raise conflict("Upload-Offset does not match", session)
+
+    limit = min(settings.UPLOAD_MAX_CHUNK_SIZE, session.length - session.upload_offset)
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Chunk larger than {limit} bytes"
+    )
+    if int(request.headers.get("content-length") or 0) > limit:
+        raise too_large
+    chunk = bytearray()
+    try:
+        async for piece in request.stream():
+            chunk += piece
+            if len(chunk) > limit:
+                raise too_large
+    except ClientDisconnect:
+        # Keep what arrived; the client resumes from the new offset
+        pass
+
+    try:
+        session = await run_in_threadpool(crud.upload.append_chunk, db, session, chunk)
+    except UploadConflict:
+        raise conflict("Upload changed by another request")
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=upload_headers(session))
+
+
+@router.post("/{upload_id}/complete", response_model=media.Media)
+async def complete_upload(
+    db: Session = Depends(get_db),
+    session: UploadSession = Depends(get_user_upload)
+):
+    """
+    Finish an upload once every byte was received and create its media
+    """
+    try:
+        item = await run_in_threadpool(crud.upload.finalize_upload, db, session)
+    except UploadIncomplete:
+        raise conflict("Upload incomplete", session)
+    except UploadConflict:
+        raise conflict("Upload changed by another request")
+    return ModelResponse(item, media.Media)
+
+
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_upload(
+    db: Session = Depends(get_db),
+    session: UploadSession = Depends(get_user_upload)
+):
+    """
+    Abandon an upload and delete what was stored
+    """
+    await run_in_threadpool(crud.upload.abort_upload, db, session)
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers={"Tus-Resumable": TUS_VERSION})
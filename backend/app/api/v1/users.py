@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 
 from app import crud
 from app.api.v1.deps import get_current_user, get_current_active_user
+from app.api.v1.media import media_page
+from app.core import avatars
+from app.core.autocomplete import get_handle_cache
+from app.core.config import settings
+from app.core.http_cache import conditional_response, user_etag
+from app.core.responses import ModelResponse
 from app.db.session import get_db
-from app.schemas import user
+from app.schemas import media, user
 from app.models.user import User
 
 router = APIRouter()
@@ -13,12 +20,21 @@ router = APIRouter()
 
 @router.get("/me", response_model=user.User)
 async def read_users_me(
+    request: Request,
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Get current user
     """
-    return current_user
+    return conditional_response(
+        request,
+        current_user,
+        user.User,
+        etag=user_etag(current_user),
+        last_modified=current_user.updated_at or current_user.created_at,
+        cache_control=settings.CACHE_CONTROL_USERS_ME,
+        vary="Authorization",
+    )
 
 
 @router.put("/me", response_model=user.User)
@@ -30,12 +46,116 @@ async def update_user_me(
     """
     Update own user information
     """
-    return crud.user.update_user(db=db, db_user=current_user, user_in=user_in)
+    updated_user = crud.user.update_user(db=db, db_user=current_user, user_in=user_in)
+    return ModelResponse(updated_user, user.User)
+
+
+async def read_image_body(request: Request, max_size: int) -> bytes:
+    """The request body, or 413 as soon as it is known to exceed ``max_size``."""
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Image exceeds {max_size} bytes"
+    )
+    if int(request.headers.get("content-length") or 0) > max_size:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_size:
+            raise too_large
+    return bytes(body)
+
+
+@router.put("/me/avatar", response_model=user.User)
+async def upload_avatar(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Set the profile picture from an image in the request body
+
+    The picture is cropped square and stored in every AVATAR_SIZES and
+    AVATAR_FORMATS rendition; `avatar` in the response has their URLs.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in settings.AVATAR_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported content type {content_type or 'none'}"
+        )
+    data = await read_image_body(request, settings.AVATAR_MAX_UPLOAD_SIZE)
+    try:
+        prefix = await avatars.save_avatar(current_user.id, data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+
+    previous = current_user.profile_picture
+    updated_user = crud.user.update_user(
+        db=db, db_user=current_user, user_in=user.UserUpdate(profile_picture=prefix)
+    )
+    if previous != prefix:
+        await run_in_threadpool(avatars.remove_avatar, current_user.id, previous)
+    return ModelResponse(updated_user, user.User)
+
+
+@router.delete("/me/avatar", response_model=user.User)
+async def delete_avatar(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Remove the profile picture
+    """
+    previous = current_user.profile_picture
+    updated_user = crud.user.update_user(
+        db=db, db_user=current_user, user_in=user.UserUpdate(profile_picture=None)
+    )
+    await run_in_threadpool(avatars.remove_avatar, current_user.id, previous)
+    return ModelResponse(updated_user, user.User)
+
+
+@router.get("/search", response_model=List[user.UserSummary])
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Search users by username or full name
+    """
+    users = crud.user.search_users(db, query=q, limit=min(limit, settings.SEARCH_MAX_LIMIT))
+    return ModelResponse(users, List[user.UserSummary])
+
+
+@router.get("/autocomplete", response_model=List[user.UserSummary])
+async def autocomplete_users(
+    background_tasks: BackgroundTasks,
+    prefix: str = Query(..., min_length=1, max_length=50),
+    limit: int = Query(10, ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Complete a username prefix
+    """
+    if get_handle_cache().start_refresh():
+        # Rebuilding reads up to AUTOCOMPLETE_TRIE_SIZE rows; keep it off the event loop
+        background_tasks.add_task(crud.user.refresh_handle_cache, db)
+    users = crud.user.autocomplete_users(
+        db, prefix=prefix, limit=min(limit, settings.AUTOCOMPLETE_MAX_LIMIT)
+    )
+    return ModelResponse(users, List[user.UserSummary])
 
 
 @router.get("/{user_id}", response_model=user.User)
 async def read_user_by_id(
     user_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -43,9 +163,7 @@ async def read_user_by_id(
     Get a specific user by id
     """
     user_obj = crud.user.get_user_by_id(db, user_id=user_id)
-    if user_obj == current_user:
-        return user_obj
-    if not current_user.is_superuser:
+    if user_obj != current_user and not current_user.is_superuser:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="The user doesn't have enough privileges"
@@ -55,7 +173,39 @@ async def read_user_by_id(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return user_obj
+    return conditional_response(
+        request,
+        user_obj,
+        user.User,
+        etag=user_etag(user_obj),
+        last_modified=user_obj.updated_at or user_obj.created_at,
+        cache_control=settings.CACHE_CONTROL_USERS_DETAIL,
+        vary="Authorization",
+    )
+
+
+@router.get("/{user_id}/media", response_model=media.MediaPage)
+async def read_user_media(
+    user_id: int,
+    cursor: Optional[str] = Query(None, max_length=64),
+    limit: int = Query(settings.FEED_PAGE_SIZE, ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    A user's media, newest first (the profile grid)
+    """
+    if not crud.user.get_user_by_id(db, user_id=user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    include_private = user_id == current_user.id
+    return media_page(
+        lambda **page: crud.media.get_profile_grid(db, user_id, include_private=include_private, **page),
+        cursor,
+        limit,
+    )
 
 
 @router.get("/", response_model=List[user.User])
@@ -74,4 +224,4 @@ async def read_users(
             detail="The user doesn't have enough privileges"
         )
     users = crud.user.get_users(db, skip=skip, limit=limit)
-    return users
+    return ModelResponse(users, List[user.User])
@@ -0,0 +1 @@
+# Command line tools, run as `python -m app.cli.<command>`
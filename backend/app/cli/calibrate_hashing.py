@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Pick password hashing costs for this hardware.
+
+Measures verify latency for bcrypt rounds (and optionally argon2 time cost
+at a fixed memory cost) and reports the strongest setting that stays within
+the target latency, as settings to put in the environment / .env file.
+
+Usage:
+    python -m app.cli.calibrate_hashing --target-ms 250
+    python -m app.cli.calibrate_hashing --target-ms 250 --scheme argon2 --argon2-memory-kib 65536
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from passlib.hash import argon2, bcrypt
+
+SAMPLE_PASSWORD = "calibration-password-123"
+
+
+def median_verify_ms(verify: Callable[[], bool], samples: int) -> float:
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        verify()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms: float, samples: int = 5,
+                     min_rounds: int = 10, max_rounds: int = 16) -> Tuple[int, List[Tuple[int, float]]]:
+    """Return the highest rounds whose verify median is within ``target_ms``."""
+    measured = []
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        hashed = bcrypt.using(rounds=rounds).hash(SAMPLE_PASSWORD)
+        ms = median_verify_ms(lambda: bcrypt.verify(SAMPLE_PASSWORD, hashed), samples)
+        measured.append((rounds, ms))
+        if ms > target_ms:
+            break
+        chosen = rounds
+    return chosen, measured
+
+
+def calibrate_argon2(target_ms: float, memory_kib: int, parallelism: int,
+                     samples: int = 5, max_time_cost: int = 10) -> Tuple[int, List[Tuple[int, float]]]:
+    """Return the highest time cost whose verify median is within ``target_ms``."""
+    measured = []
+    chosen = 1
+    for time_cost in range(1, max_time_cost + 1):
+        handler = argon2.using(
+            time_cost=time_cost, memory_cost=memory_kib, parallelism=parallelism
+        )
+        hashed = handler.hash(SAMPLE_PASSWORD)
+        ms = median_verify_ms(lambda: handler.verify(SAMPLE_PASSWORD, hashed), samples)
+        measured.append((time_cost, ms))
+        if ms > target_ms:
+            break
+        chosen = time_cost
+    return chosen, measured
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, str]:
+    parser = argparse.ArgumentParser(description="Pick password hashing costs for this hardware")
+    parser.add_argument("--target-ms", type=float, default=250, help="Target verify latency")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default="bcrypt")
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--argon2-memory-kib", type=int, default=65536)
+    parser.add_argument("--argon2-parallelism", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    if args.scheme == "bcrypt":
+        chosen, measured = calibrate_bcrypt(args.target_ms, args.samples)
+        print("rounds  verify ms")
+        for rounds, ms in measured:
+            print(f"{rounds:>6}  {ms:>9.1f}{'  <- chosen' if rounds == chosen else ''}")
+        if measured[0][1] > args.target_ms:
+            print("Even the minimum of 10 rounds exceeds the target; keeping 10.")
+        recommended = {
+            "PASSWORD_SCHEMES": '["bcrypt"]',
+            "BCRYPT_ROUNDS": str(chosen),
+        }
+    else:
+        chosen, measured = calibrate_argon2(
+            args.target_ms, args.argon2_memory_kib, args.argon2_parallelism, args.samples
+        )
+        print(f"memory {args.argon2_memory_kib} KiB, parallelism {args.argon2_parallelism}")
+        print("time_cost  verify ms")
+        for time_cost, ms in measured:
+            print(f"{time_cost:>9}  {ms:>9.1f}{'  <- chosen' if time_cost == chosen else ''}")
+        recommended = {
+            "PASSWORD_SCHEMES": '["argon2", "bcrypt"]',
+            "ARGON2_TIME_COST": str(chosen),
+            "ARGON2_MEMORY_COST": str(args.argon2_memory_kib),
+            "ARGON2_PARALLELISM": str(args.argon2_parallelism),
+        }
+
+    print("\nAdd to your environment or .env file:")
+    for key, value in recommended.items():
+        print(f"{key}={value}")
+    return recommended
+
+
+if __name__ == "__main__":
+    main()
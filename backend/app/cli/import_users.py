@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Bulk-load user accounts from CSV or NDJSON.
+
+Records are streamed and validated against ``UserImport``. Plain passwords
+are hashed in a process pool while the previous batch is being written;
+records may instead carry a ``hashed_password`` from another system in any
+scheme the password context recognises (it is upgraded on first login).
+Each batch is loaded in one round trip: on Postgres through ``COPY`` into a
+temporary table and ``INSERT ... SELECT ... ON CONFLICT DO NOTHING``,
+elsewhere through a batched ``insert()``.
+
+Records that fail validation, repeat an email or username of an earlier
+record (case-insensitively) or clash with an existing account are written
+to the reject file as NDJSON with their line number and the reason. Plain
+passwords are left out of it.
+
+Usage:
+    python -m app.cli.import_users users.csv
+    python -m app.cli.import_users users.ndjson --workers 8 --batch-size 5000
+    cat users.ndjson | python -m app.cli.import_users - --format ndjson --reject-file rejects.ndjson
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, or_, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.security import get_password_hash, get_pwd_context
+from app.crud.user import normalize_email
+from app.models.user import User
+from app.schemas.user import UserImport
+
+# Columns written for every imported row; created_at uses its server default
+COLUMNS = (
+    "email", "username", "hashed_password", "full_name", "bio",
+    "profile_picture", "is_active", "is_superuser", "email_verified",
+)
+STAGE_TABLE = "import_users_stage"
+
+# (line number, parsed record or the error that prevented parsing it)
+Record = Tuple[int, Any]
+
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Record]:
+    """Stream records from CSV (with a header row) or NDJSON."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            # Empty cells are missing values rather than empty strings
+            yield reader.line_num, {k: v for k, v in record.items() if k and v not in ("", None)}
+        return
+    for line_num, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_num, json.loads(line)
+        except ValueError as e:
+            yield line_num, e
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in e['loc']) or 'record'}: {e['msg']}" for e in error.errors()
+    )
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.rejected = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "read": self.read,
+            "imported": self.imported,
+            "rejected": self.rejected,
+            "elapsed_s": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+class UserImporter:
+    def __init__(
+        self,
+        db: Session,
+        rejects: Optional[TextIO] = None,
+        batch_size: int = 2000,
+        workers: Optional[int] = None,
+        progress: Optional[TextIO] = None,
+    ):
+        self.db = db
+        self.rejects = rejects
+        self.batch_size = batch_size
+        # 0 hashes in this process, which is only sensible for small files
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.progress = progress
+        self.stats = ImportStats()
+        self._seen_emails: Set[str] = set()
+        self._seen_usernames: Set[str] = set()
+        self._postgres = db.get_bind().dialect.name == "postgresql"
+
+    # --- Validation --------------------------------------------------------
+
+    def reject(self, line: int, error: str, record: Any = None) -> None:
+        self.stats.rejected += 1
+        if self.rejects is None:
+            return
+        if isinstance(record, dict):
+            record = {k: v for k, v in record.items() if k != "password"}
+        else:
+            record = None
+        self.rejects.write(json.dumps({"line": line, "error": error, "record": record}, default=str) + "\n")
+
+    def _validate(self, line: int, record: Any) -> Optional[UserImport]:
+        if isinstance(record, Exception):
+            self.reject(line, f"invalid JSON: {record}")
+            return None
+        if not isinstance(record, dict):
+            self.reject(line, "record is not an object")
+            return None
+        try:
+            row = UserImport.model_validate(record)
+        except ValidationError as e:
+            self.reject(line, _validation_message(e), record)
+            return None
+        if row.hashed_password is not None and get_pwd_context().identify(row.hashed_password) is None:
+            self.reject(line, "hashed_password is not in a recognised scheme", record)
+            return None
+
+        email, username = normalize_email(row.email), row.username.lower()
+        if email in self._seen_emails:
+            self.reject(line, "duplicate email in input", record)
+            return None
+        if username in self._seen_usernames:
+            self.reject(line, "duplicate username in input", record)
+            return None
+        self._seen_emails.add(email)
+        self._seen_usernames.add(username)
+        return row
+
+    def _batches(self, records: Iterable[Record]) -> Iterator[List[Tuple[int, UserImport]]]:
+        batch = []
+        for line, record in records:
+            self.stats.read += 1
+            row = self._validate(line, record)
+            if row is not None:
+                batch.append((line, row))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    # --- Loading -----------------------------------------------------------
+
+    def _values(self, row: UserImport, hashed_password: str) -> Dict[str, Any]:
+        return {
+            "email": normalize_email(row.email),
+            "username": row.username,
+            "hashed_password": hashed_password,
+            "full_name": row.full_name,
+            "bio": row.bio,
+            "profile_picture": row.profile_picture,
+            "is_active": row.is_active,
+            "is_superuser": False,
+            "email_verified": row.email_verified,
+        }
+
+    def _copy(self, values: List[Dict[str, Any]]) -> Set[str]:
+        """COPY the batch into a staging table and insert what does not conflict."""
+        conn = self.db.connection()
+        columns = ", ".join(COLUMNS)
+        # Temp tables are per connection, and the pool may hand out another one
+        conn.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} "
+            "(email text, username text, hashed_password text, full_name text, bio text, "
+            "profile_picture text, is_active boolean, is_superuser boolean, email_verified boolean) "
+            "ON COMMIT DELETE ROWS"
+        ))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in values:
+            # None becomes an unquoted empty field, which COPY reads as NULL
+            writer.writerow([row[column] for column in COLUMNS])
+        buffer.seek(0)
+        cursor = conn.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {STAGE_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+        # DO NOTHING without a target covers both lower() unique indexes
+        result = conn.execute(text(
+            f"INSERT INTO users ({columns}) SELECT {columns} FROM {STAGE_TABLE} "
+            "ON CONFLICT DO NOTHING RETURNING email"
+        ))
+        return {email for email, in result}
+
+    def _insert(self, values: List[Dict[str, Any]]) -> Set[str]:
+        """Insert the rows that do not clash with existing accounts."""
+        emails = [row["email"] for row in values]
+        usernames = [row["username"].lower() for row in values]
+        taken = self.db.execute(
+            select(func.lower(User.email), func.lower(User.username)).where(or_(
+                func.lower(User.email).in_(emails), func.lower(User.username).in_(usernames)
+            ))
+        ).all()
+        taken_emails = {email for email, _ in taken}
+        taken_usernames = {username for _, username in taken}
+        fresh = [
+            row for row in values
+            if row["email"] not in taken_emails and row["username"].lower() not in taken_usernames
+        ]
+        if not fresh:
+            return set()
+        try:
+            self.db.execute(insert(User), fresh)
+            return {row["email"] for row in fresh}
+        except IntegrityError:
+            # An account was created concurrently; fall back to row by row
+            self.db.rollback()
+            inserted = set()
+            for row in fresh:
+                try:
+                    self.db.execute(insert(User), [row])
+                    self.db.commit()
+                    inserted.add(row["email"])
+                except IntegrityError:
+                    self.db.rollback()
+            return inserted
+
+    def _load(self, batch: List[Tuple[int, UserImport]], hashes: Iterable[str]) -> None:
+        hashes = iter(hashes)
+        values = [
+            self._values(row, row.hashed_password if row.password is None else next(hashes))
+            for _, row in batch
+        ]
+        inserted = self._copy(values) if self._postgres else self._insert(values)
+        self.db.commit()
+        for (line, row), value in zip(batch, values):
+            if value["email"] not in inserted:
+                self.reject(line, "email or username already registered", row.model_dump())
+        self.stats.imported += len(inserted)
+        if self.progress is not None:
+            elapsed = time.perf_counter() - self.stats.started
+            self.progress.write(
+                f"{self.stats.read} read, {self.stats.imported} imported, "
+                f"{self.stats.rejected} rejected, {self.stats.read / elapsed:.0f} rows/s\n"
+            )
+
+    def run(self, records: Iterable[Record]) -> ImportStats:
+        """Import ``records``; returns the counts and throughput."""
+        executor = ProcessPoolExecutor(self.workers) if self.workers > 0 else None
+        try:
+            pending = None
+            for batch in self._batches(records):
+                passwords = [row.password for _, row in batch if row.password is not None]
+                if executor is not None:
+                    # map submits every password now, so the pool hashes this
+                    # batch while the previous one is written below
+                    hashes = executor.map(get_password_hash, passwords, chunksize=16)
+                else:
+                    hashes = map(get_password_hash, passwords)
+                if pending is not None:
+                    self._load(*pending)
+                pending = (batch, hashes)
+            if pending is not None:
+                self._load(*pending)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        self.stats.elapsed = time.perf_counter() - self.stats.started
+        return self.stats
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, float]:
+    parser = argparse.ArgumentParser(description="Bulk-load user accounts from CSV or NDJSON")
+    parser.add_argument("source", help="Input file, or - for stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"],
+                        help="Input format (default: from the file extension)")
+    parser.add_argument("--reject-file", help="Where to write rejected records "
+                        "(default: <source>.rejects.ndjson, or rejects.ndjson for stdin)")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Password hashing processes (0 hashes in-process)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.source.lower().endswith(".csv") else "ndjson")
+    reject_path = args.reject_file or (
+        "rejects.ndjson" if args.source == "-" else f"{args.source}.rejects.ndjson"
+    )
+
+    from app.db.session import SessionLocal
+
+    source = sys.stdin if args.source == "-" else open(args.source, newline="", encoding="utf-8")
+    db = SessionLocal()
+    try:
+        with open(reject_path, "w", encoding="utf-8") as rejects:
+            importer = UserImporter(
+                db, rejects, batch_size=args.batch_size, workers=args.workers, progress=sys.stderr
+            )
+            stats = importer.run(read_records(source, fmt))
+    finally:
+        db.close()
+        if source is not sys.stdin:
+            source.close()
+
+    print(f"Imported {stats.imported} of {stats.read} records in {stats.elapsed:.1f}s "
+          f"({stats.rows_per_second:.0f} rows/s); {stats.rejected} rejected, see {reject_path}")
+    return stats.as_dict()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+In-memory prefix trie of popular handles for username autocomplete.
+
+Every node keeps the best ``top_k`` completions below it, so a lookup costs
+at most one step per character of the prefix and no database query. The
+trie holds only the ``AUTOCOMPLETE_TRIE_SIZE`` highest-ranked active users
+and is rebuilt in the background every ``AUTOCOMPLETE_TRIE_REFRESH_SECONDS``
+(see ``app.crud.user.autocomplete_users``); prefixes it cannot fully answer
+fall through to the indexed database query.
+
+Users created, changed or deactivated through this process are applied on
+top of the trie until the next rebuild. Writes made by other processes
+(other workers, ``import_users``) show up for prefixes the trie cannot
+answer at once and everywhere after the next rebuild.
+"""
+import bisect
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+# (negated score, handle, payload); sorted ascending = best first
+_Entry = Tuple[float, str, Any]
+
+
+def _rank(entry: _Entry) -> Tuple[float, str]:
+    return entry[0], entry[1]
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        # None while the node is a leaf bucket holding every entry below it
+        self.children: Optional[Dict[str, "_Node"]] = None
+        self.top: List[_Entry] = []
+
+
+class PrefixTrie:
+    """
+    Nodes start as buckets and only grow children once more than ``top_k``
+    handles share their prefix, which keeps the trie a fraction of the size
+    of one node per character.
+    """
+
+    def __init__(self, top_k: int = 10):
+        self.top_k = top_k
+        self.root = _Node()
+        self.size = 0
+
+    def insert(self, handle: str, score: float, payload: Any = None) -> None:
+        """Add ``handle`` (matched case-insensitively) with a ranking ``score``."""
+        entry = (-score, handle, payload)
+        key = handle.lower()
+        node, depth = self.root, 0
+        while node.children is not None:
+            self._offer(node, entry)
+            if depth == len(key):
+                break
+            node = node.children.setdefault(key[depth], _Node())
+            depth += 1
+        else:
+            bisect.insort(node.top, entry, key=_rank)
+            if len(node.top) > self.top_k:
+                self._split(node, depth)
+        self.size += 1
+
+    def _offer(self, node: _Node, entry: _Entry) -> None:
+        if len(node.top) < self.top_k or _rank(entry) < _rank(node.top[-1]):
+            bisect.insort(node.top, entry, key=_rank)
+            del node.top[self.top_k:]
+
+    def _split(self, node: _Node, depth: int) -> None:
+        entries = node.top
+        node.children = {}
+        node.top = entries[:self.top_k]
+        for entry in entries:
+            key = entry[1].lower()
+            if len(key) > depth:
+                # Entries are already sorted, so appending keeps children sorted
+                node.children.setdefault(key[depth], _Node()).top.append(entry)
+        for child in node.children.values():
+            if len(child.top) > self.top_k:
+                self._split(child, depth + 1)
+
+    def complete(self, prefix: str, limit: Optional[int] = None) -> List[Tuple[str, Any]]:
+        """Best completions of ``prefix`` as ``(handle, payload)`` pairs."""
+        limit = self.top_k if limit is None else limit
+        prefix = prefix.lower()
+        node = self.root
+        for depth, char in enumerate(prefix):
+            if node.children is None:
+                # A bucket holds few entries; filter them by the rest of the prefix
+                entries = [e for e in node.top if e[1].lower().startswith(prefix)]
+                return [(handle, payload) for _, handle, payload in entries[:limit]]
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [(handle, payload) for _, handle, payload in node.top[:limit]]
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class HandleCache:
+    """
+    A periodically rebuilt ``PrefixTrie`` shared by the process, plus the
+    users changed since it was built. Handles are keyed by user id.
+    """
+
+    # Past this many changes, lookups go to the database until the next rebuild
+    max_changes = 1000
+
+    def __init__(self, max_handles: int = 50_000, refresh_interval: float = 300.0,
+                 top_k: int = 10):
+        self.max_handles = max_handles
+        self.refresh_interval = refresh_interval
+        self.top_k = top_k
+        self.trie = PrefixTrie(top_k)
+        self.last_refresh: Optional[float] = None
+        # Set while a rebuild is running so only one runs at a time
+        self.refreshing = False
+        # id -> (time of the change, (handle, score, payload) or None if removed)
+        self._changes: Dict[Any, Tuple[float, Optional[Tuple[str, float, Any]]]] = {}
+        self._lock = threading.Lock()
+
+    def needs_refresh(self) -> bool:
+        return (
+            self.last_refresh is None
+            or time.monotonic() - self.last_refresh >= self.refresh_interval
+        )
+
+    def start_refresh(self) -> bool:
+        """Claim a due rebuild; False if none is due or one is already running."""
+        with self._lock:
+            if self.refreshing or not self.needs_refresh():
+                return False
+            self.refreshing = True
+            return True
+
+    def rebuild(self, rows: Iterable[Tuple[Any, str, float, Any]],
+                started: Optional[float] = None) -> None:
+        """
+        Replace the trie with ``(id, handle, score, payload)`` rows. Changes
+        made after ``started`` (when the rows were read) are kept.
+        """
+        trie = PrefixTrie(self.top_k)
+        for key, handle, score, payload in rows:
+            trie.insert(handle, score, (key, score, payload))
+        started = time.monotonic() if started is None else started
+        with self._lock:
+            self.trie = trie
+            self._changes = {key: change for key, change in self._changes.items()
+                             if change[0] >= started}
+            self.last_refresh = time.monotonic()
+            self.refreshing = False
+
+    def update(self, key: Any, handle: str, score: float, payload: Any) -> None:
+        self._change(key, (handle, score, payload))
+
+    def remove(self, key: Any) -> None:
+        self._change(key, None)
+
+    def _change(self, key: Any, row: Optional[Tuple[str, float, Any]]) -> None:
+        with self._lock:
+            self._changes[key] = (time.monotonic(), row)
+            if len(self._changes) > self.max_changes:
+                self.last_refresh = None
+
+    def lookup(self, prefix: str, limit: int) -> Optional[List[Tuple[str, Any]]]:
+        """
+        Completions from the trie, or ``None`` when the trie cannot answer
+        authoritatively and the caller should query the database.
+        """
+        prefix = prefix.lower()
+        with self._lock:
+            if self.last_refresh is None or limit > self.top_k:
+                return None
+            matches = self.trie.complete(prefix, limit)
+            # Fewer matches: the database may hold users the trie does not
+            if len(matches) < limit:
+                return None
+            if any(key in self._changes for _, (key, _, _) in matches):
+                # The trie's next handle, which would take its place, is unknown
+                return None
+            changed = [
+                row for _, row in self._changes.values()
+                if row is not None and row[0].lower().startswith(prefix)
+            ]
+        entries = [(handle, score, payload) for handle, (_, score, payload) in matches] + changed
+        entries.sort(key=lambda entry: (-entry[1], entry[0]))
+        return [(handle, payload) for handle, _, payload in entries[:limit]]
+
+
+_handles: Optional[HandleCache] = None
+
+
+def get_handle_cache() -> HandleCache:
+    """Return the process-wide handle cache, creating it on first use."""
+    global _handles
+    if _handles is None:
+        _handles = HandleCache(
+            max_handles=settings.AUTOCOMPLETE_TRIE_SIZE,
+            refresh_interval=settings.AUTOCOMPLETE_TRIE_REFRESH_SECONDS,
+            top_k=settings.AUTOCOMPLETE_MAX_LIMIT,
+        )
+    return _handles
+
+
+def set_handle_cache(handles: Optional[HandleCache]) -> None:
+    """Replace the process-wide handle cache (used by tests)."""
+    global _handles
+    _handles = handles
@@ -0,0 +1,137 @@
+"""
+Profile pictures.
+
+An uploaded picture is decoded once, cropped square and written as every
+``AVATAR_SIZES`` x ``AVATAR_FORMATS`` rendition under
+``avatars/{user id}/{hash}/``. The hash covers the upload and the rendition
+settings, so a key never changes content and the objects carry an
+``immutable`` Cache-Control; a new picture gets new keys. ``User.profile_picture``
+holds that prefix, and the user schemas expand it into URLs (``avatar_urls``).
+
+Rendering runs in the image pipeline's process pool (app/core/images.py).
+"""
+import asyncio
+import hashlib
+import io
+import logging
+from typing import Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.images import CONTENT_TYPES, get_image_pipeline
+from app.core.storage import get_object_store
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "avatars/"
+
+# Without a face detector, crop a portrait around its upper part, where the
+# face usually is; landscapes are cropped around the middle
+CENTERING = (0.5, 0.35)
+
+FORMATS = {"JPEG", "PNG", "WEBP", "GIF", "MPO"}
+
+
+def rendition_name(size: int, fmt: str) -> str:
+    return f"{size}.{fmt}"
+
+
+def render_avatar(data: bytes) -> Dict[str, bytes]:
+    """
+    Every rendition of an uploaded picture, by ``rendition_name``. Raises
+    ValueError for anything that is not a usable image. Pictures smaller than
+    a size are not upscaled; that rendition is the picture at its own size.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_SOURCE_PIXELS
+    largest = max(settings.AVATAR_SIZES)
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            if source.format not in FORMATS:
+                raise ValueError(f"Unsupported image format {source.format}")
+            if min(source.size) < settings.AVATAR_MIN_SIDE:
+                side = settings.AVATAR_MIN_SIDE
+                raise ValueError(f"Image is smaller than {side}x{side}")
+            source.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(source)
+            if image.mode in ("RGBA", "LA", "P"):
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+            side = min(largest, *image.size)
+            square = ImageOps.fit(image, (side, side), Image.LANCZOS, centering=CENTERING)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ValueError(f"Unreadable image: {e}")
+
+    renditions = {}
+    for size in sorted(settings.AVATAR_SIZES, reverse=True):
+        if square.width > size:
+            square = square.resize((size, size), Image.LANCZOS)
+        for fmt in settings.AVATAR_FORMATS:
+            out = io.BytesIO()
+            # Saved without the upload's EXIF (camera, location)
+            if fmt == "jpeg":
+                square.save(out, "JPEG", quality=settings.AVATAR_QUALITY, optimize=True,
+                            progressive=True)
+            else:
+                square.save(out, "WEBP", quality=settings.AVATAR_QUALITY, method=4)
+            renditions[rendition_name(size, fmt)] = out.getvalue()
+    return renditions
+
+
+def avatar_prefix(user_id: int, data: bytes) -> str:
+    digest = hashlib.sha256(data)
+    digest.update(repr((settings.AVATAR_SIZES, settings.AVATAR_FORMATS,
+                        settings.AVATAR_QUALITY)).encode())
+    return f"{PREFIX}{user_id}/{digest.hexdigest()[:20]}"
+
+
+def avatar_urls(profile_picture: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+    """URLs of a rendition set by size, then format; None unless it is one."""
+    if not profile_picture or not profile_picture.startswith(PREFIX):
+        return None
+    base = settings.AVATAR_BASE_URL
+    if not base:
+        scheme = "https" if settings.STORAGE_USE_HTTPS else "http"
+        base = f"{scheme}://{settings.STORAGE_ENDPOINT}/{settings.STORAGE_BUCKET_NAME}"
+    return {
+        str(size): {
+            fmt: f"{base.rstrip('/')}/{profile_picture}/{rendition_name(size, fmt)}"
+            for fmt in settings.AVATAR_FORMATS
+        }
+        for size in settings.AVATAR_SIZES
+    }
+
+
+def store_renditions(prefix: str, renditions: Dict[str, bytes]) -> None:
+    store = get_object_store()
+    for name, data in renditions.items():
+        fmt = name.rsplit(".", 1)[1]
+        store.put(f"{prefix}/{name}", data, CONTENT_TYPES[fmt],
+                  cache_control=settings.AVATAR_CACHE_CONTROL)
+
+
+async def save_avatar(user_id: int, data: bytes) -> str:
+    """Render and store an uploaded picture; returns the rendition set's prefix."""
+    prefix = avatar_prefix(user_id, data)
+    loop = asyncio.get_running_loop()
+    renditions = await loop.run_in_executor(get_image_pipeline().executor, render_avatar, data)
+    await run_in_threadpool(store_renditions, prefix, renditions)
+    return prefix
+
+
+def remove_avatar(user_id: int, profile_picture: Optional[str]) -> None:
+    """Delete a user's rendition set. Anything else (e.g. an external URL) is left alone."""
+    if not profile_picture or not profile_picture.startswith(f"{PREFIX}{user_id}/"):
+        return
+    store = get_object_store()
+    try:
+        store.remove(*store.list(profile_picture + "/"))
+    except Exception as e:
+        # Orphaned renditions are harmless; the new picture is already saved
+        logger.warning(f"Removing avatar {profile_picture} failed: {e}")
@@ -0,0 +1,469 @@
+"""
+Two-tier cache: a small in-process LRU in front of a shared backend (Redis).
+
+The backend is pluggable so tests and single-node setups can run against the
+in-memory ``MemoryBackend`` without a Redis server.
+"""
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+# --- Serializers -----------------------------------------------------------
+
+class JSONSerializer:
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class ORJSONSerializer:
+    name = "orjson"
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackSerializer:
+    name = "msgpack"
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+def get_serializer(name: str):
+    """Return the serializer called ``name``, falling back to stdlib json."""
+    if name == "msgpack" and msgpack is not None:
+        return MsgpackSerializer()
+    if name == "orjson" and orjson is not None:
+        return ORJSONSerializer()
+    if name not in ("json", "orjson", "msgpack"):
+        raise ValueError(f"Unknown cache serializer: {name}")
+    if name != "json":
+        logger.warning(f"Cache serializer '{name}' is not installed, using json")
+    return JSONSerializer()
+
+
+# --- Backends --------------------------------------------------------------
+
+class MemoryBackend:
+    """
+    Process-local backend with the same semantics as ``RedisBackend``.
+
+    Used for tests and for single-node deployments without Redis.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._tags: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None,
+            tags: Iterable[str] = ()) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def invalidate_tags(self, *tags: str) -> List[str]:
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.pop(tag, set())
+            for key in keys:
+                self._data.pop(key, None)
+        return list(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def ping(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+# Adds ARGV[1] to the tag sets in KEYS. A tag set lives at least as long as
+# its longest-lived member (ARGV[2] ms, 0 for no expiry): a new set gets the
+# member's TTL and an existing one is only ever extended, so sets of keys
+# that simply expire do not pile up.
+_TAG_SCRIPT = """
+local ttl = tonumber(ARGV[2])
+for _, tag in ipairs(KEYS) do
+    local existed = redis.call('EXISTS', tag) == 1
+    redis.call('SADD', tag, ARGV[1])
+    if ttl == 0 then
+        redis.call('PERSIST', tag)
+    elseif not existed then
+        redis.call('PEXPIRE', tag, ttl)
+    else
+        local current = redis.call('PTTL', tag)
+        if current >= 0 and current < ttl then
+            redis.call('PEXPIRE', tag, ttl)
+        end
+    end
+end
+"""
+
+
+class RedisBackend:
+    """Shared backend storing values and tag sets in Redis."""
+
+    def __init__(self, url: str, prefix: str = "snapwave:cache:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._tag_script = self.client.register_script(_TAG_SCRIPT)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self._key(key))
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None,
+            tags: Iterable[str] = ()) -> None:
+        ttl_ms = max(1, int(ttl * 1000)) if ttl else 0
+        pipe = self.client.pipeline()
+        if ttl_ms:
+            pipe.set(self._key(key), value, px=ttl_ms)
+        else:
+            pipe.set(self._key(key), value)
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if tag_keys:
+            self._tag_script(keys=tag_keys, args=[key, ttl_ms], client=pipe)
+        pipe.execute()
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*(self._key(key) for key in keys))
+
+    def invalidate_tags(self, *tags: str) -> List[str]:
+        pipe = self.client.pipeline()
+        for tag in tags:
+            pipe.smembers(self._tag_key(tag))
+        members = pipe.execute()
+        keys = sorted({m.decode() if isinstance(m, bytes) else m
+                       for group in members for m in group})
+        pipe = self.client.pipeline()
+        if keys:
+            pipe.delete(*(self._key(key) for key in keys))
+        pipe.delete(*(self._tag_key(tag) for tag in tags))
+        pipe.execute()
+        return keys
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            self.client.delete(key)
+
+    def ping(self) -> bool:
+        return bool(self.client.ping())
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def backend_from_url(url: str):
+    """Build a backend from a URL such as ``memory://`` or ``redis://host:6379/0``."""
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+
+# --- Local tier ------------------------------------------------------------
+
+class LocalLRU:
+    """Small thread-safe LRU holding decoded values with a short TTL."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 5.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            if item[1] <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        ttl = min(ttl, self.ttl) if ttl else self.ttl
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# --- Cache -----------------------------------------------------------------
+
+class Cache:
+    """
+    Cache front-end combining the local LRU and a shared backend.
+
+    Values are stored in an envelope ``[value, delta, expires_at]`` where
+    ``delta`` is the time the loader took. ``get_or_set`` uses it for
+    probabilistic early refresh (XFetch), so hot keys are recomputed by one
+    caller shortly before they expire instead of by everyone after.
+    Concurrent misses for the same key in one process are collapsed into a
+    single loader call.
+    """
+
+    def __init__(
+        self,
+        backend,
+        serializer=None,
+        local: Optional[LocalLRU] = None,
+        default_ttl: float = 300,
+        jitter: float = 0.1,
+        early_refresh_beta: float = 1.0,
+        enabled: bool = True,
+    ):
+        self.backend = backend
+        self.serializer = serializer or JSONSerializer()
+        self.local = local if local is not None else LocalLRU()
+        self.default_ttl = default_ttl
+        self.jitter = jitter
+        self.early_refresh_beta = early_refresh_beta
+        self.enabled = enabled
+        # key -> [lock, number of callers holding or waiting for it]
+        self._inflight: Dict[str, list] = {}
+        self._inflight_lock = threading.Lock()
+
+    def _ttl(self, ttl: Optional[float]) -> float:
+        ttl = self.default_ttl if ttl is None else ttl
+        if self.jitter and ttl:
+            ttl *= 1 + random.uniform(-self.jitter, self.jitter)
+        return ttl
+
+    def _read(self, key: str):
+        envelope = self.local.get(key)
+        if envelope is not _MISSING:
+            return envelope
+        try:
+            raw = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Cache backend read failed for {key}: {e}")
+            return _MISSING
+        if raw is None:
+            return _MISSING
+        envelope = self.serializer.loads(raw)
+        self.local.set(key, envelope, ttl=max(envelope[2] - time.time(), 0.001))
+        return envelope
+
+    def _write(self, key: str, value: Any, ttl: Optional[float],
+               tags: Iterable[str], delta: float = 0.0) -> None:
+        ttl = self._ttl(ttl)
+        envelope = [value, delta, time.time() + ttl]
+        self.local.set(key, envelope, ttl=ttl)
+        try:
+            self.backend.set(key, self.serializer.dumps(envelope), ttl=ttl, tags=tags)
+        except Exception as e:
+            logger.warning(f"Cache backend write failed for {key}: {e}")
+
+    def _should_refresh_early(self, envelope) -> bool:
+        _, delta, expires_at = envelope
+        if not delta or not self.early_refresh_beta:
+            return False
+        # XFetch: -delta * beta * log(rand) grows as expiry approaches
+        gap = -delta * self.early_refresh_beta * math.log(random.random() or 1e-12)
+        return time.time() + gap >= expires_at
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+        envelope = self._read(key)
+        return default if envelope is _MISSING else envelope[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None,
+            tags: Iterable[str] = ()) -> None:
+        if self.enabled:
+            self._write(key, value, ttl, tags)
+
+    def delete(self, *keys: str) -> None:
+        self.local.delete(*keys)
+        try:
+            self.backend.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Cache backend delete failed: {e}")
+
+    def invalidate_tags(self, *tags: str) -> None:
+        """Drop every key that was stored with any of ``tags``."""
+        try:
+            keys = self.backend.invalidate_tags(*tags)
+        except Exception as e:
+            logger.warning(f"Cache tag invalidation failed for {tags}: {e}")
+            # Without the tag index we cannot know which keys to drop locally
+            self.local.clear()
+            return
+        self.local.delete(*keys)
+
+    def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+        cache_none: bool = False,
+    ) -> Any:
+        """
+        Return the cached value for ``key`` or compute it with ``loader``.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument callable producing the value on a miss
+            ttl: Time to live in seconds (jittered); defaults to ``default_ttl``
+            tags: Tags the key can later be invalidated by
+            cache_none: Whether a ``None`` result should be cached
+        """
+        if not self.enabled:
+            return loader()
+
+        envelope = self._read(key)
+        if envelope is not _MISSING and not self._should_refresh_early(envelope):
+            return envelope[0]
+
+        with self._inflight_lock:
+            entry = self._inflight.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        lock = entry[0]
+        try:
+            # Only one caller per process recomputes an early refresh; the
+            # others keep serving the still-valid value.
+            if envelope is not _MISSING and not lock.acquire(blocking=False):
+                return envelope[0]
+            if envelope is _MISSING:
+                lock.acquire()
+            try:
+                if envelope is _MISSING:
+                    # Another caller may have filled the key while we waited
+                    envelope = self._read(key)
+                    if envelope is not _MISSING:
+                        return envelope[0]
+                start = time.perf_counter()
+                value = loader()
+                delta = time.perf_counter() - start
+                if value is not None or cache_none:
+                    self._write(key, value, ttl, tags, delta=delta)
+                return value
+            finally:
+                lock.release()
+        finally:
+            # Dropped only once nobody holds or waits for it; a caller that
+            # found it must never end up on a different lock than the holder
+            with self._inflight_lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._inflight[key]
+
+    def clear(self) -> None:
+        self.local.clear()
+        self.backend.clear()
+
+    def ping(self) -> bool:
+        return self.backend.ping()
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def build_cache() -> Cache:
+    return Cache(
+        backend=backend_from_url(settings.CACHE_URL),
+        serializer=get_serializer(settings.CACHE_SERIALIZER),
+        local=LocalLRU(maxsize=settings.CACHE_LOCAL_MAXSIZE, ttl=settings.CACHE_LOCAL_TTL),
+        default_ttl=settings.CACHE_DEFAULT_TTL,
+        jitter=settings.CACHE_TTL_JITTER,
+        enabled=settings.CACHE_ENABLED,
+    )
+
+
+_cache: Optional[Cache] = None
+
+
+def get_cache() -> Cache:
+    """Return the process-wide cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = build_cache()
+    return _cache
+
+
+def set_cache(cache: Optional[Cache]) -> None:
+    """Replace the process-wide cache (used by tests)."""
+    global _cache
+    _cache = cache
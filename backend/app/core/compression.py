@@ -0,0 +1,236 @@
+"""
+Negotiated response compression (zstd, brotli, gzip) as ASGI middleware.
+
+Unlike Starlette's ``GZipMiddleware`` this supports several codecs, streams
+``StreamingResponse`` bodies chunk by chunk, and leaves already-compressed
+media types alone. brotli and zstd are optional dependencies; codecs whose
+library is missing are simply not offered.
+"""
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+# Content types that are already compressed; recompressing only burns CPU
+DEFAULT_EXCLUDED_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zstd",
+    "application/x-7z-compressed",
+    "application/vnd.apple.mpegurl",
+    "application/octet-stream",
+    "text/event-stream",
+)
+
+
+class GzipCodec:
+    encoding = "gzip"
+
+    def __init__(self, level: int = 6):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class BrotliCodec:
+    encoding = "br"
+
+    def __init__(self, level: int = 4):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class ZstdCodec:
+    encoding = "zstd"
+
+    def __init__(self, level: int = 3):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+def available_codecs() -> Dict[str, type]:
+    """Codecs usable in this process, in server preference order."""
+    codecs = {}
+    if zstandard is not None:
+        codecs["zstd"] = ZstdCodec
+    if brotli is not None:
+        codecs["br"] = BrotliCodec
+    codecs["gzip"] = GzipCodec
+    return codecs
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """Parse ``Accept-Encoding`` into ``{coding: q}``."""
+    accepted = {}
+    for item in value.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, val = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, offered: Iterable[str]) -> Optional[str]:
+    """
+    Pick the codec with the highest client q-value, breaking ties by the
+    server's order in ``offered``.
+    """
+    accepted = parse_accept_encoding(accept_encoding)
+    best: Optional[Tuple[float, int, str]] = None
+    for rank, coding in enumerate(offered):
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q <= 0:
+            continue
+        candidate = (q, -rank, coding)
+        if best is None or candidate > best:
+            best = candidate
+    return best[2] if best else None
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        levels: Optional[Dict[str, int]] = None,
+        encodings: Optional[List[str]] = None,
+        excluded_types: Iterable[str] = DEFAULT_EXCLUDED_TYPES,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = levels or {}
+        codecs = available_codecs()
+        self.codecs = {
+            name: codecs[name] for name in (encodings or list(codecs)) if name in codecs
+        }
+        self.excluded_types = tuple(excluded_types)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self.codecs
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder)
+
+    def make_codec(self, encoding: str):
+        codec = self.codecs[encoding]
+        level = self.levels.get(encoding)
+        return codec(level) if level is not None else codec()
+
+    def should_skip(self, headers: Headers, status: int) -> bool:
+        if status < 200 or status in (204, 206, 304):
+            return True
+        if "content-encoding" in headers:
+            return True
+        content_type = headers.get("content-type", "").lower()
+        return content_type.startswith(self.excluded_types)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message: Optional[Message] = None
+        self.codec = None
+        self.passthrough = False
+        self.started = False
+
+    async def __call__(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = self.middleware.should_skip(headers, message["status"])
+            return
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.send(self.start_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if not more_body:
+                # Whole body available: compress in one go if it is worth it
+                if len(body) < self.middleware.minimum_size:
+                    await self.send(self.start_message)
+                    await self.send(message)
+                    return
+                codec = self.middleware.make_codec(self.encoding)
+                body = codec.compress(body) + codec.finish()
+                headers["Content-Encoding"] = self.encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            # Streaming body: compress each chunk as it arrives
+            self.codec = self.middleware.make_codec(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "content-length" in headers:
+                del headers["content-length"]
+            await self.send(self.start_message)
+
+        if self.codec is None:
+            await self.send(message)
+            return
+        data = self.codec.compress(body) if body else b""
+        if not more_body:
+            data += self.codec.finish()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
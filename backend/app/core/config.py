@@ -1,6 +1,9 @@
-import os
+from pathlib import Path
 from pydantic_settings import BaseSettings
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+# backend/.env, independent of the working directory
+ENV_FILE = Path(__file__).resolve().parent.parent.parent / ".env"
 
 
 class Settings(BaseSettings):
@@ -9,44 +12,249 @@ class Settings(BaseSettings):
     EMAIL_DEV_MODE: bool = True  # Set to False in production
     
     # JWT Settings
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "supersecretkey")  # Change in production
+    SECRET_KEY: str = "supersecretkey"  # Change in production
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15  # Short-lived; renewed with a refresh token
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    
+    # Access token revocation. Each worker keeps a bloom filter of revoked
+    # tokens/users and pulls new entries from the DB every few seconds.
+    REVOCATION_SYNC_SECONDS: float = 5.0
+    REVOCATION_REBUILD_SECONDS: float = 60 * 60  # Drop expired entries hourly
+    REVOCATION_BLOOM_CAPACITY: int = 100_000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    
+    # Password hashing. The first scheme hashes new passwords; hashes made
+    # with other schemes or costs keep verifying and are upgraded on login.
+    # Use `python -m app.cli.calibrate_hashing` to pick costs for the hardware.
+    PASSWORD_SCHEMES: List[str] = ["bcrypt"]  # e.g. ["argon2", "bcrypt"]
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 2
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 2
     
     # Database settings
-    DATABASE_URL: str = os.getenv(
-        "DATABASE_URL", "postgresql+psycopg2://shukla@localhost:5432/snapwave"
-    )
+    DATABASE_URL: str = "postgresql+psycopg2://shukla@localhost:5432/snapwave"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # seconds
+    DB_POOL_PRE_PING: bool = True
     
     # CORS settings
     BACKEND_CORS_ORIGINS: list = ["*"]  # In production, set specific origins
 
     # Storage settings
-    STORAGE_ENDPOINT: str = os.getenv("STORAGE_ENDPOINT", "localhost:9000")
-    STORAGE_ACCESS_KEY: str = os.getenv("STORAGE_ACCESS_KEY", "minioaccess")
+    STORAGE_ENDPOINT: str = "localhost:9000"
+    STORAGE_ACCESS_KEY: str = "minioaccess"
     
     # Email settings
-    MAIL_USERNAME: str = os.getenv("MAIL_USERNAME", "")
-    MAIL_PASSWORD: str = os.getenv("MAIL_PASSWORD", "")
-    MAIL_FROM: str = os.getenv("MAIL_FROM", "info@snapwave.com")
-    MAIL_FROM_NAME: str = os.getenv("MAIL_FROM_NAME", "SnapWave")
-    MAIL_PORT: int = int(os.getenv("MAIL_PORT", "587"))
-    MAIL_SERVER: str = os.getenv("MAIL_SERVER", "smtp.gmail.com")
-    MAIL_STARTTLS: bool = os.getenv("MAIL_STARTTLS", "True").lower() == "true"
-    MAIL_SSL_TLS: bool = os.getenv("MAIL_SSL_TLS", "False").lower() == "true"
-    MAIL_USE_CREDENTIALS: bool = os.getenv("MAIL_USE_CREDENTIALS", "True").lower() == "true"
-    MAIL_VALIDATE_CERTS: bool = os.getenv("MAIL_VALIDATE_CERTS", "True").lower() == "true"
+    MAIL_USERNAME: str = ""
+    MAIL_PASSWORD: str = ""
+    MAIL_FROM: str = "info@snapwave.com"
+    MAIL_FROM_NAME: str = "SnapWave"
+    MAIL_PORT: int = 587
+    MAIL_SERVER: str = "smtp.gmail.com"
+    MAIL_STARTTLS: bool = True
+    MAIL_SSL_TLS: bool = False
+    MAIL_USE_CREDENTIALS: bool = True
+    MAIL_VALIDATE_CERTS: bool = True
     
     # Frontend URL for links in emails
-    FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
-    STORAGE_SECRET_KEY: str = os.getenv("STORAGE_SECRET_KEY", "miniosecret")
-    STORAGE_BUCKET_NAME: str = os.getenv("STORAGE_BUCKET_NAME", "snapwave")
+    FRONTEND_URL: str = "http://localhost:3000"
+    STORAGE_SECRET_KEY: str = "miniosecret"
+    STORAGE_BUCKET_NAME: str = "snapwave"
     STORAGE_USE_HTTPS: bool = False
+    STORAGE_MAX_CONNECTIONS: int = 10
+    STORAGE_CONNECT_TIMEOUT: float = 5.0
+    STORAGE_READ_TIMEOUT: float = 30.0
+
+    # Resumable uploads (see app/crud/upload.py). Appended bytes are stored
+    # as multipart parts of UPLOAD_PART_SIZE (S3 requires at least 5 MiB for
+    # every part but the last); one PATCH may carry up to UPLOAD_MAX_CHUNK_SIZE.
+    # Sessions expire after UPLOAD_SESSION_TTL_SECONDS without a PATCH.
+    UPLOAD_MAX_SIZE: int = 512 * 1024 * 1024
+    UPLOAD_PART_SIZE: int = 8 * 1024 * 1024
+    UPLOAD_MAX_CHUNK_SIZE: int = 32 * 1024 * 1024
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 60 * 60
+    UPLOAD_SWEEP_INTERVAL_SECONDS: float = 15 * 60
+    UPLOAD_APPEND_LEASE_SECONDS: int = 60  # Renewed after every part
+    UPLOAD_CONTENT_TYPES: List[str] = [
+        "image/jpeg", "image/png", "image/webp", "image/heic",
+        "video/mp4", "video/quicktime", "video/webm",
+    ]
+
+    # Image derivatives (see app/core/images.py), resized on demand behind
+    # signed URLs. Only these sizes ("WxH"; a 0 height keeps the aspect
+    # ratio), formats and qualities are served, which bounds the number of
+    # derivatives per image. URLs expire after IMAGE_URL_TTL_SECONDS, rounded
+    # up to the next day so they stay cacheable. Rendering runs in a pool of
+    # IMAGE_WORKERS processes; results are cached in the bucket and in
+    # IMAGE_CACHE_DIR, which is trimmed to IMAGE_CACHE_MAX_BYTES.
+    IMAGE_SIGNING_KEY: str = ""  # Defaults to SECRET_KEY
+    IMAGE_SIZES: List[str] = ["160x160", "320x320", "640x0", "1080x0", "1440x0"]
+    IMAGE_FORMATS: List[str] = ["webp", "jpeg"]
+    IMAGE_QUALITIES: List[int] = [60, 75, 85]
+    IMAGE_PRESETS: Dict[str, str] = {"grid": "320x320", "feed": "1080x0", "full": "1440x0"}
+    IMAGE_DEFAULT_FORMAT: str = "webp"
+    IMAGE_DEFAULT_QUALITY: int = 75
+    IMAGE_URL_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    IMAGE_WORKERS: int = 2
+    IMAGE_CACHE_DIR: str = "/tmp/snapwave-images"
+    IMAGE_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    IMAGE_MAX_SOURCE_PIXELS: int = 50_000_000
+    IMAGE_FAILURE_TTL_SECONDS: int = 5 * 60  # Undecodable sources are refused this long
+
+    # Profile pictures (PUT /users/me/avatar, see app/core/avatars.py).
+    # Uploads are cropped square and stored as AVATAR_SIZES x AVATAR_FORMATS
+    # under avatars/{user id}/{content hash}/, with AVATAR_CACHE_CONTROL.
+    # AVATAR_BASE_URL is where clients fetch the bucket from (a CDN or the
+    # public bucket); it defaults to the storage endpoint. A rendition set
+    # keeps the sizes it was made with, so new sizes need a re-upload.
+    AVATAR_MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024
+    AVATAR_MIN_SIDE: int = 64
+    AVATAR_SIZES: List[int] = [64, 160, 320]
+    AVATAR_FORMATS: List[str] = ["webp", "jpeg"]
+    AVATAR_QUALITY: int = 80
+    AVATAR_CONTENT_TYPES: List[str] = ["image/jpeg", "image/png", "image/webp", "image/gif"]
+    AVATAR_CACHE_CONTROL: str = "public, max-age=31536000, immutable"
+    AVATAR_BASE_URL: str = ""
+
+    # Video transcoding (start_transcoder.py, see app/worker/transcode.py).
+    # Each worker runs up to TRANSCODE_CONCURRENCY ffmpeg processes; queued
+    # jobs run smallest upload (in practice shortest clip) first. A running
+    # job whose worker has not reported progress for TRANSCODE_LEASE_SECONDS
+    # is requeued by the maintenance worker; failed attempts are retried
+    # after TRANSCODE_RETRY_BACKOFF_SECONDS, doubling, up to
+    # TRANSCODE_MAX_ATTEMPTS. Renditions taller than the source are skipped.
+    TRANSCODE_CONCURRENCY: int = 2
+    TRANSCODE_FFMPEG: str = "ffmpeg"
+    TRANSCODE_FFPROBE: str = "ffprobe"
+    TRANSCODE_FFMPEG_THREADS: int = 2
+    TRANSCODE_PRESET: str = "veryfast"
+    TRANSCODE_SEGMENT_SECONDS: int = 4
+    TRANSCODE_RENDITIONS: List[Dict[str, int]] = [
+        {"height": 360, "video_kbps": 800, "audio_kbps": 96},
+        {"height": 720, "video_kbps": 2800, "audio_kbps": 128},
+        {"height": 1080, "video_kbps": 5000, "audio_kbps": 160},
+    ]
+    TRANSCODE_POSTER_HEIGHT: int = 720
+    TRANSCODE_MAX_ATTEMPTS: int = 3
+    TRANSCODE_RETRY_BACKOFF_SECONDS: float = 30.0
+    TRANSCODE_LEASE_SECONDS: float = 120.0
+    TRANSCODE_PROGRESS_INTERVAL_SECONDS: float = 2.0
+    TRANSCODE_POLL_INTERVAL_SECONDS: float = 2.0
+    TRANSCODE_STALL_SWEEP_INTERVAL_SECONDS: float = 60.0
+    
+    # Start-up warm-up and graceful shutdown (see app/core/lifespan.py)
+    WARMUP_ENABLED: bool = True
+    WARMUP_DB_CONNECTIONS: int = 2  # Pool connections opened before serving
+    SHUTDOWN_PRESTOP_SECONDS: float = 5.0  # Not ready but serving after SIGTERM; 0 disables
+    SHUTDOWN_DRAIN_SECONDS: float = 10.0
+    
+    # Background dependency probes reported by /ready (see app/core/health.py)
+    HEALTH_PROBES_ENABLED: bool = True
+    HEALTH_PROBE_INTERVAL: float = 5.0
+    HEALTH_PROBE_TIMEOUT: float = 2.0
+    HEALTH_CRITICAL_PROBES: List[str] = ["database", "cache"]  # Others only mark "degraded"
+
+    # Maintenance worker (start_worker.py). One worker at a time is leader,
+    # elected through a Postgres advisory lock; the others stand by.
+    WORKER_LEADER_LOCK_KEY: int = 0x736E6170
+    WORKER_LEADER_RETRY_SECONDS: float = 30.0
+    MAINTENANCE_BATCH_SIZE: int = 1000  # Rows per transaction
+    MAINTENANCE_BATCH_PAUSE_SECONDS: float = 0.2  # Between batches, to cap load
+    MAINTENANCE_LOCK_TIMEOUT_MS: int = 2000  # Give up a batch rather than queue behind requests
+    TOKEN_SWEEP_INTERVAL_SECONDS: float = 60 * 60
+    # Never-verified accounts older than this are deleted; 0 keeps them.
+    # Accounts created before email verification existed are unverified too.
+    UNVERIFIED_ACCOUNT_RETENTION_DAYS: int = 0
+    UNVERIFIED_PURGE_INTERVAL_SECONDS: float = 24 * 60 * 60
+    # media and interactions are partitioned by month of created_at on
+    # Postgres (see app/db/partitions.py). The worker keeps partitions
+    # created this many months ahead and detaches those older than the
+    # retention into PARTITION_ARCHIVE_SCHEMA; 0 keeps every partition.
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: float = 6 * 60 * 60
+    PARTITION_ARCHIVE_SCHEMA: str = "archive"
+    MEDIA_RETENTION_MONTHS: int = 0
+    INTERACTION_RETENTION_MONTHS: int = 0
+
+    # Online migrations (see app/db/migrations.py). A migration that cannot
+    # get its lock within the lock timeout fails instead of queueing, with
+    # every login queued behind it.
+    MIGRATION_LOCK_TIMEOUT_MS: int = 3000
+    MIGRATION_STATEMENT_TIMEOUT_MS: int = 60_000  # Not applied to concurrent index builds
+    MIGRATION_LOCK_RETRIES: int = 5
+    MIGRATION_BACKFILL_BATCH_SIZE: int = 5000
+    MIGRATION_BACKFILL_PAUSE_SECONDS: float = 0.1
+    # Dry run cost model: sequential read rate, and the estimated lock time
+    # above which a statement blocking reads or writes is flagged
+    MIGRATION_ESTIMATE_MB_PER_SECOND: float = 100.0
+    MIGRATION_WARN_SECONDS: float = 1.0
+
+    # Cache settings ("memory://" or a redis:// URL)
+    CACHE_ENABLED: bool = True
+    CACHE_URL: str = "memory://"
+    CACHE_SERIALIZER: str = "orjson"  # json, orjson or msgpack
+    CACHE_DEFAULT_TTL: int = 300
+    CACHE_TTL_JITTER: float = 0.1
+    CACHE_LOCAL_MAXSIZE: int = 1024
+    CACHE_LOCAL_TTL: float = 5.0
+    USER_CACHE_TTL: int = 300
+
+    # User search and autocomplete. Autocomplete is served from an in-memory
+    # trie of the most recently joined handles when it can answer fully.
+    SEARCH_MAX_LIMIT: int = 50
+    AUTOCOMPLETE_MAX_LIMIT: int = 10
+    AUTOCOMPLETE_TRIE_SIZE: int = 10_000
+    AUTOCOMPLETE_TRIE_REFRESH_SECONDS: float = 300.0
+
+    # Feed and profile grid pages. Each query reads one monthly partition;
+    # after FEED_SCAN_MONTHS months without a full page the rest of the
+    # page is read from all older partitions at once.
+    FEED_PAGE_SIZE: int = 24
+    FEED_MAX_PAGE_SIZE: int = 100
+    FEED_SCAN_MONTHS: int = 3
+
+    # Cache-Control policies for conditional GET routes
+    CACHE_CONTROL_USERS_ME: str = "private, no-cache"
+    CACHE_CONTROL_USERS_DETAIL: str = "private, no-cache"
+
+    # Metrics (set PROMETHEUS_MULTIPROC_DIR when running several workers)
+    METRICS_ENABLED: bool = True
+
+    # Query profiler: adds X-DB-* headers and logs repeated statements
+    QUERY_PROFILER_ENABLED: bool = False
+    QUERY_PROFILER_DUPLICATE_THRESHOLD: int = 2
+
+    # Sampling profiler endpoint (superusers only) and hot-path span hooks
+    PROFILING_ENABLED: bool = False
+    PROFILING_MAX_SECONDS: int = 60
+    TRACING_ENABLED: bool = False
+
+    # Response compression
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # bytes
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    # Rate limiting ("memory://" or a redis:// URL shared by all workers)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_STORAGE_URL: str = "memory://"
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # Enable behind a trusted proxy
+    RATE_LIMIT_LOGIN: str = "ip:20/minute,account:5/minute,route:600/minute"
+    RATE_LIMIT_REGISTER: str = "ip:5/minute,route:120/minute"
+    RATE_LIMIT_PASSWORD_RESET: str = "ip:5/minute,account:3/hour,route:120/minute"
+    RATE_LIMIT_REFRESH: str = "ip:60/minute,route:1200/minute"
     
+    # Values come from the environment, then backend/.env, then these defaults
     class Config:
-        env_file = ".env"
+        env_file = ENV_FILE
         env_file_encoding = "utf-8"
         case_sensitive = True
+        extra = "ignore"
 
 
 settings = Settings()
@@ -1,20 +1,22 @@
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-import os
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 import logging
 from datetime import datetime
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
 from pydantic import EmailStr, BaseModel
 
 from app.core.config import settings
+from app.core.metrics import record_email
+from app.core.tracing import span
+
+if TYPE_CHECKING:
+    from fastapi_mail import ConnectionConfig, FastMail
+    from jinja2 import Environment
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-# Development mode flag (set to True to print emails instead of sending)
-DEV_MODE = os.getenv("EMAIL_DEV_MODE", "True").lower() == "true"
-
 
 class EmailSchema(BaseModel):
     email: List[EmailStr]
@@ -32,20 +34,55 @@ class EmailContent(BaseModel):
 templates_dir = Path(__file__).parent.parent / "templates" / "emails"
 
 
-# Configuration for FastMail
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_FROM_NAME=settings.MAIL_FROM_NAME,
-    MAIL_STARTTLS=settings.MAIL_STARTTLS,
-    MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
-    USE_CREDENTIALS=settings.MAIL_USE_CREDENTIALS,
-    VALIDATE_CERTS=settings.MAIL_VALIDATE_CERTS,
-    TEMPLATE_FOLDER=templates_dir,
-)
+# fastapi_mail (and the httpx/redis clients it pulls in) is only imported
+# when a real email is sent, never in development mode or at start-up
+@lru_cache(maxsize=None)
+def get_mail_config() -> "ConnectionConfig":
+    """Configuration for FastMail, built on first use."""
+    from fastapi_mail import ConnectionConfig
+
+    return ConnectionConfig(
+        MAIL_USERNAME=settings.MAIL_USERNAME,
+        MAIL_PASSWORD=settings.MAIL_PASSWORD,
+        MAIL_FROM=settings.MAIL_FROM,
+        MAIL_PORT=settings.MAIL_PORT,
+        MAIL_SERVER=settings.MAIL_SERVER,
+        MAIL_FROM_NAME=settings.MAIL_FROM_NAME,
+        MAIL_STARTTLS=settings.MAIL_STARTTLS,
+        MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
+        USE_CREDENTIALS=settings.MAIL_USE_CREDENTIALS,
+        VALIDATE_CERTS=settings.MAIL_VALIDATE_CERTS,
+        TEMPLATE_FOLDER=templates_dir,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_mailer() -> "FastMail":
+    from fastapi_mail import FastMail
+
+    return FastMail(get_mail_config())
+
+
+# FastMail builds a new Jinja environment (and recompiles the template) on
+# every send; templates are rendered here instead from one cached environment
+@lru_cache(maxsize=None)
+def get_template_env() -> "Environment":
+    from jinja2 import Environment, FileSystemLoader
+
+    return Environment(loader=FileSystemLoader(templates_dir))
+
+
+def render_template(template_name: str, template_params: Dict[str, Any]) -> str:
+    return get_template_env().get_template(f"{template_name}.html").render(**template_params)
+
+
+def warm_templates() -> int:
+    """Compile every email template ahead of the first send; returns the count."""
+    env = get_template_env()
+    names = sorted(path.name for path in templates_dir.glob("*.html"))
+    for name in names:
+        env.get_template(name)
+    return len(names)
 
 
 async def send_email(
@@ -69,7 +106,7 @@ async def send_email(
         raise FileNotFoundError(f"Email template {template_name}.html not found")
     
     # In development mode, just log the email details instead of sending
-    if DEV_MODE:
+    if settings.EMAIL_DEV_MODE:
         logger.info("=" * 60)
         logger.info(f"EMAIL SIMULATION at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         logger.info("=" * 60)
@@ -95,22 +132,27 @@ async def send_email(
             print(f"  {key}: {value}")
         print("=" * 60)
         
+        record_email(template_name, "simulated")
         return
     
     # Real email sending in production mode
+    from fastapi_mail import MessageSchema, MessageType
+
     try:
         message = MessageSchema(
             subject=subject,
             recipients=email_to,
-            template_body=template_params,
+            body=render_template(template_name, template_params),
             subtype=MessageType.html,
         )
         
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name=f"{template_name}.html")
+        with span("email.send"):
+            await get_mailer().send_message(message)
         logger.info(f"Email sent to {', '.join(email_to)}, subject: {subject}")
+        record_email(template_name, "sent")
     except Exception as e:
         logger.error(f"Failed to send email: {str(e)}")
+        record_email(template_name, "failed")
         raise
 
 
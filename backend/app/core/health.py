@@ -0,0 +1,235 @@
+"""
+Dependency probes behind ``/ready``.
+
+Probes run in a background task every ``HEALTH_PROBE_INTERVAL`` seconds and
+their last results are cached, so ``/ready`` only reads memory: a load
+balancer polling every second adds no load to Postgres, storage or SMTP.
+
+Each probe call runs on its own daemon thread rather than in the thread
+pool requests use. A probe that outlives ``HEALTH_PROBE_TIMEOUT`` is
+reported as an error, but its thread cannot be stopped, so the probe is not
+started again until that call has returned: a hung dependency costs one
+thread, not one per interval, and does not hold up process exit.
+
+Each probe returns ``"ok"``, ``"error"`` or ``"skipped"`` with its latency.
+The worker is ready while every probe named in ``HEALTH_CRITICAL_PROBES``
+is ok and fresh; other probes are reported but only mark it degraded.
+"""
+import asyncio
+import logging
+import socket
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeSkipped(Exception):
+    """Raised by a probe whose dependency is not in use."""
+
+
+# --- Probes ----------------------------------------------------------------
+
+def probe_database() -> dict:
+    from app.db.session import engine
+
+    pool = engine.pool
+    details = {}
+    if hasattr(pool, "checkedout") and hasattr(pool, "size"):
+        capacity = pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+        details = {"pool_checked_out": pool.checkedout(), "pool_capacity": capacity}
+        # Checking out from an exhausted pool would block for pool_timeout
+        if pool.checkedout() >= capacity:
+            raise RuntimeError(f"connection pool exhausted ({pool.checkedout()}/{capacity})")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return details
+
+
+def probe_cache() -> dict:
+    from app.core.cache import get_cache
+
+    if not get_cache().ping():
+        raise RuntimeError("cache ping failed")
+    return {}
+
+
+def probe_storage() -> dict:
+    from app.core.storage import get_storage_client
+
+    if not get_storage_client().bucket_exists(settings.STORAGE_BUCKET_NAME):
+        raise RuntimeError(f"bucket {settings.STORAGE_BUCKET_NAME} does not exist")
+    return {}
+
+
+def probe_smtp() -> dict:
+    if settings.EMAIL_DEV_MODE:
+        raise ProbeSkipped("email dev mode")
+    # A TCP connect is enough to tell the server is reachable, without
+    # spending an SMTP session on every probe
+    with socket.create_connection(
+        (settings.MAIL_SERVER, settings.MAIL_PORT), timeout=settings.HEALTH_PROBE_TIMEOUT
+    ):
+        pass
+    return {}
+
+
+DEFAULT_PROBES: Dict[str, Callable[[], dict]] = {
+    "database": probe_database,
+    "cache": probe_cache,
+    "storage": probe_storage,
+    "smtp": probe_smtp,
+}
+
+
+# --- Monitor ---------------------------------------------------------------
+
+class HealthMonitor:
+    def __init__(
+        self,
+        probes: Optional[Dict[str, Callable[[], dict]]] = None,
+        interval: float = 5.0,
+        timeout: float = 2.0,
+        critical: Iterable[str] = ("database", "cache"),
+    ):
+        self.probes = dict(DEFAULT_PROBES if probes is None else probes)
+        self.interval = interval
+        self.timeout = timeout
+        self.critical = set(critical)
+        self.results: Dict[str, dict] = {}
+        self.last_run: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        # name -> (start, thread) of the last call of each probe
+        self._calls: Dict[str, Tuple[float, threading.Thread]] = {}
+
+    def _start(self, name: str, probe: Callable[[], dict]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Nobody awaits a call that has timed out; do not log its error
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+        def settle(result: Optional[dict], error: Optional[BaseException]) -> None:
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        def run() -> None:
+            result, error = None, None
+            try:
+                result = probe()
+            except BaseException as e:
+                error = e
+            try:
+                loop.call_soon_threadsafe(settle, result, error)
+            except RuntimeError:
+                pass  # The loop has closed
+
+        thread = threading.Thread(target=run, name=f"health-probe-{name}", daemon=True)
+        self._calls[name] = (time.perf_counter(), thread)
+        thread.start()
+        return future
+
+    async def _probe(self, name: str, probe: Callable[[], dict]) -> dict:
+        call = self._calls.get(name)
+        if call is not None and call[1].is_alive():
+            elapsed = time.perf_counter() - call[0]
+            return {"status": "error", "error": f"still running after {elapsed:.1f}s",
+                    "latency_ms": round(elapsed * 1000, 2)}
+
+        start = time.perf_counter()
+        future = self._start(name, probe)
+        try:
+            # Shielded: timing out must not mark the call done while it runs
+            details = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            result = {"status": "ok", **(details or {})}
+        except ProbeSkipped as e:
+            result = {"status": "skipped", "reason": str(e)}
+        except asyncio.TimeoutError:
+            result = {"status": "error", "error": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            result = {"status": "error", "error": str(e)}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        if result["status"] == "error" and self.results.get(name, {}).get("status") != "error":
+            logger.warning(f"Health probe {name} failed: {result['error']}")
+        return result
+
+    async def run_once(self) -> Dict[str, dict]:
+        """Run every probe concurrently and cache the results."""
+        names = list(self.probes)
+        outcomes = await asyncio.gather(*(self._probe(name, self.probes[name]) for name in names))
+        self.results = dict(zip(names, outcomes))
+        self.last_run = time.monotonic()
+        return self.results
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:  # pragma: no cover - run_once catches probe errors
+                logger.error(f"Health probes failed: {e}")
+
+    async def start(self) -> None:
+        """Run a first round, then keep probing in the background."""
+        await self.run_once()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def stale(self) -> bool:
+        # The loop itself is stuck or dead if results are this old
+        return self.last_run is None or time.monotonic() - self.last_run > 3 * self.interval + self.timeout
+
+    def failing(self) -> List[str]:
+        """Critical probes that are failing or have no result yet."""
+        return sorted(
+            name for name in self.critical
+            if name in self.probes and self.results.get(name, {}).get("status") not in ("ok", "skipped")
+        )
+
+    def snapshot(self) -> dict:
+        failing = self.failing()
+        degraded = any(r["status"] == "error" for r in self.results.values())
+        if self.stale or failing:
+            status = "unavailable"
+        else:
+            status = "degraded" if degraded else "ready"
+        age = None if self.last_run is None else round(time.monotonic() - self.last_run, 2)
+        return {"status": status, "checked_seconds_ago": age, "checks": self.results}
+
+
+_monitor: Optional[HealthMonitor] = None
+
+
+def get_health_monitor() -> HealthMonitor:
+    """Return the process-wide health monitor, creating it on first use."""
+    global _monitor
+    if _monitor is None:
+        _monitor = HealthMonitor(
+            interval=settings.HEALTH_PROBE_INTERVAL,
+            timeout=settings.HEALTH_PROBE_TIMEOUT,
+            critical=settings.HEALTH_CRITICAL_PROBES,
+        )
+    return _monitor
+
+
+def set_health_monitor(monitor: Optional[HealthMonitor]) -> None:
+    """Replace the process-wide health monitor (used by tests)."""
+    global _monitor
+    _monitor = monitor
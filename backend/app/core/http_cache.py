@@ -0,0 +1,87 @@
+"""
+HTTP conditional request helpers (ETag / Last-Modified / Cache-Control).
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response, status
+
+from app.core.responses import ModelResponse
+
+
+def weak_etag(*parts: Any) -> str:
+    """Build a weak ETag such as ``W/"42-1700000000000000"`` from ``parts``."""
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def user_etag(user) -> str:
+    """ETag for a user profile, derived from its id and last modification."""
+    modified = user.updated_at or user.created_at
+    stamp = int(modified.timestamp() * 1_000_000) if modified else 0
+    return weak_etag(user.id, stamp)
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str,
+                    last_modified: Optional[datetime] = None) -> bool:
+    """
+    Evaluate ``If-None-Match`` / ``If-Modified-Since`` (RFC 9110, weak comparison).
+
+    ``If-Modified-Since`` is only considered when ``If-None-Match`` is absent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        wanted = _strip_weak(etag)
+        return any(_strip_weak(tag) == wanted for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP dates have one second resolution
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def conditional_response(
+    request: Request,
+    content: Any,
+    response_model: Any,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: Optional[str] = None,
+    vary: Optional[str] = None,
+) -> Response:
+    """
+    Return ``304 Not Modified`` if the client's validators match, otherwise
+    serialize ``content`` with ``ModelResponse``. The body is only built on
+    a miss.
+    """
+    headers: Dict[str, str] = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if vary:
+        headers["Vary"] = vary
+
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return ModelResponse(content, response_model, headers=headers)
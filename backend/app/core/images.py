@@ -0,0 +1,306 @@
+"""
+On-demand image derivatives behind signed URLs.
+
+``image_url()`` signs a (source key, size, format, quality, expiry) tuple
+with HMAC-SHA256; ``GET /images/{key}`` checks the signature and serves the
+derivative, so no size is rendered until someone asks for it and nobody can
+ask for sizes outside the ``IMAGE_SIZES`` / ``IMAGE_FORMATS`` /
+``IMAGE_QUALITIES`` whitelist.
+
+A derivative is looked up in the local disk cache, then in the bucket under
+``derivatives/``, and only then rendered with Pillow in a process pool
+(resizing is CPU bound and would hold the GIL for the whole event loop).
+Concurrent requests for the same derivative in one process wait on a single
+render instead of each starting their own, and a source that cannot be
+decoded is remembered in the shared cache for ``IMAGE_FAILURE_TTL_SECONDS``
+so requests for it are refused without rendering again.
+"""
+import asyncio
+import hashlib
+import hmac
+import io
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.core.storage import NoSuchKey, get_object_store
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+
+_DAY = 24 * 60 * 60
+
+
+# --- Signed URLs -------------------------------------------------------------
+
+def parse_size(size: str) -> Tuple[int, int]:
+    width, _, height = size.partition("x")
+    return int(width), int(height or 0)
+
+
+def is_allowed(width: int, height: int, fmt: str, quality: int) -> bool:
+    return (
+        f"{width}x{height}" in settings.IMAGE_SIZES
+        and fmt in settings.IMAGE_FORMATS
+        and quality in settings.IMAGE_QUALITIES
+    )
+
+
+def _signature(key: str, width: int, height: int, fmt: str, quality: int, expires: int) -> str:
+    secret = (settings.IMAGE_SIGNING_KEY or settings.SECRET_KEY).encode()
+    message = f"{key}\n{width}\n{height}\n{fmt}\n{quality}\n{expires}".encode()
+    return hmac.new(secret, message, hashlib.sha256).hexdigest()[:32]
+
+
+def url_expiry(now: Optional[float] = None) -> int:
+    """``IMAGE_URL_TTL_SECONDS`` from now, rounded up to a whole day so URLs repeat."""
+    now = time.time() if now is None else now
+    return math.ceil((now + settings.IMAGE_URL_TTL_SECONDS) / _DAY) * _DAY
+
+
+def image_url(key: str, size: str, fmt: Optional[str] = None, quality: Optional[int] = None) -> str:
+    """Signed URL of ``key`` resized to ``size`` (an ``IMAGE_SIZES`` entry)."""
+    width, height = parse_size(size)
+    fmt = fmt or settings.IMAGE_DEFAULT_FORMAT
+    quality = quality or settings.IMAGE_DEFAULT_QUALITY
+    expires = url_expiry()
+    query = urlencode({
+        "w": width, "h": height, "fmt": fmt, "q": quality, "exp": expires,
+        "sig": _signature(key, width, height, fmt, quality, expires),
+    })
+    return f"{settings.API_V1_STR}/images/{quote(key)}?{query}"
+
+
+def image_urls(key: str) -> Dict[str, str]:
+    """Signed URLs of every ``IMAGE_PRESETS`` size of ``key``."""
+    return {name: image_url(key, size) for name, size in settings.IMAGE_PRESETS.items()}
+
+
+def verify(key: str, width: int, height: int, fmt: str, quality: int, expires: int,
+           signature: str) -> bool:
+    if expires < time.time():
+        return False
+    expected = _signature(key, width, height, fmt, quality, expires)
+    return hmac.compare_digest(expected, signature)
+
+
+def derivative_key(key: str, width: int, height: int, fmt: str, quality: int) -> str:
+    return f"derivatives/{key}/{width}x{height}-q{quality}.{fmt}"
+
+
+def _failure_cache_key(key: str) -> str:
+    return f"image:unreadable:{key}"
+
+
+# --- Rendering (runs in the process pool) ------------------------------------
+
+def render(data: bytes, width: int, height: int, fmt: str, quality: int,
+           centering: Tuple[float, float] = (0.5, 0.5)) -> bytes:
+    """
+    Resize an encoded image. With both dimensions the image is scaled to
+    cover ``width`` x ``height`` and cropped around ``centering``; with a 0
+    height it is scaled to ``width``, keeping its aspect ratio. Images are
+    never upscaled. Raises ValueError for anything Pillow cannot decode.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_SOURCE_PIXELS
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            # JPEGs decode at 1/2, 1/4 or 1/8 scale when that is still big enough
+            side = max(width, height)
+            source.draft("RGB", (side, side))
+            image = ImageOps.exif_transpose(source)
+            if height:
+                image = ImageOps.fit(image, (width, height), Image.LANCZOS, centering=centering)
+            elif image.width > width:
+                size = (width, max(1, round(image.height * width / image.width)))
+                image = image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+            if fmt == "jpeg" and image.mode != "RGB":
+                if image.mode in ("RGBA", "LA", "P"):
+                    image = image.convert("RGBA")
+                    background = Image.new("RGB", image.size, (255, 255, 255))
+                    background.paste(image, mask=image.getchannel("A"))
+                    image = background
+                else:
+                    image = image.convert("RGB")
+            elif image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+            out = io.BytesIO()
+            if fmt == "jpeg":
+                image.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+            elif fmt == "webp":
+                image.save(out, "WEBP", quality=quality, method=4)
+            else:
+                image.save(out, "PNG", optimize=True)
+            return out.getvalue()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        # OSError: truncated or corrupt data, found while decoding
+        raise ValueError(f"Unreadable image: {e}")
+
+
+# --- Local disk cache --------------------------------------------------------
+
+class DiskCache:
+    """
+    Derivatives on local disk. Reads touch the file's mtime; once the cache
+    grows past ``max_bytes`` the least recently used files are deleted down
+    to 90% of it.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    def _path(self, name: str) -> Path:
+        digest = hashlib.sha256(name.encode()).hexdigest()
+        return self.directory / digest[:2] / digest
+
+    def _files(self):
+        return [path for path in self.directory.glob("*/*") if path.is_file()]
+
+    def get(self, name: str) -> Optional[bytes]:
+        path = self._path(name)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def set(self, name: str, data: bytes) -> None:
+        path = self._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._size is None:
+                self._size = sum(p.stat().st_size for p in self._files())
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        size = sum(entry[1] for entry in entries)
+        target = self.max_bytes * 0.9
+        for _, file_size, path in entries:
+            if size <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            size -= file_size
+        self._size = size
+
+
+# --- Pipeline ----------------------------------------------------------------
+
+class ImagePipeline:
+    def __init__(self, executor: Optional[Executor] = None, disk: Optional[DiskCache] = None):
+        self._executor = executor
+        self.disk = disk or DiskCache(settings.IMAGE_CACHE_DIR, settings.IMAGE_CACHE_MAX_BYTES)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+        return self._executor
+
+    async def get(self, key: str, width: int, height: int, fmt: str, quality: int) -> bytes:
+        """
+        The derivative's bytes. Raises ``NoSuchKey`` if the source does not
+        exist and ValueError if it is not an image.
+        """
+        name = derivative_key(key, width, height, fmt, quality)
+        data = await run_in_threadpool(self.disk.get, name)
+        if data is not None:
+            return data
+        task = self._inflight.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self._produce(name, key, width, height, fmt, quality))
+            self._inflight[name] = task
+            task.add_done_callback(lambda _: self._inflight.pop(name, None))
+        # A client going away must not cancel the render the others wait for
+        return await asyncio.shield(task)
+
+    async def _produce(self, name: str, key: str, width: int, height: int, fmt: str,
+                       quality: int) -> bytes:
+        store = get_object_store()
+        try:
+            data = await run_in_threadpool(store.get, name)
+        except NoSuchKey:
+            cache = get_cache()
+            failure = await run_in_threadpool(cache.get, _failure_cache_key(key))
+            if failure is not None:
+                raise ValueError(failure)
+            source = await run_in_threadpool(store.get, key)
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            try:
+                data = await loop.run_in_executor(self.executor, render, source, width, height, fmt, quality)
+            except ValueError as e:
+                # Every size of it would fail the same way
+                await run_in_threadpool(cache.set, _failure_cache_key(key), str(e),
+                                        settings.IMAGE_FAILURE_TTL_SECONDS)
+                raise
+            logger.debug(f"Rendered {name} in {(time.perf_counter() - start) * 1000:.0f}ms")
+            await run_in_threadpool(store.put, name, data, CONTENT_TYPES[fmt])
+        await run_in_threadpool(self.disk.set, name, data)
+        return data
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_pipeline: Optional[ImagePipeline] = None
+
+
+def get_image_pipeline() -> ImagePipeline:
+    """Return the process-wide image pipeline, creating it on first use."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = ImagePipeline()
+    return _pipeline
+
+
+def set_image_pipeline(pipeline: Optional[ImagePipeline]) -> None:
+    """Replace the process-wide image pipeline (used by tests)."""
+    global _pipeline
+    _pipeline = pipeline
+
+
+def close_image_pipeline() -> None:
+    """Shut down the render processes."""
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.close()
+        _pipeline = None
@@ -0,0 +1,225 @@
+"""
+Application start-up and shutdown.
+
+On start-up the shared clients are built and warmed before the worker
+reports ready: a few DB pool connections are opened, email templates
+compiled, the password hashing backend and JWT crypto loaded, the cache and
+storage clients created and the autocomplete trie built. Steps run
+concurrently in the thread pool; a failing step is logged and does not
+prevent start-up.
+
+uvicorn (and gunicorn's uvicorn workers) close the listener on SIGTERM and
+wait for open requests before lifespan shutdown runs, so flipping readiness
+there is too late for a load balancer to notice. The server in
+``app.core.server`` therefore marks the worker not ready on SIGTERM and
+keeps serving for ``SHUTDOWN_PRESTOP_SECONDS`` first. Lifespan shutdown
+waits up to ``SHUTDOWN_DRAIN_SECONDS`` for anything still in flight, then
+closes the pools.
+
+``/health`` is liveness (the process is up); ``/ready`` is readiness (warm,
+not draining and critical dependencies reachable, see ``app.core.health``)
+and is what load balancers should route on.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.health import get_health_monitor
+
+logger = logging.getLogger(__name__)
+
+
+class AppState:
+    def __init__(self):
+        self.ready = False
+        self.draining = False
+        self.in_flight = 0
+        self.warmup: Dict[str, dict] = {}
+
+
+state = AppState()
+
+
+class RequestTrackerMiddleware:
+    """Counts in-flight HTTP requests so shutdown can wait for them."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        state.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            state.in_flight -= 1
+
+
+# --- Warm-up steps ---------------------------------------------------------
+
+def warm_database(connections: Optional[int] = None) -> int:
+    """Open ``connections`` pool connections so early requests skip the handshake."""
+    from app.db.session import engine
+
+    count = settings.WARMUP_DB_CONNECTIONS if connections is None else connections
+    opened = []
+    try:
+        for _ in range(count):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        # Closing returns them to the pool, where they stay open
+        for conn in opened:
+            conn.close()
+    return count
+
+
+def warm_templates() -> int:
+    from app.core.email import warm_templates
+
+    return warm_templates()
+
+
+def warm_password_hashing() -> str:
+    from app.core.security import get_pwd_context
+
+    # Loads and self-tests the bcrypt backend, which the first hash pays for
+    context = get_pwd_context()
+    context.hash("warm-up")
+    return context.default_scheme()
+
+
+def warm_jwt() -> bool:
+    from app.core.security import create_access_token, decode_access_token
+
+    return bool(decode_access_token(create_access_token({"sub": "0"})))
+
+
+def warm_cache() -> bool:
+    from app.core.cache import get_cache
+
+    return get_cache().ping()
+
+
+def warm_storage() -> str:
+    # Client construction only; reachability is a readiness concern
+    from app.core.storage import get_storage_client
+
+    get_storage_client()
+    return settings.STORAGE_ENDPOINT
+
+
+def warm_autocomplete() -> int:
+    from app.core.autocomplete import get_handle_cache
+    from app.crud.user import refresh_handle_cache
+    from app.db.session import engine
+
+    with Session(bind=engine) as db:
+        refresh_handle_cache(db)
+    return len(get_handle_cache().trie)
+
+
+def warm_email() -> bool:
+    if settings.EMAIL_DEV_MODE:
+        return False
+    from app.core.email import get_mailer
+
+    get_mailer()
+    return True
+
+
+WARMUP_STEPS: List[Tuple[str, Callable[[], object]]] = [
+    ("database", warm_database),
+    ("templates", warm_templates),
+    ("password_hashing", warm_password_hashing),
+    ("jwt", warm_jwt),
+    ("cache", warm_cache),
+    ("storage", warm_storage),
+    ("autocomplete", warm_autocomplete),
+    ("email", warm_email),
+]
+
+
+async def _run_step(name: str, step: Callable[[], object]) -> dict:
+    start = time.perf_counter()
+    try:
+        result = await run_in_threadpool(step)
+        outcome = {"ok": True, "result": result}
+    except Exception as e:
+        logger.warning(f"Warm-up step {name} failed: {e}")
+        outcome = {"ok": False, "error": str(e)}
+    outcome["ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return outcome
+
+
+async def warm_up(steps: Optional[List[Tuple[str, Callable[[], object]]]] = None) -> Dict[str, dict]:
+    """Run the warm-up steps concurrently; returns per-step outcome and duration."""
+    steps = WARMUP_STEPS if steps is None else steps
+    outcomes = await asyncio.gather(*(_run_step(name, step) for name, step in steps))
+    results = dict(zip((name for name, _ in steps), outcomes))
+    logger.info(
+        "Warm-up finished: "
+        + ", ".join(f"{name} {r['ms']:.0f}ms{'' if r['ok'] else ' (failed)'}" for name, r in results.items())
+    )
+    return results
+
+
+# --- Shutdown --------------------------------------------------------------
+
+async def drain(timeout: float) -> bool:
+    """Wait until no request is in flight; returns False on timeout."""
+    deadline = time.monotonic() + timeout
+    while state.in_flight > 0:
+        if time.monotonic() >= deadline:
+            logger.warning(f"Shutdown drain timed out with {state.in_flight} requests in flight")
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+def close_clients() -> None:
+    from app.core.cache import get_cache
+    from app.core.images import close_image_pipeline
+    from app.core.storage import close_storage_client
+    from app.db.session import engine
+
+    for name, close in (
+        ("database", engine.dispose),
+        ("cache", lambda: get_cache().close()),
+        ("storage", close_storage_client),
+        ("images", close_image_pipeline),
+    ):
+        try:
+            close()
+        except Exception as e:
+            logger.warning(f"Closing {name} failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    state.draining = False
+    if settings.WARMUP_ENABLED:
+        state.warmup = await warm_up()
+    if settings.HEALTH_PROBES_ENABLED:
+        await get_health_monitor().start()
+    state.ready = True
+    try:
+        yield
+    finally:
+        state.ready = False
+        state.draining = True
+        if settings.HEALTH_PROBES_ENABLED:
+            await get_health_monitor().stop()
+        await drain(settings.SHUTDOWN_DRAIN_SECONDS)
+        await run_in_threadpool(close_clients)
@@ -0,0 +1,212 @@
+"""
+Prometheus/OpenMetrics instrumentation.
+
+Metrics are recorded with ``prometheus_client``. When the
+``PROMETHEUS_MULTIPROC_DIR`` environment variable points at a writable
+directory (required under gunicorn with several uvicorn workers), every
+worker writes its samples to mmap'd files there and ``/metrics`` aggregates
+them, so whichever worker answers the scrape reports the whole server.
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    REGISTRY,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0,
+)
+DB_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+HTTP_REQUESTS = Counter(
+    "snapwave_http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "snapwave_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_PROGRESS = Gauge(
+    "snapwave_http_requests_in_progress",
+    "HTTP requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_QUERIES = Counter(
+    "snapwave_db_queries_total",
+    "Database statements executed by operation",
+    ["operation"],
+)
+DB_QUERY_LATENCY = Histogram(
+    "snapwave_db_query_duration_seconds",
+    "Database statement latency by operation",
+    ["operation"],
+    buckets=DB_LATENCY_BUCKETS,
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "snapwave_db_queries_per_request",
+    "Database statements executed while serving one HTTP request",
+    ["route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "snapwave_db_time_per_request_seconds",
+    "Total database time spent while serving one HTTP request",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+EMAILS_SENT = Counter(
+    "snapwave_emails_total",
+    "Emails by template and outcome (sent, failed, simulated)",
+    ["template", "outcome"],
+)
+RATE_LIMIT_DECISIONS = Counter(
+    "snapwave_rate_limit_decisions_total",
+    "Rate limiter decisions by scope, key and outcome",
+    ["scope", "key", "decision"],
+)
+SPAN_DURATION = Histogram(
+    "snapwave_span_duration_seconds",
+    "Duration of traced hot-path spans (hashing, JWT, DB, email)",
+    ["span"],
+    buckets=DB_LATENCY_BUCKETS + (5.0,),
+)
+
+
+class _RequestDBStats:
+    __slots__ = ("queries", "duration")
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+
+# DB statistics of the request being served in the current task
+_request_db_stats: ContextVar[Optional[_RequestDBStats]] = ContextVar(
+    "request_db_stats", default=None
+)
+
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return word if word in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    operation = _operation(statement)
+    DB_QUERIES.labels(operation).inc()
+    DB_QUERY_LATENCY.labels(operation).observe(duration)
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.duration += duration
+
+
+def _handle_error(context):
+    starts = context.connection.info.get("metrics_query_start") if context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Record statement counts and latencies for ``engine``."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def record_email(template: str, outcome: str) -> None:
+    EMAILS_SENT.labels(template, outcome).inc()
+
+
+def record_rate_limit(scope: str, key: str, decision: str) -> None:
+    RATE_LIMIT_DECISIONS.labels(scope, key, decision).inc()
+
+
+def _route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if path else "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status codes and in-flight requests."""
+
+    def __init__(self, app: ASGIApp, exclude_paths=("/metrics",)) -> None:
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        stats = _RequestDBStats()
+        token = _request_db_stats.set(stats)
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            in_progress.dec()
+            _request_db_stats.reset(token)
+            route = _route_template(scope)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            HTTP_LATENCY.labels(method, route).observe(duration)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.queries)
+            DB_TIME_PER_REQUEST.labels(route).observe(stats.duration)
+
+
+def metrics_registry() -> CollectorRegistry:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Expose metrics in the Prometheus text format."""
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,293 @@
+"""
+Token-bucket rate limiting for sensitive endpoints.
+
+Buckets live in process memory for single-node setups or in Redis (updated
+atomically by a Lua script) when several workers or hosts share the limits.
+Limits are declared per route as a spec such as
+``"ip:20/minute,account:5/minute,route:600/minute"``.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+
+from app.core.config import settings
+from app.core.metrics import record_rate_limit
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 60 * 60,
+    "day": 60 * 60 * 24,
+}
+_RATE_RE = re.compile(r"^(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?$")
+
+
+@dataclass(frozen=True)
+class Rate:
+    limit: int
+    period: float
+
+    @property
+    def per_second(self) -> float:
+        return self.limit / self.period
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+
+
+def parse_rate(value: str) -> Rate:
+    """Parse ``"5/minute"`` (or ``"5/10seconds"``) into a ``Rate``."""
+    match = _RATE_RE.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid rate limit: {value}")
+    count, multiplier, unit = match.groups()
+    return Rate(limit=int(count), period=int(multiplier or 1) * _PERIODS[unit])
+
+
+def parse_limits(spec: str) -> Dict[str, Rate]:
+    """Parse ``"ip:20/minute,account:5/minute"`` into ``{"ip": Rate, ...}``."""
+    limits = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        dimension, _, rate = part.partition(":")
+        if dimension not in ("ip", "account", "route"):
+            raise ValueError(f"Unknown rate limit key '{dimension}' in {spec}")
+        limits[dimension] = parse_rate(rate)
+    return limits
+
+
+# --- Backends --------------------------------------------------------------
+
+class MemoryRateLimitBackend:
+    """In-process token buckets, bounded to ``max_keys`` most recent keys."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, rate: Rate, cost: int = 1) -> Decision:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (float(rate.limit), now))
+            tokens = min(rate.limit, tokens + (now - last) * rate.per_second)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        retry_after = 0.0 if allowed else (cost - tokens) / rate.per_second
+        return Decision(allowed, rate.limit, int(tokens), retry_after)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+# KEYS[1] bucket key; ARGV: capacity, refill tokens/second, cost.
+# Uses the server clock so every worker sees the same time.
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class RedisRateLimitBackend:
+    """Token buckets shared through Redis and updated by a Lua script."""
+
+    def __init__(self, url: str, prefix: str = "snapwave:ratelimit:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(_TOKEN_BUCKET_LUA)
+
+    def hit(self, key: str, rate: Rate, cost: int = 1) -> Decision:
+        allowed, tokens, retry_after = self._script(
+            keys=[f"{self.prefix}{key}"],
+            args=[rate.limit, rate.per_second, cost],
+        )
+        return Decision(bool(allowed), rate.limit, int(float(tokens)), float(retry_after))
+
+    def reset(self) -> None:
+        for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+def backend_from_url(url: str):
+    if url.startswith("memory://"):
+        return MemoryRateLimitBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRateLimitBackend(url)
+    raise ValueError(f"Unsupported rate limit storage URL: {url}")
+
+
+# --- Limiter ---------------------------------------------------------------
+
+class RateLimiter:
+    """Checks buckets and keeps per-scope decision counters."""
+
+    def __init__(self, backend, enabled: bool = True, fail_open: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.fail_open = fail_open
+        self.stats: Dict[Tuple[str, str, str], int] = defaultdict(int)
+
+    def check(self, scope: str, keys: List[Tuple[str, str]],
+              limits: Dict[str, Rate]) -> Optional[Decision]:
+        """
+        Consume one token from every applicable bucket.
+
+        Args:
+            scope: Route name, e.g. ``"login"``
+            keys: ``(dimension, identifier)`` pairs such as ``("ip", "1.2.3.4")``
+            limits: Rates per dimension as returned by ``parse_limits``
+
+        Returns the most restrictive decision, or ``None`` when disabled.
+        """
+        if not self.enabled:
+            return None
+        tightest: Optional[Decision] = None
+        for dimension, identifier in keys:
+            rate = limits.get(dimension)
+            if rate is None:
+                continue
+            try:
+                decision = self.backend.hit(f"{scope}:{dimension}:{identifier}", rate)
+            except Exception as e:
+                logger.error(f"Rate limit backend failed for {scope}: {e}")
+                if self.fail_open:
+                    continue
+                raise
+            outcome = "allowed" if decision.allowed else "rejected"
+            self.stats[(scope, dimension, outcome)] += 1
+            record_rate_limit(scope, dimension, outcome)
+            if not decision.allowed:
+                logger.warning(
+                    f"Rate limit exceeded: scope={scope} key={dimension} "
+                    f"retry_after={decision.retry_after:.1f}s"
+                )
+                return decision
+            if tightest is None or decision.remaining < tightest.remaining:
+                tightest = decision
+        return tightest
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter, creating it on first use."""
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(
+            backend_from_url(settings.RATE_LIMIT_STORAGE_URL),
+            enabled=settings.RATE_LIMIT_ENABLED,
+        )
+    return _limiter
+
+
+def set_rate_limiter(limiter: Optional[RateLimiter]) -> None:
+    """Replace the process-wide rate limiter (used by tests)."""
+    global _limiter
+    _limiter = limiter
+
+
+def client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def _account_identifier(request: Request) -> Optional[str]:
+    # FastAPI has already read the body at this point, so these are cached
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith(("application/x-www-form-urlencoded", "multipart/form-data")):
+            data = await request.form()
+        elif content_type.startswith("application/json"):
+            data = await request.json()
+        else:
+            return None
+    except Exception:
+        return None
+    if not isinstance(data, dict) and not hasattr(data, "get"):
+        return None
+    for field in ("username", "email"):
+        value = data.get(field)
+        if isinstance(value, str) and value:
+            return value.strip().lower()
+    return None
+
+
+class RateLimit:
+    """
+    Route dependency enforcing the limits in ``spec``.
+
+    Use it in the route decorator so it runs before the DB session or any
+    password hashing::
+
+        @router.post("/login", dependencies=[Depends(RateLimit("login", settings.RATE_LIMIT_LOGIN))])
+    """
+
+    def __init__(self, scope: str, spec: str):
+        self.scope = scope
+        self.limits = parse_limits(spec)
+
+    async def __call__(self, request: Request, response: Response) -> None:
+        keys = [("route", "all"), ("ip", client_ip(request))]
+        if "account" in self.limits:
+            account = await _account_identifier(request)
+            if account:
+                keys.append(("account", account))
+
+        decision = get_rate_limiter().check(self.scope, keys, self.limits)
+        if decision is None:
+            return
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please try again later",
+                headers={
+                    "Retry-After": str(max(1, math.ceil(decision.retry_after))),
+                    "X-RateLimit-Limit": str(decision.limit),
+                    "X-RateLimit-Remaining": "0",
+                },
+            )
+        response.headers["X-RateLimit-Limit"] = str(decision.limit)
+        response.headers["X-RateLimit-Remaining"] = str(decision.remaining)
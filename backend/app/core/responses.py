@@ -0,0 +1,40 @@
+"""
+JSON response helpers built on pydantic v2's serializer.
+
+``ModelResponse`` validates ORM objects through a cached ``TypeAdapter`` and
+writes JSON bytes with ``dump_json`` in a single pass, instead of FastAPI's
+validate -> ``dump_python`` -> ``json.dumps`` route for ``response_model``.
+Endpoints still declare ``response_model`` so the OpenAPI schema is unchanged.
+"""
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    """Return a cached ``TypeAdapter`` for ``tp`` (building one is expensive)."""
+    return TypeAdapter(tp)
+
+
+class ModelResponse(Response):
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        response_model: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        exclude_unset: bool = False,
+    ) -> None:
+        self.response_model = response_model
+        self.exclude_unset = exclude_unset
+        super().__init__(content, status_code=status_code, headers=headers)
+
+    def render(self, content: Any) -> bytes:
+        adapter = type_adapter(self.response_model)
+        value = adapter.validate_python(content, from_attributes=True)
+        return adapter.dump_json(value, exclude_unset=self.exclude_unset)
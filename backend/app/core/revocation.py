@@ -0,0 +1,148 @@
+"""
+Access token revocation set.
+
+Revocations are stored in the ``token_revocations`` table (see
+``app.crud.token``); every worker mirrors them into an in-memory bloom
+filter refreshed every ``REVOCATION_SYNC_SECONDS``. Checking a token is
+then a handful of bit lookups, and only the rare filter hits (real
+revocations or false positives) are confirmed against the database.
+
+Keys are ``"jti:<token id>"`` for a single access token and
+``"user:<id>"`` for every token a user was issued before the revocation.
+"""
+import hashlib
+import math
+import threading
+import time
+from typing import Iterable, Optional
+
+from app.core.config import settings
+
+
+class BloomFilter:
+    """Fixed-size bloom filter using double hashing over one blake2b digest."""
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def jti_key(jti: str) -> str:
+    return f"jti:{jti}"
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+class RevocationList:
+    """
+    Process-local view of the revocation table.
+
+    ``needs_sync``/``needs_rebuild`` tell the caller when to pull from the
+    store; ``merge`` adds entries incrementally and ``rebuild`` replaces the
+    filter, dropping entries that have expired since the last rebuild.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 100_000,
+        error_rate: float = 0.001,
+        sync_interval: float = 5.0,
+        rebuild_interval: float = 3600.0,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self.last_sync: Optional[float] = None
+        self.last_rebuild: Optional[float] = None
+        # Wall-clock time of the last sync; incremental pulls start here
+        self.watermark: Optional[float] = None
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            self._bloom.add(key)
+
+    def might_contain(self, key: str) -> bool:
+        return key in self._bloom
+
+    def needs_sync(self) -> bool:
+        return self.last_sync is None or time.monotonic() - self.last_sync >= self.sync_interval
+
+    def needs_rebuild(self) -> bool:
+        return (
+            self.last_rebuild is None
+            or time.monotonic() - self.last_rebuild >= self.rebuild_interval
+        )
+
+    def merge(self, keys: Iterable[str], watermark: float) -> None:
+        with self._lock:
+            for key in keys:
+                self._bloom.add(key)
+            self.watermark = watermark
+            self.last_sync = time.monotonic()
+
+    def rebuild(self, keys: Iterable[str], watermark: float) -> None:
+        keys = list(keys)
+        # Grow the filter rather than let the false positive rate climb
+        bloom = BloomFilter(max(self.capacity, 2 * len(keys)), self.error_rate)
+        for key in keys:
+            bloom.add(key)
+        with self._lock:
+            self._bloom = bloom
+            self.watermark = watermark
+            self.last_sync = self.last_rebuild = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._bloom)
+
+
+_revocations: Optional[RevocationList] = None
+
+
+def get_revocation_list() -> RevocationList:
+    """Return the process-wide revocation list, creating it on first use."""
+    global _revocations
+    if _revocations is None:
+        _revocations = RevocationList(
+            capacity=settings.REVOCATION_BLOOM_CAPACITY,
+            error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+            sync_interval=settings.REVOCATION_SYNC_SECONDS,
+            rebuild_interval=settings.REVOCATION_REBUILD_SECONDS,
+        )
+    return _revocations
+
+
+def set_revocation_list(revocations: Optional[RevocationList]) -> None:
+    """Replace the process-wide revocation list (used by tests)."""
+    global _revocations
+    _revocations = revocations
@@ -0,0 +1,110 @@
+"""
+Sampling CPU profiler producing flamegraph-compatible collapsed stacks.
+
+In the main thread the sampler uses ``SIGPROF`` with ``ITIMER_PROF``, so
+samples are taken in proportion to CPU time actually burned by the process.
+Elsewhere (signals can only be installed from the main thread) it falls
+back to a background thread polling ``sys._current_frames()`` on a wall
+clock interval.
+
+Output is one line per unique stack, ``frame;frame;frame count``, which
+``flamegraph.pl`` and speedscope read directly.
+"""
+import os
+import signal
+import sys
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+_MAX_DEPTH = 128
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    for path in sys.path:
+        if path and filename.startswith(path):
+            filename = filename[len(path):].lstrip(os.sep)
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None and len(labels) < _MAX_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    def __init__(self, interval: float = 0.005, mode: str = "auto"):
+        self.interval = interval
+        if mode == "auto":
+            mode = "signal" if self.can_use_signal() else "thread"
+        self.mode = mode
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._previous_handler = None
+        self._ignore_thread: Optional[int] = None
+
+    @staticmethod
+    def can_use_signal() -> bool:
+        return hasattr(signal, "SIGPROF") and threading.current_thread() is threading.main_thread()
+
+    def _record(self, frames: Dict[int, object]) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in frames.items():
+            if thread_id == self._ignore_thread:
+                continue
+            stack = _collapse(frame)
+            if stack:
+                self.samples[f"{names.get(thread_id, thread_id)};{stack}"] += 1
+        self.sample_count += 1
+
+    def _on_signal(self, signum, frame) -> None:
+        self._record(sys._current_frames())
+
+    def _run_thread(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._record(sys._current_frames())
+
+    def start(self) -> None:
+        if self.mode == "signal":
+            self._previous_handler = signal.signal(signal.SIGPROF, self._on_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run_thread, name="stack-sampler", daemon=True
+            )
+            self._thread.start()
+            self._ignore_thread = self._thread.ident
+
+    def stop(self) -> None:
+        if self.mode == "signal":
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        elif self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format, most frequent first."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def __enter__(self) -> "StackSampler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+# Only one profile may run per worker at a time
+profile_lock = threading.Lock()
+
@@ -1,32 +1,135 @@
-from passlib.context import CryptContext
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta, timezone
-from jose import jwt
+import hashlib
+import secrets
+import uuid
+from jose.exceptions import JWTError
 
 from app.core.config import settings
+from app.core.tracing import span
 
+# passlib and jose.jwt (which loads the cryptography backends) are imported
+# on first use to keep them out of worker start-up
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def build_crypt_context(
+    schemes: List[str],
+    bcrypt_rounds: int = 12,
+    argon2_time_cost: int = 2,
+    argon2_memory_cost: int = 65536,
+    argon2_parallelism: int = 2,
+) -> "CryptContext":
+    """
+    Build the password hashing context.
+
+    The first scheme hashes new passwords; the others (and bcrypt, so
+    existing hashes keep verifying) are marked deprecated. Hashes made with a
+    deprecated scheme or different cost parameters report ``needs_update``
+    and are rehashed on the next successful login.
+    """
+    from passlib.context import CryptContext
+
+    schemes = list(schemes)
+    if "bcrypt" not in schemes:
+        schemes.append("bcrypt")
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__time_cost=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+# Built from settings on first use; tests may replace it
+pwd_context: Optional["CryptContext"] = None
+
+
+def get_pwd_context() -> "CryptContext":
+    global pwd_context
+    if pwd_context is None:
+        pwd_context = build_crypt_context(
+            settings.PASSWORD_SCHEMES,
+            bcrypt_rounds=settings.BCRYPT_ROUNDS,
+            argon2_time_cost=settings.ARGON2_TIME_COST,
+            argon2_memory_cost=settings.ARGON2_MEMORY_COST,
+            argon2_parallelism=settings.ARGON2_PARALLELISM,
+        )
+    return pwd_context
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Create a short-lived access token.
+
+    Besides ``exp`` every token carries a unique ``jti`` and a millisecond
+    ``iat`` so it can be revoked individually or together with all tokens
+    issued to the user before a given moment (see ``app.core.revocation``).
+    """
     to_encode = data.copy()
+    now = datetime.now(timezone.utc)
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(
-            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
+        expire = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({
+        "exp": expire,
+        "iat": round(now.timestamp(), 3),
+        "jti": uuid.uuid4().hex,
+        "type": "access",
+    })
+    from jose import jwt
+
+    with span("jwt.encode"):
+        encoded_jwt = jwt.encode(
+            to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
         )
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
-    )
     return encoded_jwt
 
 
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """Decode and validate an access token; raises ``JWTError`` if invalid."""
+    from jose import jwt
+
+    with span("jwt.decode"):
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    # Tokens issued before revocation support have no type; accept them
+    # until they expire
+    if payload.get("type", "access") != "access":
+        raise JWTError("Not an access token")
+    return payload
+
+
+def generate_refresh_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def hash_token(token: str) -> str:
+    """Digest under which opaque tokens are stored, so a DB leak exposes none."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with span("password.verify"):
+        return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and, if its hash is outdated, return a new hash made
+    with the current scheme and cost (``None`` otherwise).
+    """
+    with span("password.verify"):
+        return get_pwd_context().verify_and_update(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with span("password.hash"):
+        return get_pwd_context().hash(password)
@@ -0,0 +1,56 @@
+"""
+uvicorn server and gunicorn worker with a pre-stop delay.
+
+uvicorn closes the listener as soon as it handles SIGTERM, before lifespan
+shutdown runs, so a load balancer would only notice the worker going away
+through failed connections. ``Server`` instead marks the worker not ready on
+SIGTERM and lets uvicorn's own ``handle_exit`` run ``SHUTDOWN_PRESTOP_SECONDS``
+later; a second SIGTERM stops it at once. Overriding ``handle_exit`` works
+with any event loop uvicorn runs on, uvloop included.
+
+``UvicornWorker`` is uvicorn's gunicorn worker serving through ``Server``;
+gunicorn_conf.py selects it.
+"""
+import logging
+import signal
+import sys
+import threading
+from types import FrameType
+from typing import Optional
+
+import uvicorn
+from gunicorn.arbiter import Arbiter
+from uvicorn.workers import UvicornWorker as _UvicornWorker
+
+from app.core.config import settings
+from app.core.lifespan import state
+
+logger = logging.getLogger(__name__)
+
+
+class Server(uvicorn.Server):
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        delay = settings.SHUTDOWN_PRESTOP_SECONDS
+        # Not started yet, already draining, or another signal: stop now
+        if sig != signal.SIGTERM or delay <= 0 or not state.ready or state.draining:
+            super().handle_exit(sig, frame)
+            return
+        state.ready = False
+        state.draining = True
+        logger.info(f"SIGTERM: not ready, stopping in {delay:.1f}s")
+        # handle_exit only sets flags the server's main loop polls, so it is
+        # safe to call from the timer thread
+        timer = threading.Timer(delay, super().handle_exit, (sig, None))
+        timer.daemon = True
+        timer.start()
+
+
+class UvicornWorker(_UvicornWorker):
+    async def _serve(self) -> None:
+        # uvicorn.workers.UvicornWorker._serve, with our Server
+        self.config.app = self.wsgi
+        server = Server(config=self.config)
+        self._install_sigquit_handler()
+        await server.serve(sockets=self.sockets)
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
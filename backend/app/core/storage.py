@@ -0,0 +1,287 @@
+"""
+Object storage (MinIO / S3) client.
+
+One client per process, sharing a bounded urllib3 connection pool. It is
+created on first use or during start-up warm-up, never at import time, so
+``minio`` stays out of processes that do not touch storage.
+
+Application code goes through the object store (``get_object_store()``), a
+thin wrapper exposing the handful of object and multipart operations it
+needs; ``MemoryObjectStore`` implements the same operations in process for
+tests and local development without MinIO.
+"""
+import io
+import logging
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from minio import Minio
+
+logger = logging.getLogger(__name__)
+
+
+def build_storage_client() -> "Minio":
+    import urllib3
+    from minio import Minio
+
+    http_client = urllib3.PoolManager(
+        maxsize=settings.STORAGE_MAX_CONNECTIONS,
+        timeout=urllib3.Timeout(
+            connect=settings.STORAGE_CONNECT_TIMEOUT, read=settings.STORAGE_READ_TIMEOUT
+        ),
+        retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=(500, 502, 503, 504)),
+    )
+    return Minio(
+        settings.STORAGE_ENDPOINT,
+        access_key=settings.STORAGE_ACCESS_KEY,
+        secret_key=settings.STORAGE_SECRET_KEY,
+        secure=settings.STORAGE_USE_HTTPS,
+        http_client=http_client,
+    )
+
+
+_client: Optional["Minio"] = None
+
+
+def get_storage_client() -> "Minio":
+    """Return the process-wide storage client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = build_storage_client()
+    return _client
+
+
+def set_storage_client(client: Optional["Minio"]) -> None:
+    """Replace the process-wide storage client (used by tests)."""
+    global _client
+    _client = client
+
+
+def ensure_bucket(bucket: Optional[str] = None) -> None:
+    """Create the media bucket if it does not exist yet."""
+    bucket = bucket or settings.STORAGE_BUCKET_NAME
+    client = get_storage_client()
+    if not client.bucket_exists(bucket):
+        client.make_bucket(bucket)
+        logger.info(f"Created storage bucket {bucket}")
+
+
+def close_storage_client() -> None:
+    """Close pooled storage connections."""
+    global _client
+    if _client is not None:
+        _client._http.clear()
+        _client = None
+
+
+# --- Object store ------------------------------------------------------------
+
+class NoSuchUpload(Exception):
+    """The multipart upload was completed or aborted, or never existed."""
+
+
+class NoSuchKey(KeyError):
+    """The object does not exist."""
+
+
+class _Progress(threading.Thread):
+    """
+    Adapter for minio's ``progress`` hook, which must be a Thread but is
+    only ever called synchronously from the transferring thread.
+    """
+
+    def __init__(self, callback: Callable[[int], None]):
+        super().__init__(daemon=True)
+        self.callback = callback
+        self.done = 0
+
+    def set_meta(self, object_name: str, total_length: int) -> None:
+        pass
+
+    def update(self, size: int) -> None:
+        self.done += size
+        self.callback(self.done)
+
+
+class MinioObjectStore:
+    """Object and multipart operations on the media bucket, through the shared client."""
+
+    def __init__(self, bucket: Optional[str] = None):
+        self.bucket = bucket or settings.STORAGE_BUCKET_NAME
+
+    @property
+    def client(self) -> "Minio":
+        return get_storage_client()
+
+    def put(self, key: str, data: bytes, content_type: str = "application/octet-stream",
+            cache_control: Optional[str] = None) -> None:
+        metadata = {"Cache-Control": cache_control} if cache_control else None
+        self.client.put_object(self.bucket, key, io.BytesIO(data), len(data), content_type=content_type,
+                               metadata=metadata)
+
+    def get(self, key: str) -> bytes:
+        from minio.error import S3Error
+
+        try:
+            response = self.client.get_object(self.bucket, key)
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                raise NoSuchKey(key) from e
+            raise
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def download(self, key: str, path: Path,
+                 progress: Optional[Callable[[int], None]] = None) -> None:
+        """Stream the object to ``path``, calling ``progress`` with the bytes received so far."""
+        self.client.fget_object(self.bucket, key, str(path),
+                                progress=_Progress(progress) if progress else None)
+
+    def upload(self, key: str, path: Path, content_type: str = "application/octet-stream") -> None:
+        """Stream the file at ``path`` to the object (multipart when large)."""
+        self.client.fput_object(self.bucket, key, str(path), content_type=content_type)
+
+    def size(self, key: str) -> Optional[int]:
+        """The object's size, or None if it does not exist."""
+        from minio.error import S3Error
+
+        try:
+            return self.client.stat_object(self.bucket, key).size
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return None
+            raise
+
+    def remove(self, *keys: str) -> None:
+        for key in keys:
+            self.client.remove_object(self.bucket, key)
+
+    def list(self, prefix: str) -> List[str]:
+        return [obj.object_name for obj in self.client.list_objects(self.bucket, prefix, recursive=True)]
+
+    # minio only exposes multipart uploads through put_object, which needs
+    # the whole stream in one request; these are its per-part primitives
+
+    def create_multipart(self, key: str, content_type: str) -> str:
+        return self.client._create_multipart_upload(self.bucket, key, {"Content-Type": content_type})
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        return self._translate(
+            upload_id, self.client._upload_part, self.bucket, key, data, {}, upload_id, number
+        )
+
+    def complete_multipart(self, key: str, upload_id: str, parts: Sequence[Tuple[int, str]]) -> None:
+        from minio.datatypes import Part
+
+        parts = [Part(number, etag) for number, etag in parts]
+        self._translate(upload_id, self.client._complete_multipart_upload, self.bucket, key, upload_id, parts)
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        self._translate(upload_id, self.client._abort_multipart_upload, self.bucket, key, upload_id)
+
+    @staticmethod
+    def _translate(upload_id: str, method, *args):
+        from minio.error import S3Error
+
+        try:
+            return method(*args)
+        except S3Error as e:
+            if e.code == "NoSuchUpload":
+                raise NoSuchUpload(upload_id) from e
+            raise
+
+
+class MemoryObjectStore:
+    """Process-local object store with the same operations as ``MinioObjectStore``."""
+
+    def __init__(self):
+        # key -> (data, content type, Cache-Control)
+        self.objects: Dict[str, Tuple[bytes, str, Optional[str]]] = {}
+        self.uploads: Dict[str, Tuple[str, str, Dict[int, bytes]]] = {}
+        self._lock = threading.Lock()
+        self._next_upload = 0
+
+    def put(self, key: str, data: bytes, content_type: str = "application/octet-stream",
+            cache_control: Optional[str] = None) -> None:
+        with self._lock:
+            self.objects[key] = (bytes(data), content_type, cache_control)
+
+    def get(self, key: str) -> bytes:
+        with self._lock:
+            if key not in self.objects:
+                raise NoSuchKey(key)
+            return self.objects[key][0]
+
+    def download(self, key: str, path: Path,
+                 progress: Optional[Callable[[int], None]] = None) -> None:
+        data = self.get(key)
+        Path(path).write_bytes(data)
+        if progress:
+            progress(len(data))
+
+    def upload(self, key: str, path: Path, content_type: str = "application/octet-stream") -> None:
+        self.put(key, Path(path).read_bytes(), content_type)
+
+    def size(self, key: str) -> Optional[int]:
+        with self._lock:
+            item = self.objects.get(key)
+            return len(item[0]) if item else None
+
+    def remove(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self.objects.pop(key, None)
+
+    def list(self, prefix: str) -> List[str]:
+        with self._lock:
+            return sorted(key for key in self.objects if key.startswith(prefix))
+
+    def create_multipart(self, key: str, content_type: str) -> str:
+        with self._lock:
+            self._next_upload += 1
+            upload_id = f"upload-{self._next_upload}"
+            self.uploads[upload_id] = (key, content_type, {})
+            return upload_id
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        with self._lock:
+            if upload_id not in self.uploads:
+                raise NoSuchUpload(upload_id)
+            self.uploads[upload_id][2][number] = bytes(data)
+            return f"etag-{number}-{len(data)}"
+
+    def complete_multipart(self, key: str, upload_id: str, parts: Sequence[Tuple[int, str]]) -> None:
+        with self._lock:
+            if upload_id not in self.uploads:
+                raise NoSuchUpload(upload_id)
+            _, content_type, stored = self.uploads.pop(upload_id)
+            self.objects[key] = (b"".join(stored[number] for number, _ in parts), content_type, None)
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        with self._lock:
+            if self.uploads.pop(upload_id, None) is None:
+                raise NoSuchUpload(upload_id)
+
+
+_object_store = None
+
+
+def get_object_store():
+    """Return the process-wide object store, a ``MinioObjectStore`` by default."""
+    global _object_store
+    if _object_store is None:
+        _object_store = MinioObjectStore()
+    return _object_store
+
+
+def set_object_store(store) -> None:
+    """Replace the process-wide object store (used by tests)."""
+    global _object_store
+    _object_store = store
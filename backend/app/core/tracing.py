@@ -0,0 +1,103 @@
+"""
+Lightweight span hooks for hot paths (hashing, JWT, DB, email).
+
+When tracing is disabled ``span()`` returns a shared no-op context manager,
+so an instrumented call costs one global lookup and an empty ``with``.
+When enabled, every finished span is passed to the registered hooks; the
+default hook records a Prometheus histogram.
+"""
+import time
+from typing import Callable, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.metrics import SPAN_DURATION
+
+SpanHook = Callable[[str, float], None]
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.start
+        for hook in _hooks:
+            hook(self.name, duration)
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+_enabled = settings.TRACING_ENABLED
+_hooks: List[SpanHook] = []
+
+
+def span(name: str):
+    """Time the enclosed block as span ``name`` when tracing is enabled."""
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name)
+
+
+def set_tracing_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def tracing_enabled() -> bool:
+    return _enabled
+
+
+def add_span_hook(hook: SpanHook) -> None:
+    _hooks.append(hook)
+
+
+def remove_span_hook(hook: SpanHook) -> None:
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _enabled:
+        conn.info.setdefault("tracing_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("tracing_query_start")
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    for hook in _hooks:
+        hook("db.query", duration)
+
+
+def trace_engine(engine: Engine) -> None:
+    """Emit a ``db.query`` span for every statement run on ``engine``."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _observe_span(name: str, duration: float) -> None:
+    SPAN_DURATION.labels(name).observe(duration)
+
+
+add_span_hook(_observe_span)
@@ -1,5 +1,9 @@
 # Import all crud modules and create convenience modules
 from app.crud import user
+from app.crud import token
+from app.crud import media
+from app.crud import upload
+from app.crud import transcode
 
 # Create a "user" submodule that contains all user-related functions
 class UserCRUD:
@@ -8,6 +12,9 @@ class UserCRUD:
         get_user_by_username,
         get_user_by_id,
         get_users,
+        search_users,
+        autocomplete_users,
+        refresh_handle_cache,
         create_user,
         update_user,
         authenticate_user,
@@ -15,8 +22,64 @@ class UserCRUD:
         verify_password_reset_token,
         reset_password,
         generate_email_verification_token,
-        verify_email
+        verify_email,
+        invalidate_user_cache
     )
 
 # Export the user submodule
 user = UserCRUD
+
+
+class TokenCRUD:
+    from app.crud.token import (
+        create_refresh_token,
+        get_refresh_token,
+        rotate_refresh_token,
+        revoke_refresh_family,
+        revoke_access_token,
+        revoke_user_tokens,
+        sync_revocations,
+        is_access_token_revoked
+    )
+
+# Export the token submodule
+token = TokenCRUD
+
+
+class MediaCRUD:
+    from app.crud.media import (
+        create_media,
+        get_feed,
+        get_profile_grid,
+        encode_cursor,
+        decode_cursor
+    )
+
+# Export the media submodule
+media = MediaCRUD
+
+
+class UploadCRUD:
+    from app.crud.upload import (
+        create_upload,
+        get_upload,
+        append_chunk,
+        finalize_upload,
+        abort_upload,
+        discard_upload
+    )
+
+# Export the upload submodule
+upload = UploadCRUD
+
+
+class TranscodeCRUD:
+    from app.crud.transcode import (
+        enqueue_transcode,
+        get_transcode_job,
+        retry_transcode,
+        cancel_transcode
+    )
+
+# Export the transcode submodule
+transcode = TranscodeCRUD
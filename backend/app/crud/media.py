@@ -0,0 +1,113 @@
+"""
+Media records, and the recent-first feed and profile grid.
+
+Both listings are keyset paginated on ``(created_at, id)`` and read one
+calendar month at a time: every query bounds ``created_at`` to a single
+month, so on Postgres it is pruned to one partition of ``media`` (see
+``app.db.partitions``) instead of probing every partition's index. Older
+months are read only while the page is not full, and after
+``FEED_SCAN_MONTHS`` of them the rest of the page comes from one query over
+everything older.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.db.partitions import add_months, month_start
+from app.models.media import Media
+from app.schemas.media import MediaCreate
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def encode_cursor(media: Media) -> str:
+    micros = (_as_utc(media.created_at) - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}-{media.id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """The ``(created_at, id)`` a page continues after; ValueError if malformed."""
+    micros, media_id = cursor.split("-")
+    try:
+        created_at = _EPOCH + timedelta(microseconds=int(micros))
+    except OverflowError:
+        raise ValueError(f"Cursor out of range: {cursor}")
+    return created_at, int(media_id)
+
+
+def create_media(db: Session, user_id: int, media_in: MediaCreate) -> Media:
+    media = Media(
+        user_id=user_id,
+        title=media_in.title,
+        description=media_in.description,
+        file_path=media_in.file_path,
+        thumbnail_path=media_in.thumbnail_path,
+        media_type=media_in.media_type,
+        media_metadata=media_in.metadata,
+        is_private=media_in.is_private,
+    )
+    db.add(media)
+    db.commit()
+    db.refresh(media)
+    return media
+
+
+def _recent_first(
+    query: Query, cursor: Optional[str], limit: int
+) -> Tuple[List[Media], Optional[str]]:
+    if cursor:
+        before, before_id = decode_cursor(cursor)
+        query = query.filter(
+            # The plain bound is what partition pruning can use
+            Media.created_at <= before,
+            or_(Media.created_at < before, and_(Media.created_at == before, Media.id < before_id)),
+        )
+        lower = month_start(before)
+    else:
+        lower = month_start(datetime.now(timezone.utc))
+    upper = add_months(lower, 1)
+    order = (Media.created_at.desc(), Media.id.desc())
+
+    items: List[Media] = []
+    for _ in range(settings.FEED_SCAN_MONTHS):
+        items += (
+            query.filter(Media.created_at >= lower, Media.created_at < upper)
+            .order_by(*order).limit(limit - len(items)).all()
+        )
+        if len(items) == limit:
+            break
+        lower, upper = add_months(lower, -1), lower
+    else:
+        items += query.filter(Media.created_at < upper).order_by(*order).limit(limit - len(items)).all()
+    next_cursor = encode_cursor(items[-1]) if len(items) == limit else None
+    return items, next_cursor
+
+
+def get_feed(
+    db: Session, cursor: Optional[str] = None, limit: int = 24
+) -> Tuple[List[Media], Optional[str]]:
+    """Public media of every user, newest first."""
+    query = db.query(Media).filter(Media.is_private.is_(False))
+    return _recent_first(query, cursor, limit)
+
+
+def get_profile_grid(
+    db: Session,
+    user_id: int,
+    include_private: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = 24,
+) -> Tuple[List[Media], Optional[str]]:
+    """One user's media, newest first; private items only for the owner."""
+    query = db.query(Media).filter(Media.user_id == user_id)
+    if not include_private:
+        query = query.filter(Media.is_private.is_(False))
+    return _recent_first(query, cursor, limit)
@@ -0,0 +1,167 @@
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional, Tuple
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.core.revocation import RevocationList, get_revocation_list, jti_key, user_key
+from app.core.security import generate_refresh_token, hash_token
+from app.models.token import RefreshToken, TokenRevocation
+
+# Incremental syncs re-read this much history so rows committed by other
+# workers slightly out of order are not missed; re-adding keys is harmless
+_SYNC_OVERLAP = timedelta(seconds=30)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes even for timezone-aware columns
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# --- Refresh tokens --------------------------------------------------------
+
+def create_refresh_token(
+    db: Session, user_id: int, family_id: Optional[str] = None
+) -> Tuple[str, RefreshToken]:
+    """Store a new refresh token; returns the raw token and its row."""
+    raw_token = generate_refresh_token()
+    db_token = RefreshToken(
+        user_id=user_id,
+        token_hash=hash_token(raw_token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=_utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    db.add(db_token)
+    db.commit()
+    return raw_token, db_token
+
+
+def get_refresh_token(db: Session, token: str) -> Optional[RefreshToken]:
+    return db.query(RefreshToken).filter(RefreshToken.token_hash == hash_token(token)).first()
+
+
+def revoke_refresh_family(db: Session, family_id: str) -> None:
+    db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: _utcnow()}, synchronize_session=False)
+    db.commit()
+
+
+def rotate_refresh_token(db: Session, token: str) -> Optional[Tuple[str, RefreshToken]]:
+    """
+    Exchange a refresh token for a new one in the same family.
+
+    Returns ``None`` if the token is unknown, expired or already used.
+    Presenting a token that was already rotated means it leaked, so the
+    whole family is revoked and the legitimate holder has to log in again.
+    """
+    db_token = get_refresh_token(db, token)
+    if db_token is None:
+        return None
+    if db_token.revoked_at is not None:
+        revoke_refresh_family(db, db_token.family_id)
+        return None
+    if _as_utc(db_token.expires_at) <= _utcnow():
+        return None
+
+    family_id = db_token.family_id
+    raw_token = generate_refresh_token()
+    new_token = RefreshToken(
+        user_id=db_token.user_id,
+        token_hash=hash_token(raw_token),
+        family_id=family_id,
+        expires_at=_utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    db.add(new_token)
+    db.flush()
+    # Compare-and-set: of two concurrent refreshes with the same token only
+    # one matches; the other is a reuse like any other
+    claimed = db.query(RefreshToken).filter(
+        RefreshToken.id == db_token.id, RefreshToken.revoked_at.is_(None)
+    ).update(
+        {RefreshToken.revoked_at: _utcnow(), RefreshToken.replaced_by_id: new_token.id},
+        synchronize_session=False,
+    )
+    if claimed == 0:
+        db.rollback()
+        revoke_refresh_family(db, family_id)
+        return None
+    db.commit()
+    return raw_token, new_token
+
+
+# --- Access token revocation -----------------------------------------------
+
+def revoke_access_token(db: Session, jti: str, expires_at: datetime) -> None:
+    """Revoke one access token until it would have expired anyway."""
+    db.add(TokenRevocation(kind="jti", value=jti, revoked_at=_utcnow(), expires_at=expires_at))
+    db.commit()
+    get_revocation_list().add(jti_key(jti))
+
+
+def revoke_user_tokens(db: Session, user_id: int) -> None:
+    """Revoke every access and refresh token issued to a user so far."""
+    now = _utcnow()
+    db.add(TokenRevocation(
+        kind="user",
+        value=str(user_id),
+        revoked_at=now,
+        expires_at=now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    ))
+    db.query(RefreshToken).filter(
+        RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: now}, synchronize_session=False)
+    db.commit()
+    get_revocation_list().add(user_key(user_id))
+
+
+def _revocation_key(row: Tuple[str, str]) -> str:
+    kind, value = row
+    return jti_key(value) if kind == "jti" else user_key(int(value))
+
+
+def sync_revocations(db: Session, revocations: RevocationList) -> None:
+    """Pull revocations into ``revocations``: incrementally, or fully when due."""
+    now = _utcnow()
+    query = db.query(TokenRevocation.kind, TokenRevocation.value)
+    if revocations.needs_rebuild() or revocations.watermark is None:
+        rows = query.filter(TokenRevocation.expires_at > now).all()
+        revocations.rebuild(map(_revocation_key, rows), now.timestamp())
+    else:
+        since = datetime.fromtimestamp(revocations.watermark, timezone.utc) - _SYNC_OVERLAP
+        rows = query.filter(TokenRevocation.revoked_at >= since).all()
+        revocations.merge(map(_revocation_key, rows), now.timestamp())
+
+
+def is_access_token_revoked(db: Session, payload: Dict[str, Any]) -> bool:
+    """
+    Check a decoded access token against the revocation list.
+
+    Costs no query unless the list is due for a sync or the bloom filter
+    reports a (possibly false) hit.
+    """
+    revocations = get_revocation_list()
+    if revocations.needs_sync():
+        sync_revocations(db, revocations)
+
+    jti = payload.get("jti")
+    if jti and revocations.might_contain(jti_key(jti)):
+        hit = db.query(TokenRevocation.id).filter(
+            TokenRevocation.kind == "jti", TokenRevocation.value == jti
+        ).first()
+        if hit is not None:
+            return True
+
+    user_id = payload.get("sub")
+    if user_id is not None and revocations.might_contain(user_key(int(user_id))):
+        revoked_at = db.query(TokenRevocation.revoked_at).filter(
+            TokenRevocation.kind == "user", TokenRevocation.value == str(user_id)
+        ).order_by(TokenRevocation.revoked_at.desc()).limit(1).scalar()
+        # Tokens without iat predate revocation support and are treated as old
+        if revoked_at is not None and float(payload.get("iat", 0)) <= _as_utc(revoked_at).timestamp():
+            return True
+    return False
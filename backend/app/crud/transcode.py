@@ -0,0 +1,78 @@
+"""
+The video transcoding queue as seen by the API: queueing, progress and
+cancellation. Workers claim and run jobs in app/worker/transcode.py.
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.media import Media
+from app.models.transcode import TranscodeJob
+
+# Jobs in these states are left alone by enqueue_transcode
+_ACTIVE = ("queued", "running", "succeeded")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue_transcode(db: Session, media: Media, size: int = 0) -> TranscodeJob:
+    """
+    Queue a transcode of ``media``, smallest ``size`` first. Idempotent: a
+    queued, running or succeeded job is returned as is, and a failed or
+    cancelled one is queued again with fresh attempts. Flushed but not
+    committed, so finalizing an upload commits the media and its job together.
+    """
+    job = db.query(TranscodeJob).filter(TranscodeJob.media_id == media.id).first()
+    if job is None:
+        job = TranscodeJob(media_id=media.id, user_id=media.user_id, priority=size,
+                           progress=0.0, attempts=0, cancel_requested=False)
+        db.add(job)
+    elif job.status in _ACTIVE:
+        return job
+    job.status = "queued"
+    job.progress = 0.0
+    job.attempts = 0
+    job.cancel_requested = False
+    job.error = None
+    job.run_after = _utcnow()
+    job.started_at = job.finished_at = None
+    db.flush()
+    return job
+
+
+def get_transcode_job(db: Session, media_id: int, user_id: int) -> Optional[TranscodeJob]:
+    return (
+        db.query(TranscodeJob)
+        .filter(TranscodeJob.media_id == media_id, TranscodeJob.user_id == user_id)
+        .first()
+    )
+
+
+def retry_transcode(db: Session, job: TranscodeJob) -> TranscodeJob:
+    """Queue a failed or cancelled job again; other jobs are returned unchanged."""
+    media = db.query(Media).filter(Media.id == job.media_id).first()
+    if media is not None:
+        job = enqueue_transcode(db, media, job.priority)
+        db.commit()
+        db.refresh(job)
+    return job
+
+
+def cancel_transcode(db: Session, job: TranscodeJob) -> TranscodeJob:
+    """
+    Cancel a queued job at once; a running one is flagged and its worker
+    stops at its next progress report. Finished jobs are left alone.
+    """
+    if job.status == "queued":
+        job.status = "cancelled"
+        job.finished_at = _utcnow()
+    elif job.status == "running":
+        job.cancel_requested = True
+    else:
+        return job
+    db.commit()
+    db.refresh(job)
+    return job
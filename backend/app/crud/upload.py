@@ -0,0 +1,281 @@
+"""
+Resumable uploads, tus style: create a session, append chunks at the offset
+the server reports, then finalize the session into a media record.
+
+Bytes are stored as parts of an S3 multipart upload. S3 needs every part
+but the last to be at least 5 MiB, while a mobile client sends whatever it
+managed before its connection dropped, so an append prepends the stored
+tail (the bytes past the last full part) to the chunk, uploads every full
+``UPLOAD_PART_SIZE`` part of the result and stores the rest as the new
+tail. Memory is bounded by one chunk plus one part.
+
+The session row is the source of truth and is committed after every part:
+a worker that dies mid-chunk loses only the part in flight, and the client
+resumes from the offset HEAD reports. Re-sent bytes land in the same part
+numbers, so repeating an append is harmless. A tail is stored under a key
+naming its end offset, and the previous tail is deleted only once the row
+points at the new one.
+
+Two appends at the same offset would upload the same part number with
+different bytes, so an append first takes a lease on the row
+(``locked_until``) and writes nothing to storage unless it got it.
+"""
+import logging
+import re
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.core.config import settings
+from app.core.storage import NoSuchUpload, get_object_store
+from app.crud.transcode import enqueue_transcode
+from app.models.media import Media
+from app.models.upload import UploadSession
+from app.schemas.upload import UploadCreate
+
+logger = logging.getLogger(__name__)
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class UploadConflict(Exception):
+    """The session changed underneath the request, e.g. a concurrent append."""
+
+
+class UploadIncomplete(Exception):
+    """Finalize was called before every byte was received."""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _tail_prefix(upload: UploadSession) -> str:
+    return f"uploads/{upload.id}/"
+
+
+def _commit(db: Session, upload: UploadSession) -> None:
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise UploadConflict(upload.id)
+
+
+def _discard(keys: Iterable[str]) -> None:
+    """Delete leftover objects; failures only leave garbage behind."""
+    store = get_object_store()
+    for key in keys:
+        try:
+            store.remove(key)
+        except Exception as e:
+            logger.warning(f"Could not delete {key}: {e}")
+
+
+def create_upload(db: Session, user_id: int, upload_in: UploadCreate) -> UploadSession:
+    upload_id = secrets.token_urlsafe(16)
+    filename = _UNSAFE.sub("_", upload_in.filename or "").strip("._") or "upload"
+    object_key = f"media/{user_id}/{upload_id}/{filename}"
+    upload = UploadSession(
+        id=upload_id,
+        user_id=user_id,
+        object_key=object_key,
+        storage_upload_id=get_object_store().create_multipart(object_key, upload_in.content_type),
+        filename=upload_in.filename,
+        content_type=upload_in.content_type,
+        media_type=upload_in.content_type.split("/")[0],
+        title=upload_in.title,
+        description=upload_in.description,
+        is_private=upload_in.is_private,
+        length=upload_in.length,
+        upload_offset=0,
+        parts=[],
+        tail_size=0,
+        expires_at=_utcnow() + timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS),
+    )
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+    return upload
+
+
+def get_upload(db: Session, upload_id: str, user_id: int) -> Optional[UploadSession]:
+    """The user's upload session, or None if it does not exist or has expired."""
+    upload = db.get(UploadSession, upload_id)
+    if upload is None or upload.user_id != user_id:
+        return None
+    if upload.status == "active" and _as_utc(upload.expires_at) <= _utcnow():
+        return None
+    return upload
+
+
+def _claim(db: Session, upload: UploadSession) -> None:
+    """
+    Take the append lease. The commit is a compare-and-set on ``version``,
+    so of two requests that loaded the same row only one gets it, and a
+    request loading the row later sees the lease.
+    """
+    now = _utcnow()
+    if upload.locked_until is not None and _as_utc(upload.locked_until) > now:
+        raise UploadConflict(upload.id)
+    upload.locked_until = now + timedelta(seconds=settings.UPLOAD_APPEND_LEASE_SECONDS)
+    _commit(db, upload)
+
+
+def _release(db: Session, upload: UploadSession) -> None:
+    """Give the lease back after a failed append (a dead worker's lease lapses)."""
+    db.rollback()
+    upload.locked_until = None
+    try:
+        _commit(db, upload)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not release upload {upload.id}: {e}")
+
+
+def append_chunk(db: Session, upload: UploadSession, data: bytes) -> UploadSession:
+    """
+    Store ``data`` at ``upload.upload_offset``; the caller has checked that
+    the offset matches and that the chunk fits in the declared length.
+    Raises ``UploadConflict`` if another request is appending or changed the
+    session; nothing is written to storage in that case.
+    """
+    if not data:
+        return upload
+    _claim(db, upload)
+    try:
+        stale = _append(db, upload, data)
+    except UploadConflict:
+        raise
+    except Exception:
+        _release(db, upload)
+        raise
+    _discard(stale)
+    return upload
+
+
+def _append(db: Session, upload: UploadSession, data: bytes) -> List[str]:
+    """Upload the parts and the new tail under the lease; returns the replaced tails."""
+    store = get_object_store()
+    part_size = settings.UPLOAD_PART_SIZE
+    if upload.tail_key:
+        pending = bytearray(store.get(upload.tail_key))
+        pending += data
+    else:
+        pending = data
+    view = memoryview(pending)
+    # Bytes already in completed parts
+    stored = upload.upload_offset - upload.tail_size
+    expires_at = _utcnow() + timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+    lease = timedelta(seconds=settings.UPLOAD_APPEND_LEASE_SECONDS)
+    stale = []
+
+    while len(view) >= part_size:
+        number = len(upload.parts) + 1
+        etag = store.upload_part(
+            upload.object_key, upload.storage_upload_id, number, bytes(view[:part_size])
+        )
+        view = view[part_size:]
+        stored += part_size
+        if upload.tail_key:
+            stale.append(upload.tail_key)
+        # A new list, so the JSON column is seen as changed
+        upload.parts = upload.parts + [[number, etag, part_size]]
+        upload.tail_key, upload.tail_size = None, 0
+        upload.upload_offset = stored
+        upload.expires_at = expires_at
+        if len(view):
+            upload.locked_until = _utcnow() + lease
+        else:
+            upload.locked_until = None
+        _commit(db, upload)
+
+    if len(view):
+        tail_key = f"{_tail_prefix(upload)}tail-{stored + len(view)}"
+        store.put(tail_key, bytes(view))
+        if upload.tail_key:
+            stale.append(upload.tail_key)
+        upload.tail_key, upload.tail_size = tail_key, len(view)
+        upload.upload_offset = stored + len(view)
+        upload.expires_at = expires_at
+        upload.locked_until = None
+        _commit(db, upload)
+    return stale
+
+
+def finalize_upload(db: Session, upload: UploadSession) -> Media:
+    """
+    Complete the multipart upload and create the media record, queueing a
+    transcode for videos. Calling it again on a completed session returns
+    the same record.
+    """
+    if upload.status == "completed":
+        return db.query(Media).filter(Media.id == upload.media_id).first()
+    if upload.upload_offset != upload.length:
+        raise UploadIncomplete(upload.id)
+
+    store = get_object_store()
+    parts = [(number, etag) for number, etag, _ in upload.parts]
+    try:
+        if upload.tail_key:
+            # Only the last part may be shorter than the S3 minimum
+            number = len(parts) + 1
+            data = store.get(upload.tail_key)
+            etag = store.upload_part(upload.object_key, upload.storage_upload_id, number, data)
+            parts.append((number, etag))
+        store.complete_multipart(upload.object_key, upload.storage_upload_id, parts)
+    except NoSuchUpload:
+        # Completed by an earlier attempt that died before recording it
+        if store.size(upload.object_key) != upload.length:
+            raise UploadConflict(upload.id)
+
+    media = Media(
+        user_id=upload.user_id,
+        title=upload.title,
+        description=upload.description,
+        file_path=upload.object_key,
+        media_type=upload.media_type,
+        media_metadata={
+            "content_type": upload.content_type,
+            "size": upload.length,
+            "filename": upload.filename,
+        },
+        is_private=upload.is_private,
+    )
+    db.add(media)
+    db.flush()
+    if media.media_type == "video":
+        enqueue_transcode(db, media, size=upload.length)
+    upload.media_id = media.id
+    upload.status = "completed"
+    upload.tail_key, upload.tail_size = None, 0
+    _commit(db, upload)
+    _discard(store.list(_tail_prefix(upload)))
+    db.refresh(media)
+    return media
+
+
+def discard_upload(upload: UploadSession) -> None:
+    """Abort the session's multipart upload and delete its tails; the row is left."""
+    store = get_object_store()
+    if upload.status == "active":
+        try:
+            store.abort_multipart(upload.object_key, upload.storage_upload_id)
+        except NoSuchUpload:
+            pass
+    _discard(store.list(_tail_prefix(upload)))
+
+
+def abort_upload(db: Session, upload: UploadSession) -> None:
+    """Delete the session and whatever it stored; a finalized upload keeps its media."""
+    discard_upload(upload)
+    db.delete(upload)
+    db.commit()
@@ -1,32 +1,206 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, make_transient_to_detached
 from typing import Optional, List, Dict, Any
 import secrets
+import time
 from datetime import datetime, timedelta, timezone
 
-from app.core.security import get_password_hash, verify_password
+from app.core.autocomplete import HandleCache, get_handle_cache
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_and_update_password
+from app.crud.token import revoke_user_tokens
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 
 
+# Profile columns kept in the shared cache. Credentials and one-time tokens
+# are deliberately left out; they are lazy-loaded from the DB if accessed.
+_CACHED_USER_FIELDS = (
+    "id", "email", "username", "full_name", "bio", "profile_picture",
+    "is_active", "is_superuser", "email_verified", "created_at", "updated_at",
+)
+_CACHED_DATETIME_FIELDS = ("created_at", "updated_at")
+
+
+def _user_cache_key(user_id: int) -> str:
+    return f"user:id:{user_id}"
+
+
+def _user_cache_tag(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def _user_to_cache(user: User) -> Dict[str, Any]:
+    data = {field: getattr(user, field) for field in _CACHED_USER_FIELDS}
+    for field in _CACHED_DATETIME_FIELDS:
+        if data[field] is not None:
+            data[field] = data[field].isoformat()
+    return data
+
+
+def _user_from_cache(db: Session, data: Dict[str, Any]) -> User:
+    data = dict(data)
+    for field in _CACHED_DATETIME_FIELDS:
+        if data.get(field) is not None:
+            data[field] = datetime.fromisoformat(data[field])
+    user = User(**data)
+    # Attach the cached row to the session without emitting a SELECT
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def invalidate_user_cache(user_id: int) -> None:
+    get_cache().invalidate_tags(_user_cache_tag(user_id))
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+# Both lookups are case-insensitive and served by the unique lower() indexes
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
-    return db.query(User).filter(User.email == email).first()
+    return db.query(User).filter(func.lower(User.email) == func.lower(email.strip())).first()
 
 
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
-    return db.query(User).filter(User.username == username).first()
+    return db.query(User).filter(func.lower(User.username) == func.lower(username.strip())).first()
 
 
 def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
-    return db.query(User).filter(User.id == user_id).first()
+    # get_or_set collapses concurrent misses and refreshes hot users early
+    loaded: List[Optional[User]] = []
+
+    def load() -> Optional[Dict[str, Any]]:
+        user = db.query(User).filter(User.id == user_id).first()
+        loaded.append(user)
+        return _user_to_cache(user) if user is not None else None
+
+    cached = get_cache().get_or_set(
+        _user_cache_key(user_id),
+        load,
+        ttl=settings.USER_CACHE_TTL,
+        tags=[_user_cache_tag(user_id)],
+    )
+    if loaded:
+        # This call ran the query; the row is already in the session
+        return loaded[0]
+    return _user_from_cache(db, cached) if cached is not None else None
 
 
 def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
     return db.query(User).offset(skip).limit(limit).all()
 
 
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _user_summary(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "username": row.username,
+        "full_name": row.full_name,
+        "profile_picture": row.profile_picture,
+    }
+
+
+def search_users(db: Session, query: str, limit: int = 20) -> List[User]:
+    """
+    Find active users whose username or full name resembles ``query``.
+
+    On Postgres this uses the ``pg_trgm`` GIN indexes on ``lower(username)``
+    and ``lower(full_name)``; prefix matches rank first, then similarity,
+    then recency. Other databases fall back to a substring match.
+    """
+    q = query.strip().lower()
+    if not q:
+        return []
+    username = func.lower(User.username)
+    full_name = func.lower(User.full_name)
+    prefix_match = username.like(_escape_like(q) + "%", escape="\\")
+    results = db.query(User).filter(User.is_active.is_(True))
+
+    if db.get_bind().dialect.name == "postgresql":
+        if len(q) < 3:
+            # Too short for trigrams to be selective; use the prefix index
+            results = results.filter(prefix_match)
+        else:
+            results = results.filter(or_(
+                username.op("%")(q), full_name.op("%")(q), prefix_match
+            ))
+        similarity = func.greatest(
+            func.similarity(username, q),
+            func.similarity(func.coalesce(full_name, ""), q),
+        )
+        order = (prefix_match.desc(), similarity.desc(), User.created_at.desc())
+    else:
+        contains = f"%{_escape_like(q)}%"
+        results = results.filter(or_(
+            username.like(contains, escape="\\"), full_name.like(contains, escape="\\")
+        ))
+        order = (prefix_match.desc(), User.created_at.desc())
+    return results.order_by(*order).limit(limit).all()
+
+
+def _handle_score(created_at: Optional[datetime]) -> float:
+    return created_at.timestamp() if created_at else 0.0
+
+
+def refresh_handle_cache(db: Session, handles: Optional[HandleCache] = None) -> None:
+    """Rebuild the autocomplete trie from the most recently joined active users."""
+    handles = handles or get_handle_cache()
+    started = time.monotonic()
+    try:
+        rows = db.query(
+            User.id, User.username, User.full_name, User.profile_picture, User.created_at
+        ).filter(User.is_active.is_(True)).order_by(
+            User.created_at.desc(), User.id.desc()
+        ).limit(handles.max_handles).all()
+        handles.rebuild(
+            ((row.id, row.username, _handle_score(row.created_at), _user_summary(row))
+             for row in rows),
+            started=started,
+        )
+    finally:
+        handles.refreshing = False
+
+
+def _update_handle_cache(user: User) -> None:
+    handles = get_handle_cache()
+    if user.is_active:
+        handles.update(user.id, user.username, _handle_score(user.created_at), _user_summary(user))
+    else:
+        handles.remove(user.id)
+
+
+def autocomplete_users(db: Session, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Active users whose username starts with ``prefix``, most recent first.
+
+    Answered from the in-memory handle trie when it holds enough matches,
+    otherwise by a prefix scan of the ``lower(username) text_pattern_ops``
+    index. The trie is rebuilt by ``refresh_handle_cache``, which the
+    endpoint runs as a background task once ``start_refresh()`` says it is
+    due.
+    """
+    prefix = prefix.strip().lower()
+    cached = get_handle_cache().lookup(prefix, limit)
+    if cached is not None:
+        return [payload for _, payload in cached]
+
+    rows = db.query(
+        User.id, User.username, User.full_name, User.profile_picture
+    ).filter(
+        User.is_active.is_(True),
+        func.lower(User.username).like(_escape_like(prefix) + "%", escape="\\"),
+    ).order_by(User.created_at.desc(), User.id.desc()).limit(limit).all()
+    return [_user_summary(row) for row in rows]
+
+
 def create_user(db: Session, user_in: UserCreate) -> User:
     db_user = User(
-        email=user_in.email,
+        email=normalize_email(user_in.email),
         username=user_in.username,
         hashed_password=get_password_hash(user_in.password),
         full_name=user_in.full_name,
@@ -37,6 +211,7 @@ def create_user(db: Session, user_in: UserCreate) -> User:
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    _update_handle_cache(db_user)
     return db_user
 
 
@@ -44,13 +219,20 @@ def update_user(db: Session, db_user: User, user_in: UserUpdate) -> User:
     user_data = user_in.dict(exclude_unset=True)
     if "password" in user_data and user_data["password"]:
         user_data["hashed_password"] = get_password_hash(user_data.pop("password"))
+    if user_data.get("email"):
+        user_data["email"] = normalize_email(user_data["email"])
     
+    deactivated = db_user.is_active and user_data.get("is_active") is False
     for key, value in user_data.items():
         setattr(db_user, key, value)
     
     db.add(db_user)
     db.commit()
+    invalidate_user_cache(db_user.id)
+    if deactivated:
+        revoke_user_tokens(db, db_user.id)
     db.refresh(db_user)
+    _update_handle_cache(db_user)
     return db_user
 
 
@@ -63,8 +245,15 @@ def authenticate_user(db: Session, username_or_email: str, password: str) -> Opt
     
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = verify_and_update_password(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        # Transparently move the hash to the current scheme/cost
+        user.hashed_password = new_hash
+        db.add(user)
+        db.commit()
+        invalidate_user_cache(user.id)
     return user
 
 
@@ -83,13 +272,16 @@ def generate_password_reset_token(db: Session, email: str) -> Optional[Dict[str,
     # Note: We're assuming we'll add these fields to the User model
     setattr(user, "reset_token", reset_token)
     setattr(user, "reset_token_expires_at", expires_at)
+    # Read these before commit expires the instance, saving a reload
+    user_id, user_email, username = user.id, user.email, user.username
     
     db.add(user)
     db.commit()
-    db.refresh(user)
+    invalidate_user_cache(user_id)
     
     return {
-        "email": user.email,
+        "email": user_email,
+        "username": username,
         "reset_token": reset_token,
         "expires_at": expires_at
     }
@@ -134,6 +326,9 @@ def reset_password(db: Session, token: str, new_password: str) -> Optional[User]
     
     db.add(user)
     db.commit()
+    invalidate_user_cache(user.id)
+    # Sessions opened with the old password must not survive the reset
+    revoke_user_tokens(db, user.id)
     db.refresh(user)
     
     return user
@@ -156,6 +351,7 @@ def generate_email_verification_token(db: Session, user_id: int) -> Optional[Dic
     
     db.add(user)
     db.commit()
+    invalidate_user_cache(user.id)
     db.refresh(user)
     
     return {
@@ -188,6 +384,7 @@ def verify_email(db: Session, token: str) -> Optional[User]:
     
     db.add(user)
     db.commit()
+    invalidate_user_cache(user.id)
     db.refresh(user)
     
     return user
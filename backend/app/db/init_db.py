@@ -9,6 +9,11 @@ from app.core.config import settings
 
 # Import all models to ensure they are registered with Base
 from app.models.user import User  # Import all models here
+from app.models.token import RefreshToken, TokenRevocation
+from app.models.media import Media
+from app.models.interaction import Interaction
+from app.models.upload import UploadSession
+from app.models.transcode import TranscodeJob
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
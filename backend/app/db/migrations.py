@@ -0,0 +1,462 @@
+"""
+Helpers for online Alembic migrations on large tables, and the dry run.
+
+Plain ``op.create_index`` holds a SHARE lock on the table for the whole
+build and ``op.add_column`` and friends need ACCESS EXCLUSIVE; while they
+wait for the lock, every query on the table queues behind them. Migrations
+should instead:
+
+- build and drop indexes with ``create_index_concurrently`` and
+  ``drop_index_concurrently`` (outside the migration transaction, so run
+  Alembic with ``transaction_per_migration``, as ``alembic/env.py`` does);
+- backfill columns with ``backfill``, in committed, throttled batches;
+- wrap brief ACCESS EXCLUSIVE changes in ``with_lock_retries``.
+
+``alembic/env.py`` sets ``MIGRATION_LOCK_TIMEOUT_MS`` and
+``MIGRATION_STATEMENT_TIMEOUT_MS`` on the migration connection, so a
+statement that cannot get its lock fails fast instead of blocking logins.
+
+``alembic -x dry_run=true upgrade head`` renders the pending migrations as
+SQL without running them and estimates, with ``MigrationPlan``, the lock
+each statement takes and how long it holds it, from the live table
+statistics (``pg_class``) and EXPLAIN row estimates. Everything but
+Postgres gets the plain operations and no estimates.
+"""
+import json
+import logging
+import re
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+from alembic import op
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Postgres "lock_not_available", raised when lock_timeout expires
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+def is_postgres() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def is_offline() -> bool:
+    """Whether SQL is being rendered (``--sql`` or the dry run) rather than run."""
+    return op.get_context().as_sql
+
+
+def set_timeouts(
+    connection: Connection,
+    lock_timeout_ms: Optional[int] = None,
+    statement_timeout_ms: Optional[int] = None,
+) -> None:
+    """Session-wide lock and statement timeouts for a migration connection (Postgres)."""
+    if connection.dialect.name != "postgresql":
+        return
+    lock_timeout_ms = settings.MIGRATION_LOCK_TIMEOUT_MS if lock_timeout_ms is None else lock_timeout_ms
+    statement_timeout_ms = (
+        settings.MIGRATION_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+    )
+    connection.execute(text(f"SET lock_timeout = {int(lock_timeout_ms)}"))
+    connection.execute(text(f"SET statement_timeout = {int(statement_timeout_ms)}"))
+    connection.commit()
+
+
+@contextmanager
+def _setting(name: str, value: str) -> Iterator[None]:
+    """Change a session setting for the block, then restore the current value."""
+    if is_offline():
+        op.execute(f"SET {name} = {value}")
+        yield
+        op.execute(f"RESET {name}")
+        return
+    conn = op.get_bind()
+    previous = conn.execute(text("SELECT current_setting(:name)"), {"name": name}).scalar()
+    conn.execute(text(f"SET {name} = {value}"))
+    try:
+        yield
+    finally:
+        conn.execute(text("SELECT set_config(:name, :value, false)"), {"name": name, "value": previous})
+
+
+def with_lock_retries(
+    apply: Callable[[], None],
+    attempts: Optional[int] = None,
+    backoff: float = 0.5,
+) -> None:
+    """
+    Run ``apply`` (operations needing a brief ACCESS EXCLUSIVE lock, e.g.
+    ``op.add_column`` without a volatile default) in a savepoint, retrying
+    with exponential backoff whenever the lock timeout expires, so it slips
+    in between queries instead of queueing in front of them.
+    """
+    if not is_postgres() or is_offline():
+        apply()
+        return
+    attempts = attempts or settings.MIGRATION_LOCK_RETRIES
+    conn = op.get_bind()
+    for attempt in range(1, attempts + 1):
+        try:
+            with conn.begin_nested():
+                apply()
+            return
+        except OperationalError as e:
+            if getattr(e.orig, "pgcode", None) != LOCK_NOT_AVAILABLE or attempt == attempts:
+                raise
+            delay = backoff * 2 ** (attempt - 1)
+            logger.warning(f"Lock not available (attempt {attempt}/{attempts}); retrying in {delay}s")
+            time.sleep(delay)
+
+
+def _drop_invalid_index(name: str) -> None:
+    # A failed or interrupted concurrent build leaves an INVALID index
+    # behind, which IF NOT EXISTS would otherwise take as done
+    invalid = op.get_bind().execute(text(
+        "SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name"
+    ), {"name": name}).scalar()
+    if invalid:
+        logger.warning(f"Dropping invalid index {name} left by an earlier build")
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def create_index_concurrently(
+    index_name: str, table_name: str, columns: Sequence, unique: bool = False, **kw
+) -> None:
+    """
+    ``op.create_index`` without blocking writes: on Postgres the index is
+    built with CREATE INDEX CONCURRENTLY outside the migration transaction
+    and without a statement timeout. Safe to re-run after a failed build.
+    """
+    if not is_postgres():
+        op.create_index(index_name, table_name, columns, unique=unique, **kw)
+        return
+    with op.get_context().autocommit_block():
+        if not is_offline():
+            _drop_invalid_index(index_name)
+        # Waiting for older transactions only blocks other schema changes
+        with _setting("statement_timeout", "0"), _setting("lock_timeout", "0"):
+            op.create_index(
+                index_name, table_name, columns, unique=unique,
+                postgresql_concurrently=True, if_not_exists=True, **kw
+            )
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    if not is_postgres():
+        op.drop_index(index_name, table_name=table_name)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+
+
+def backfill(
+    table_name: str,
+    assignments: str,
+    where: str,
+    key: str = "id",
+    batch_size: Optional[int] = None,
+    pause: Optional[float] = None,
+) -> int:
+    """
+    ``UPDATE table_name SET assignments WHERE where`` in batches of
+    ``batch_size`` rows, each committed on its own, outside the migration
+    transaction, with ``pause`` seconds in between. Rows locked by requests
+    are skipped and picked up by a later batch. ``where`` must stop matching
+    a row once it is updated. Returns the number of rows updated.
+    """
+    if not is_postgres():
+        statement = f"UPDATE {table_name} SET {assignments} WHERE {where}"
+        if is_offline():
+            op.execute(statement)
+            return 0
+        return op.get_bind().execute(text(statement)).rowcount
+    batch_size = batch_size or settings.MIGRATION_BACKFILL_BATCH_SIZE
+    pause = settings.MIGRATION_BACKFILL_PAUSE_SECONDS if pause is None else pause
+    statement = (
+        f"UPDATE {table_name} SET {assignments} WHERE {key} IN "
+        f"(SELECT {key} FROM {table_name} WHERE {where} LIMIT {int(batch_size)} FOR UPDATE SKIP LOCKED)"
+    )
+    with op.get_context().autocommit_block():
+        if is_offline():
+            op.execute(statement)
+            return 0
+        conn = op.get_bind()
+        total = batches = 0
+        while True:
+            updated = conn.execute(text(statement)).rowcount
+            total += updated
+            batches += 1
+            if updated < batch_size:
+                # A short batch may have skipped locked rows; done once none match
+                remaining = conn.execute(text(f"SELECT 1 FROM {table_name} WHERE {where} LIMIT 1")).first()
+                if not remaining:
+                    break
+            if batches % 20 == 0:
+                logger.info(f"Backfilled {total} rows of {table_name}")
+            time.sleep(pause)
+    return total
+
+
+# Dry run
+
+
+# Lock taken by each kind of statement, and the queries it blocks while held
+_BLOCKS = {
+    "ACCESS EXCLUSIVE": "reads and writes",
+    "EXCLUSIVE": "writes",
+    "SHARE ROW EXCLUSIVE": "writes",
+    "SHARE": "writes",
+    "SHARE UPDATE EXCLUSIVE": "schema changes",
+    "ROW EXCLUSIVE": "schema changes",
+}
+
+_IDENT = r'"?([\w.]+)"?'
+_CREATE_INDEX_RE = re.compile(
+    rf"^CREATE (UNIQUE )?INDEX (CONCURRENTLY )?(?:IF NOT EXISTS )?{_IDENT} ON (?:ONLY )?{_IDENT}", re.I
+)
+_DROP_INDEX_RE = re.compile(rf"^DROP INDEX (CONCURRENTLY )?(?:IF EXISTS )?{_IDENT}", re.I)
+_ALTER_TABLE_RE = re.compile(rf"^ALTER TABLE (?:ONLY )?(?:IF EXISTS )?{_IDENT} (.*)$", re.I | re.S)
+_BATCHED_UPDATE_RE = re.compile(
+    rf"^UPDATE {_IDENT} SET .* WHERE \w+ IN \(SELECT \w+ FROM \S+ WHERE (.*) "
+    r"LIMIT (\d+) FOR UPDATE SKIP LOCKED\)$", re.I | re.S
+)
+_DML_RE = re.compile(rf"^(?:UPDATE {_IDENT}|DELETE FROM {_IDENT}|INSERT INTO {_IDENT})", re.I)
+_VOLATILE_DEFAULT_RE = re.compile(r"DEFAULT .*(random|uuid|clock_timestamp|nextval)\s*\(|SERIAL", re.I)
+_IGNORED_RE = re.compile(
+    r"^(BEGIN|COMMIT|SET |RESET |CREATE TABLE|CREATE EXTENSION|COMMENT |"
+    r"UPDATE alembic_version|INSERT INTO alembic_version|DELETE FROM alembic_version)", re.I
+)
+
+
+class PlannedStatement:
+    def __init__(self, revision: str, sql: str, table: Optional[str] = None):
+        self.revision = revision
+        self.sql = sql
+        self.table = table
+        self.lock: Optional[str] = None
+        self.rows: Optional[int] = None
+        self.seconds = 0.0
+        self.note = ""
+        # Holds row locks on many rows until the migration commits
+        self.long_row_locks = False
+
+    @property
+    def blocks(self) -> str:
+        return _BLOCKS.get(self.lock, "nothing") if self.lock else "nothing"
+
+    @property
+    def warning(self) -> bool:
+        if self.long_row_locks:
+            return True
+        return self.blocks in ("reads and writes", "writes") and self.seconds >= settings.MIGRATION_WARN_SECONDS
+
+    def as_dict(self) -> dict:
+        return {
+            "revision": self.revision,
+            "sql": self.sql,
+            "table": self.table,
+            "lock": self.lock,
+            "blocks": self.blocks,
+            "rows": self.rows,
+            "seconds": round(self.seconds, 2),
+            "note": self.note,
+            "warning": self.warning,
+        }
+
+
+class MigrationPlan:
+    """
+    Lock and cost estimates for SQL rendered by the dry run. ``connection``
+    is a live connection for statistics; estimates are left empty without
+    one or on other databases than Postgres.
+    """
+
+    def __init__(self, connection: Optional[Connection] = None):
+        self.connection = connection
+        self.statements: List[PlannedStatement] = []
+        self._stats_cache: dict = {}
+
+    @property
+    def _postgres(self) -> bool:
+        return self.connection is not None and self.connection.dialect.name == "postgresql"
+
+    def table_stats(self, table: str) -> Optional[Tuple[int, int]]:
+        """(estimated rows, heap bytes) from ``pg_class``; None for tables not created yet."""
+        if not self._postgres:
+            return None
+        if table not in self._stats_cache:
+            row = self.connection.execute(text(
+                "SELECT greatest(c.reltuples, 0)::bigint, pg_relation_size(c.oid) "
+                "FROM pg_class c WHERE c.oid = to_regclass(:table)"
+            ), {"table": table}).first()
+            self._stats_cache[table] = tuple(row) if row else None
+        return self._stats_cache[table]
+
+    def estimate_rows(self, sql: str) -> Optional[int]:
+        """The planner's row estimate for ``sql`` (EXPLAIN, nothing is executed)."""
+        if not self._postgres:
+            return None
+        try:
+            with self.connection.begin_nested():
+                plan = self.connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        except Exception as e:
+            logger.debug(f"EXPLAIN failed for {sql!r}: {e}")
+            return None
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def _scan_seconds(self, table: str, passes: float = 1.0, fraction: float = 1.0) -> float:
+        stats = self.table_stats(table)
+        if not stats:
+            return 0.0
+        rate = settings.MIGRATION_ESTIMATE_MB_PER_SECOND * 1024 * 1024
+        return stats[1] * passes * fraction / rate
+
+    def _table_rows(self, table: str) -> Optional[int]:
+        stats = self.table_stats(table)
+        return stats[0] if stats else None
+
+    def add(self, revision: str, sql: str) -> Optional[PlannedStatement]:
+        sql = "\n".join(line for line in sql.splitlines() if not line.startswith("--")).strip()
+        if not sql or _IGNORED_RE.match(sql):
+            return None
+        planned = self.analyze(revision, sql)
+        self.statements.append(planned)
+        return planned
+
+    def add_script(self, revision: str, script: str) -> None:
+        """Add every statement of SQL rendered by Alembic for ``revision``."""
+        for sql in script.split(";\n\n"):
+            self.add(revision, sql)
+
+    def analyze(self, revision: str, sql: str) -> PlannedStatement:
+        match = _CREATE_INDEX_RE.match(sql)
+        if match:
+            unique, concurrently, _, table = match.groups()
+            planned = PlannedStatement(revision, sql, table)
+            planned.rows = self._table_rows(table)
+            if concurrently:
+                # Two table scans, and waits for transactions older than the build
+                planned.lock = "SHARE UPDATE EXCLUSIVE"
+                planned.seconds = self._scan_seconds(table, passes=3)
+                planned.note = "concurrent build; runs outside a transaction"
+            else:
+                planned.lock = "SHARE"
+                planned.seconds = self._scan_seconds(table, passes=2)
+                planned.note = "use create_index_concurrently"
+            return planned
+
+        match = _DROP_INDEX_RE.match(sql)
+        if match:
+            concurrently, _ = match.groups()
+            planned = PlannedStatement(revision, sql)
+            planned.lock = "SHARE UPDATE EXCLUSIVE" if concurrently else "ACCESS EXCLUSIVE"
+            if not concurrently:
+                planned.note = "brief, but queues queries while it waits; use drop_index_concurrently"
+            return planned
+
+        match = _ALTER_TABLE_RE.match(sql)
+        if match:
+            return self._analyze_alter(revision, sql, *match.groups())
+
+        match = _BATCHED_UPDATE_RE.match(sql)
+        if match:
+            table, where, batch_size = match.groups()
+            planned = PlannedStatement(revision, sql, table)
+            planned.lock = "ROW EXCLUSIVE"
+            planned.rows = self.estimate_rows(f"SELECT 1 FROM {table} WHERE {where}")
+            self._estimate_dml(planned)
+            if planned.rows is not None:
+                batches = -(-planned.rows // int(batch_size))
+                planned.seconds += batches * settings.MIGRATION_BACKFILL_PAUSE_SECONDS
+                planned.note = f"{batches} batches of {batch_size}, row locks held per batch"
+            return planned
+
+        match = _DML_RE.match(sql)
+        if match:
+            table = next(name for name in match.groups() if name)
+            planned = PlannedStatement(revision, sql, table)
+            planned.lock = "ROW EXCLUSIVE"
+            planned.rows = self.estimate_rows(sql)
+            self._estimate_dml(planned)
+            planned.note = "one transaction; row locks held until the migration commits"
+            if planned.rows and planned.rows > settings.MIGRATION_BACKFILL_BATCH_SIZE:
+                planned.long_row_locks = True
+                planned.note += "; use backfill"
+            return planned
+
+        planned = PlannedStatement(revision, sql)
+        planned.note = "not estimated"
+        return planned
+
+    def _estimate_dml(self, planned: PlannedStatement) -> None:
+        table_rows = self._table_rows(planned.table)
+        if planned.rows is None or not table_rows:
+            return
+        # Read, write the new row versions and their WAL
+        planned.seconds = self._scan_seconds(planned.table, passes=3, fraction=min(1.0, planned.rows / table_rows))
+
+    def _analyze_alter(self, revision: str, sql: str, table: str, action: str) -> PlannedStatement:
+        planned = PlannedStatement(revision, sql, table)
+        planned.rows = self._table_rows(table)
+        planned.lock = "ACCESS EXCLUSIVE"
+        action = action.upper()
+        if re.search(r"ALTER COLUMN .* TYPE ", action):
+            planned.seconds = self._scan_seconds(table, passes=3)
+            planned.note = "rewrites the table and its indexes unless the types are binary compatible"
+        elif "SET NOT NULL" in action:
+            planned.seconds = self._scan_seconds(table)
+            planned.note = "scans the table; add a NOT VALID check constraint and validate it first"
+        elif "VALIDATE CONSTRAINT" in action:
+            planned.lock = "SHARE UPDATE EXCLUSIVE"
+            planned.seconds = self._scan_seconds(table)
+        elif re.search(r"ADD (CONSTRAINT \S+ )?(FOREIGN KEY|CHECK)", action) and "NOT VALID" not in action:
+            planned.lock = "SHARE ROW EXCLUSIVE" if "FOREIGN KEY" in action else "ACCESS EXCLUSIVE"
+            planned.seconds = self._scan_seconds(table)
+            planned.note = "scans the table; add it NOT VALID, then VALIDATE CONSTRAINT"
+        elif re.search(r"ADD (CONSTRAINT \S+ )?(UNIQUE|PRIMARY KEY)", action) and "USING INDEX" not in action:
+            planned.seconds = self._scan_seconds(table, passes=2)
+            planned.note = "builds an index; create it concurrently, then ADD CONSTRAINT ... USING INDEX"
+        elif "ADD COLUMN" in action and _VOLATILE_DEFAULT_RE.search(action):
+            planned.seconds = self._scan_seconds(table, passes=3)
+            planned.note = "volatile default rewrites the table; add the column, then backfill"
+        else:
+            planned.note = "catalog only; use with_lock_retries"
+        return planned
+
+    @property
+    def warnings(self) -> List[PlannedStatement]:
+        return [planned for planned in self.statements if planned.warning]
+
+    def report(self) -> str:
+        if not self.statements:
+            return "No pending migration statements."
+        lines = []
+        revision = None
+        for planned in self.statements:
+            if planned.revision != revision:
+                revision = planned.revision
+                lines.append(f"{revision}:")
+            sql = re.sub(r"\s+", " ", planned.sql)
+            lines.append(f"  {'!' if planned.warning else ' '} {sql[:110]}")
+            details = [f"lock {planned.lock or 'none'} (blocks {planned.blocks})"]
+            if planned.table:
+                details.append(f"{planned.table}: ~{planned.rows if planned.rows is not None else '?'} rows")
+            details.append(f"~{planned.seconds:.1f}s")
+            if planned.note:
+                details.append(planned.note)
+            lines.append("      " + "; ".join(details))
+        lines.append(
+            f"{len(self.warnings)} statement(s) estimated to block reads or writes for "
+            f"over {settings.MIGRATION_WARN_SECONDS:g}s" if self.warnings
+            else "No statement is estimated to block reads or writes for long."
+        )
+        return "\n".join(lines)
@@ -0,0 +1,130 @@
+"""
+Monthly range partitions of ``media`` and ``interactions`` (Postgres).
+
+Partition ``media_p2026_10`` holds rows with ``created_at`` in October 2026
+(UTC). New partitions are created ``PARTITION_MONTHS_AHEAD`` months in
+advance, as an empty table that is then attached: ATTACH only takes a SHARE
+UPDATE EXCLUSIVE lock on the parent, where ``CREATE TABLE ... PARTITION OF``
+would block every read of it. There is no default partition, so a row
+outside the created range fails to insert rather than landing somewhere it
+would have to be moved from later.
+
+Partitions entirely older than the table's retention are detached and moved
+to ``PARTITION_ARCHIVE_SCHEMA``, from where they can be dumped and dropped;
+nothing is deleted here. The maintenance worker runs both steps every
+``PARTITION_MAINTENANCE_INTERVAL_SECONDS``; each statement runs under
+``MAINTENANCE_LOCK_TIMEOUT_MS`` and is retried on the next run if it times out.
+"""
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> setting holding its retention in months
+PARTITIONED_TABLES: Dict[str, str] = {
+    "media": "MEDIA_RETENTION_MONTHS",
+    "interactions": "INTERACTION_RETENTION_MONTHS",
+}
+
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def create_partition_sql(table: str, month: datetime) -> List[str]:
+    """Statements creating and attaching the partition of ``table`` for ``month``."""
+    name = partition_name(table, month)
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    return [
+        # Defaults and NOT NULLs; indexes, keys and foreign keys come with ATTACH
+        f"CREATE TABLE IF NOT EXISTS {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+        f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')",
+    ]
+
+
+def list_partitions(db: Session, table: str) -> List[Tuple[str, datetime, datetime]]:
+    """(name, lower bound, upper bound) of every partition of ``table``, oldest first."""
+    rows = db.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:table)"
+    ), {"table": table}).all()
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_RE.search(bound or "")
+        if match:
+            lower, upper = (datetime.fromisoformat(value) for value in match.groups())
+            partitions.append((name, lower, upper))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def _run_locked(db: Session, statements: List[str]) -> bool:
+    """Run ``statements`` in one transaction under the maintenance lock timeout."""
+    try:
+        db.execute(text(f"SET LOCAL lock_timeout = {int(settings.MAINTENANCE_LOCK_TIMEOUT_MS)}"))
+        for statement in statements:
+            db.execute(text(statement))
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Partition maintenance deferred to the next run: {e}")
+        return False
+
+
+def ensure_partitions(
+    db: Session, table: str, now: Optional[datetime] = None, ahead: Optional[int] = None
+) -> List[str]:
+    """Create the missing partitions from this month to ``ahead`` months on."""
+    ahead = settings.PARTITION_MONTHS_AHEAD if ahead is None else ahead
+    current = month_start(now or datetime.now(timezone.utc))
+    covered = {lower for _, lower, _ in list_partitions(db, table)}
+    created = []
+    for offset in range(ahead + 1):
+        month = add_months(current, offset)
+        if month not in covered and _run_locked(db, create_partition_sql(table, month)):
+            created.append(partition_name(table, month))
+    if created:
+        logger.info(f"Created partitions {', '.join(created)}")
+    return created
+
+
+def archive_expired_partitions(
+    db: Session, table: str, retention_months: int, now: Optional[datetime] = None
+) -> List[str]:
+    """Detach partitions older than ``retention_months`` into the archive schema."""
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -retention_months)
+    schema = settings.PARTITION_ARCHIVE_SCHEMA
+    archived = []
+    for name, _, upper in list_partitions(db, table):
+        if upper > cutoff:
+            break
+        if _run_locked(db, [
+            f"CREATE SCHEMA IF NOT EXISTS {schema}",
+            f"ALTER TABLE {table} DETACH PARTITION {name}",
+            f"ALTER TABLE {name} SET SCHEMA {schema}",
+        ]):
+            archived.append(name)
+    if archived:
+        logger.info(f"Archived partitions {', '.join(archived)} to schema {schema}")
+    return archived
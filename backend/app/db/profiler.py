@@ -0,0 +1,155 @@
+"""
+Per-request SQL profiler and N+1 detector.
+
+Listeners are attached once to every SQLAlchemy ``Engine`` but only record
+while a ``QueryProfile`` is active for the current context, so the cost is a
+context variable lookup per statement when profiling is off.
+
+With ``QUERY_PROFILER_ENABLED`` the middleware adds ``X-DB-Query-Count``,
+``X-DB-Time-Ms`` and ``X-DB-Duplicate-Queries`` headers to every response and
+logs statements that ran more than once in the same request.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class QueryProfile:
+    """Statements executed while the profile was active."""
+
+    def __init__(self):
+        self.statements: List[Tuple[str, float]] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_time(self) -> float:
+        return sum(duration for _, duration in self.statements)
+
+    def duplicates(self, threshold: int = 2) -> Dict[str, int]:
+        """Statements (ignoring bound parameters) run at least ``threshold`` times."""
+        counts = Counter(statement for statement, _ in self.statements)
+        return {statement: n for statement, n in counts.items() if n >= threshold}
+
+
+_current_profile: ContextVar[Optional[QueryProfile]] = ContextVar(
+    "current_query_profile", default=None
+)
+
+# Callbacks receiving (method, route, profile) after each profiled request
+_request_sinks: List[Callable[[str, str, QueryProfile], None]] = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("profiler_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    starts = conn.info.get("profiler_query_start")
+    if profile is None or not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    profile.statements.append((_WHITESPACE_RE.sub(" ", statement).strip(), duration))
+
+
+def install() -> None:
+    """Attach the profiler listeners to all engines (idempotent)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def profile_queries() -> Iterator[QueryProfile]:
+    """Collect the statements executed in this context."""
+    install()
+    profile = QueryProfile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+def add_request_sink(sink: Callable[[str, str, QueryProfile], None]) -> None:
+    _request_sinks.append(sink)
+
+
+def remove_request_sink(sink: Callable[[str, str, QueryProfile], None]) -> None:
+    if sink in _request_sinks:
+        _request_sinks.remove(sink)
+
+
+class QueryProfilerMiddleware:
+    """
+    Profiles requests when ``enabled`` or while a sink (e.g. the pytest
+    query budget plugin) is registered; otherwise a plain passthrough.
+    """
+
+    def __init__(self, app: ASGIApp, enabled: bool = False,
+                 duplicate_threshold: int = 2) -> None:
+        self.app = app
+        self.enabled = enabled
+        self.duplicate_threshold = duplicate_threshold
+        install()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not (self.enabled or _request_sinks):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.enabled:
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(profile.count)
+                headers["X-DB-Time-Ms"] = f"{profile.total_time * 1000:.2f}"
+                headers["X-DB-Duplicate-Queries"] = str(
+                    len(profile.duplicates(self.duplicate_threshold))
+                )
+            await send(message)
+
+        with profile_queries() as profile:
+            await self.app(scope, receive, send_wrapper)
+
+        route = getattr(scope.get("route"), "path", None) or "unmatched"
+        method = scope["method"]
+        if self.enabled:
+            self._log(method, route, profile)
+        for sink in list(_request_sinks):
+            sink(method, route, profile)
+
+    def _log(self, method: str, route: str, profile: QueryProfile) -> None:
+        duplicates = profile.duplicates(self.duplicate_threshold)
+        extra = {
+            "db_query_count": profile.count,
+            "db_time_ms": round(profile.total_time * 1000, 2),
+            "db_duplicate_queries": len(duplicates),
+        }
+        logger.info(
+            f"{method} {route}: {profile.count} queries in "
+            f"{profile.total_time * 1000:.2f}ms",
+            extra=extra,
+        )
+        for statement, n in duplicates.items():
+            logger.warning(
+                f"Possible N+1 in {method} {route}: statement ran {n} times: {statement}",
+                extra=extra,
+            )
+
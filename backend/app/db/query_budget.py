@@ -0,0 +1,76 @@
+"""
+pytest plugin failing tests that run more SQL than their budget allows.
+
+Enable it with ``pytest_plugins = ["app.db.query_budget"]`` and mark tests::
+
+    @pytest.mark.query_budget(3)
+    def test_whole_test_runs_at_most_three_queries(...): ...
+
+    @pytest.mark.query_budget(0, endpoint="GET /api/v1/users/me")
+    def test_each_request_to_endpoint_is_query_free(...): ...
+
+Endpoints are written as ``"<METHOD> <route template>"``. Per-endpoint
+budgets need ``QueryProfilerMiddleware`` installed on the app.
+"""
+from typing import List
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.db.profiler import QueryProfile, add_request_sink, remove_request_sink
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(max_queries, endpoint=None): fail the test if it (or each "
+        "request to `endpoint`) executes more than `max_queries` SQL statements",
+    )
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    markers = list(item.iter_markers("query_budget"))
+    if not markers:
+        yield
+        return
+
+    test_budgets = [m.args[0] for m in markers if not m.kwargs.get("endpoint")]
+    endpoint_budgets = {
+        m.kwargs["endpoint"]: m.args[0] for m in markers if m.kwargs.get("endpoint")
+    }
+    statements: List[str] = []
+    violations: List[str] = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    def check_request(method: str, route: str, profile: QueryProfile):
+        endpoint = f"{method} {route}"
+        budget = endpoint_budgets.get(endpoint)
+        if budget is not None and profile.count > budget:
+            listing = "\n".join(f"    {s}" for s, _ in profile.statements)
+            violations.append(
+                f"{endpoint} ran {profile.count} queries (budget {budget}):\n{listing}"
+            )
+
+    if test_budgets:
+        event.listen(Engine, "before_cursor_execute", count)
+    add_request_sink(check_request)
+    try:
+        outcome = yield
+    finally:
+        remove_request_sink(check_request)
+        if test_budgets:
+            event.remove(Engine, "before_cursor_execute", count)
+
+    if test_budgets and len(statements) > min(test_budgets):
+        listing = "\n".join(f"    {s}" for s in statements)
+        violations.append(
+            f"test ran {len(statements)} queries (budget {min(test_budgets)}):\n{listing}"
+        )
+    if violations and outcome.excinfo is None:
+        outcome.force_exception(
+            pytest.fail.Exception("Query budget exceeded:\n" + "\n".join(violations), pytrace=False)
+        )
@@ -1,18 +1,23 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+from fastapi.responses import ORJSONResponse
 
 from app.api.v1.api import api_router
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.health import get_health_monitor
+from app.core.lifespan import RequestTrackerMiddleware, lifespan, state
+from app.core.metrics import MetricsMiddleware, instrument_engine, metrics_endpoint
+from app.core.tracing import trace_engine
+from app.db.profiler import QueryProfilerMiddleware
+from app.db.session import engine
 
 app = FastAPI(
     title="SnapWave API",
     description="API for SnapWave media sharing platform",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -24,6 +29,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses for clients that accept zstd, brotli or gzip
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        levels={
+            "gzip": settings.COMPRESSION_GZIP_LEVEL,
+            "br": settings.COMPRESSION_BROTLI_QUALITY,
+            "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+        },
+    )
+
+# Hot-path spans; listeners are no-ops unless TRACING_ENABLED
+trace_engine(engine)
+
+# Per-request query profiling (a passthrough unless enabled or under the
+# pytest query budget plugin)
+app.add_middleware(
+    QueryProfilerMiddleware,
+    enabled=settings.QUERY_PROFILER_ENABLED,
+    duplicate_threshold=settings.QUERY_PROFILER_DUPLICATE_THRESHOLD,
+)
+
+# Record per-route latency, status codes and DB usage; outermost so it
+# measures the full time spent in the other middleware too
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+# Track in-flight requests so shutdown can drain them
+app.add_middleware(RequestTrackerMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -33,7 +71,26 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """Liveness: the process is up and serving."""
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness: warm-up finished, the worker is not shutting down and the
+    critical dependencies answered the last background probe.
+    """
+    if not state.ready:
+        return ORJSONResponse(
+            {"status": "draining" if state.draining else "starting"}, status_code=503
+        )
+    if not settings.HEALTH_PROBES_ENABLED:
+        return {"status": "ready"}
+    report = get_health_monitor().snapshot()
+    return ORJSONResponse(report, status_code=503 if report["status"] == "unavailable" else 200)
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # Development only; see start_server.py --prod for the production server
+    import uvicorn
+
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
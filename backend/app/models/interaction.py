@@ -0,0 +1,37 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import func
+
+from app.db.session import Base
+from app.models.media import BigId
+
+
+class Interaction(Base):
+    """
+    A like, comment or share of a media item.
+
+    Partitioned by month of ``created_at`` on Postgres, like ``media``.
+    ``media_id`` and ``parent_id`` have no foreign keys: a key referencing a
+    partitioned table would have to include its ``created_at`` as well.
+    Interactions are deleted with their media by the application.
+    """
+
+    __tablename__ = "interactions"
+
+    id = Column(BigId, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    media_id = Column(BigInteger, nullable=False)
+    interaction_type = Column(String(16), nullable=False)  # like, comment or share
+    content = Column(String)
+    parent_id = Column(BigInteger)  # The comment a reply answers
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+Index("ix_interactions_media_id_created_at", Interaction.media_id, Interaction.created_at.desc())
+Index("ix_interactions_user_id_created_at", Interaction.user_id, Interaction.created_at.desc())
+Index(
+    "ix_interactions_parent_id",
+    Interaction.parent_id,
+    postgresql_where=Interaction.parent_id.isnot(None),
+    sqlite_where=Interaction.parent_id.isnot(None),
+)
@@ -0,0 +1,46 @@
+from sqlalchemy import JSON, BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import false, func
+
+from app.db.session import Base
+
+# Integer on SQLite, where only an INTEGER primary key autoincrements
+BigId = BigInteger().with_variant(Integer, "sqlite")
+
+
+class Media(Base):
+    """
+    An uploaded photo or video.
+
+    On Postgres the table is range partitioned by month of ``created_at``
+    (migration 9b4e2c7a1f3d, maintained by ``app.db.partitions``) and its
+    primary key is ``(id, created_at)``, as every unique constraint must
+    include the partition key; ids still come from a single sequence. Queries
+    should bound ``created_at`` so only recent partitions are read.
+    """
+
+    __tablename__ = "media"
+
+    id = Column(BigId, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    title = Column(String)
+    description = Column(String)
+    file_path = Column(String, nullable=False)
+    thumbnail_path = Column(String)
+    media_type = Column(String(16), nullable=False)
+    # "metadata" is reserved on declarative models
+    media_metadata = Column("metadata", JSON)
+    is_private = Column(Boolean, nullable=False, default=False, server_default=false())
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+# Profile grid: one user's media, newest first
+Index("ix_media_user_id_created_at", Media.user_id, Media.created_at.desc(), Media.id.desc())
+# Feed: public media, newest first
+Index(
+    "ix_media_public_created_at",
+    Media.created_at.desc(),
+    Media.id.desc(),
+    postgresql_where=Media.is_private.is_(False),
+    sqlite_where=Media.is_private.is_(False),
+)
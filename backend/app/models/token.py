@@ -0,0 +1,33 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.sql import func
+
+from app.db.session import Base
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # SHA-256 of the token; the raw value is only ever sent to the client
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    # All tokens descending from one login share a family; reuse of a
+    # rotated token revokes the whole family
+    family_id = Column(String(32), nullable=False, index=True)
+    # Indexed for the expiry sweep (see app/worker/jobs.py)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    replaced_by_id = Column(Integer, ForeignKey("refresh_tokens.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TokenRevocation(Base):
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # "jti" revokes one access token, "user" every token issued before revoked_at
+    kind = Column(String(8), nullable=False)
+    value = Column(String(64), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    # After this no access token affected by the entry can still be valid
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
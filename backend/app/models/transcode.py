@@ -0,0 +1,55 @@
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import false, func
+
+from app.db.session import Base
+
+
+class TranscodeJob(Base):
+    """
+    A queued, running or finished transcode of one video (see
+    app/worker/transcode.py).
+
+    Workers claim queued jobs lowest ``priority`` first with ``FOR UPDATE
+    SKIP LOCKED``. ``attempts`` doubles as the lease: a worker only records
+    progress or a result while the job is still running under the attempt it
+    claimed, so a worker the stall sweep gave up on cannot overwrite a retry.
+    """
+
+    __tablename__ = "transcode_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # No foreign key, as media's primary key includes created_at on Postgres
+    media_id = Column(BigInteger, nullable=False, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # queued, running, succeeded, failed or cancelled
+    status = Column(String(16), nullable=False, default="queued", server_default="queued")
+    # Lower runs first: the source size in bytes
+    priority = Column(BigInteger, nullable=False, default=0, server_default="0")
+    progress = Column(Float, nullable=False, default=0.0, server_default="0")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    cancel_requested = Column(Boolean, nullable=False, default=False, server_default=false())
+    error = Column(String)
+    worker_id = Column(String(64))
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    heartbeat_at = Column(DateTime(timezone=True))
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+# Claiming: the next queued job by priority
+Index(
+    "ix_transcode_jobs_queue",
+    TranscodeJob.priority,
+    TranscodeJob.id,
+    postgresql_where=TranscodeJob.status == "queued",
+    sqlite_where=TranscodeJob.status == "queued",
+)
+# Stall sweep: running jobs by last heartbeat
+Index(
+    "ix_transcode_jobs_running_heartbeat",
+    TranscodeJob.heartbeat_at,
+    postgresql_where=TranscodeJob.status == "running",
+    sqlite_where=TranscodeJob.status == "running",
+)
@@ -0,0 +1,50 @@
+from sqlalchemy import JSON, BigInteger, Boolean, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.sql import false, func
+
+from app.db.session import Base
+
+
+class UploadSession(Base):
+    """
+    A resumable upload (see app/crud/upload.py).
+
+    The bytes received so far are the multipart ``parts`` already uploaded to
+    ``object_key``, followed by a tail shorter than ``UPLOAD_PART_SIZE`` kept
+    as a separate object at ``tail_key``. ``parts`` is rewritten after every
+    part, so a worker dying mid-chunk loses at most the part in flight;
+    an append first claims the session by setting ``locked_until`` (the
+    ``version`` check makes the claim a compare-and-set), so a concurrent
+    append fails before it writes any part instead of overwriting one.
+    """
+
+    __tablename__ = "upload_sessions"
+
+    # Random, so sessions cannot be enumerated
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    object_key = Column(String, nullable=False)
+    storage_upload_id = Column(String, nullable=False)
+    filename = Column(String(255))
+    content_type = Column(String(100), nullable=False)
+    media_type = Column(String(16), nullable=False)
+    title = Column(String)
+    description = Column(String)
+    is_private = Column(Boolean, nullable=False, default=False, server_default=false())
+    length = Column(BigInteger, nullable=False)
+    upload_offset = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # [[part number, etag, size], ...] in part number order
+    parts = Column(JSON, nullable=False, default=list)
+    tail_key = Column(String)
+    tail_size = Column(Integer, nullable=False, default=0, server_default="0")
+    # "active" until finalized, then "completed" with media_id set
+    status = Column(String(16), nullable=False, default="active", server_default="active")
+    media_id = Column(BigInteger)
+    version = Column(Integer, nullable=False)
+    # Held by the append in progress; lapses if its worker dies
+    locked_until = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Pushed back on every append; indexed for the expiry sweep
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __mapper_args__ = {"version_id_col": version}
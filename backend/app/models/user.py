@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime
+from sqlalchemy import Boolean, Column, Index, Integer, String, DateTime
 from sqlalchemy.sql import func
 
 from app.db.session import Base
@@ -8,8 +8,9 @@ class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
-    username = Column(String, unique=True, index=True, nullable=False)
+    # Unique case-insensitively, see the lower() indexes below
+    email = Column(String, nullable=False)
+    username = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     full_name = Column(String)
     bio = Column(String)
@@ -23,3 +24,53 @@ class User(Base):
     verification_token_expires_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+# Case-insensitive uniqueness and lookups (migration 0c2f4d6e8a1b). Queries
+# must compare ``func.lower(column)`` for these indexes to be used.
+Index("ix_users_email_lower", func.lower(User.email), unique=True)
+Index("ix_users_username_lower", func.lower(User.username), unique=True)
+
+# Partial indexes for the maintenance sweeps (migration 7d3e5f1a9b2c). Only
+# rows still holding a token, or still unverified, are indexed, so they stay
+# small; queries must repeat the WHERE condition for them to be used.
+Index(
+    "ix_users_reset_token_expires_at",
+    User.reset_token_expires_at,
+    postgresql_where=User.reset_token.isnot(None),
+    sqlite_where=User.reset_token.isnot(None),
+)
+Index(
+    "ix_users_verification_token_expires_at",
+    User.verification_token_expires_at,
+    postgresql_where=User.verification_token.isnot(None),
+    sqlite_where=User.verification_token.isnot(None),
+)
+Index(
+    "ix_users_unverified_created_at",
+    User.created_at,
+    postgresql_where=User.email_verified.is_(False),
+    sqlite_where=User.email_verified.is_(False),
+)
+
+# Search indexes (migration 5a1c7e93d2b4). On Postgres the trigram GIN
+# indexes serve similarity and substring search, the text_pattern_ops btree
+# serves autocomplete prefix scans; other databases get plain expression
+# indexes.
+Index(
+    "ix_users_username_trgm",
+    func.lower(User.username).label("username_lower"),
+    postgresql_using="gin",
+    postgresql_ops={"username_lower": "gin_trgm_ops"},
+)
+Index(
+    "ix_users_full_name_trgm",
+    func.lower(User.full_name).label("full_name_lower"),
+    postgresql_using="gin",
+    postgresql_ops={"full_name_lower": "gin_trgm_ops"},
+)
+Index(
+    "ix_users_username_prefix",
+    func.lower(User.username).label("username_prefix"),
+    postgresql_ops={"username_prefix": "text_pattern_ops"},
+)
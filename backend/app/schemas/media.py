@@ -0,0 +1,51 @@
+from pydantic import AliasChoices, BaseModel, Field, computed_field
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+from app.core.images import image_urls
+
+
+# Shared properties
+class MediaBase(BaseModel):
+    title: Optional[str] = Field(None, max_length=200)
+    description: Optional[str] = Field(None, max_length=2000)
+    media_type: str = Field(..., pattern="^(image|video)$")
+    is_private: bool = False
+
+
+# Properties stored when an upload completes
+class MediaCreate(MediaBase):
+    file_path: str
+    thumbnail_path: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+# Properties to return to client
+class Media(MediaBase):
+    id: int
+    user_id: int
+    file_path: str
+    thumbnail_path: Optional[str] = None
+    # The model attribute is media_metadata, "metadata" being reserved there
+    metadata: Optional[Dict[str, Any]] = Field(
+        None, validation_alias=AliasChoices("media_metadata", "metadata")
+    )
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    # Signed URLs of the IMAGE_PRESETS sizes: of the image itself, or of a
+    # video's poster once it has been transcoded
+    @computed_field
+    @property
+    def images(self) -> Optional[Dict[str, str]]:
+        source = self.file_path if self.media_type == "image" else self.thumbnail_path
+        return image_urls(source) if source else None
+
+    class Config:
+        from_attributes = True
+
+
+# One page of the feed or a profile grid; pass next_cursor to get the next
+class MediaPage(BaseModel):
+    items: List[Media]
+    next_cursor: Optional[str] = None
@@ -5,7 +5,15 @@ from typing import Optional
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # Access token lifetime in seconds
 
 
 class TokenPayload(BaseModel):
     sub: Optional[int] = None
+    jti: Optional[str] = None
+    iat: Optional[float] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
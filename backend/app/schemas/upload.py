@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+# Properties to receive when an upload is created
+class UploadCreate(BaseModel):
+    filename: Optional[str] = Field(None, max_length=255)
+    content_type: str = Field(..., max_length=100)
+    # Total size in bytes, known up front
+    length: int = Field(..., gt=0)
+    title: Optional[str] = Field(None, max_length=200)
+    description: Optional[str] = Field(None, max_length=2000)
+    is_private: bool = False
+
+
+# Properties to return to client
+class Upload(BaseModel):
+    id: str
+    filename: Optional[str] = None
+    content_type: str
+    media_type: str
+    length: int
+    upload_offset: int
+    status: str
+    media_id: Optional[int] = None
+    expires_at: datetime
+
+    class Config:
+        from_attributes = True
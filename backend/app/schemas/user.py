@@ -1,7 +1,9 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, computed_field, model_validator
+from typing import Dict, Optional
 from datetime import datetime
 
+from app.core.avatars import avatar_urls
+
 
 # Shared properties
 class UserBase(BaseModel):
@@ -40,6 +42,56 @@ class UserInDBBase(UserBase):
 class User(UserInDBBase):
     email_verified: Optional[bool] = False
 
+    # Rendition URLs by size, then format, when profile_picture is an
+    # uploaded avatar (PUT /users/me/avatar)
+    @computed_field
+    @property
+    def avatar(self) -> Optional[Dict[str, Dict[str, str]]]:
+        return avatar_urls(self.profile_picture)
+
+
+# Public profile fields returned by search and autocomplete
+class UserSummary(BaseModel):
+    id: int
+    username: str
+    full_name: Optional[str] = None
+    profile_picture: Optional[str] = None
+
+    @computed_field
+    @property
+    def avatar(self) -> Optional[Dict[str, Dict[str, str]]]:
+        return avatar_urls(self.profile_picture)
+
+    class Config:
+        from_attributes = True
+
+
+# One record of a bulk import (app.cli.import_users): either a plain
+# password, hashed on import, or a hash from another system
+class UserImport(BaseModel):
+    email: EmailStr
+    username: str = Field(..., min_length=3, max_length=20)
+    password: Optional[str] = Field(None, min_length=8)
+    hashed_password: Optional[str] = None
+    full_name: Optional[str] = None
+    bio: Optional[str] = None
+    profile_picture: Optional[str] = None
+    is_active: bool = True
+    email_verified: bool = False
+
+    @model_validator(mode="after")
+    def one_password(self) -> "UserImport":
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("exactly one of password and hashed_password is required")
+        return self
+
+
+# Response returned after registration
+class UserRegistered(BaseModel):
+    user: User
+    message: str
+    debug_token: Optional[str] = None
+
 
 # Properties stored in DB
 class UserInDB(UserInDBBase):
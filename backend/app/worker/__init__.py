@@ -0,0 +1 @@
+# Background maintenance worker, run with `python start_worker.py`
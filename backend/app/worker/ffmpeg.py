@@ -0,0 +1,165 @@
+"""
+ffmpeg and ffprobe invocations for the transcoder.
+
+A source is decoded once: ``split`` feeds every rendition's scaler, and the
+HLS muxer writes one variant playlist per rendition plus a master playlist
+(``master.m3u8``). Keyframes are forced every ``TRANSCODE_SEGMENT_SECONDS``
+so segments line up across renditions and players can switch between
+them. Progress comes from ``-progress pipe:1`` on stdout; stderr goes to a
+log file, so neither pipe can fill up and stall ffmpeg.
+"""
+import json
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+
+ProgressCallback = Callable[[float], None]
+
+MASTER_PLAYLIST = "master.m3u8"
+POSTER = "poster.jpg"
+
+
+class FFmpegError(RuntimeError):
+    pass
+
+
+def probe(source: Path) -> dict:
+    """Duration, size and whether ``source`` has audio; ValueError if it has no video."""
+    result = subprocess.run(
+        [settings.TRANSCODE_FFPROBE, "-v", "error", "-print_format", "json",
+         "-show_format", "-show_streams", str(source)],
+        capture_output=True, timeout=120,
+    )
+    if result.returncode != 0:
+        raise FFmpegError(f"ffprobe failed: {result.stderr.decode(errors='replace')[-500:]}")
+    info = json.loads(result.stdout)
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if video is None:
+        raise ValueError("No video stream")
+    duration = float(info.get("format", {}).get("duration") or video.get("duration") or 0)
+    return {
+        "duration": duration,
+        "width": int(video["width"]),
+        "height": int(video["height"]),
+        "has_audio": any(s.get("codec_type") == "audio" for s in streams),
+    }
+
+
+def select_renditions(height: int) -> List[Dict[str, int]]:
+    """The configured renditions no taller than the source; at least the smallest."""
+    renditions = sorted(settings.TRANSCODE_RENDITIONS, key=lambda r: r["height"])
+    return [r for r in renditions if r["height"] <= height] or renditions[:1]
+
+
+def rendition_name(rendition: Dict[str, int]) -> str:
+    return f"{rendition['height']}p"
+
+
+def hls_command(source: Path, out_dir: Path, info: dict, renditions: List[Dict[str, int]]) -> List[str]:
+    count = len(renditions)
+    segment = settings.TRANSCODE_SEGMENT_SECONDS
+    graph = [f"[0:v]split={count}" + "".join(f"[s{i}]" for i in range(count))]
+    graph += [f"[s{i}]scale=-2:{r['height']}[v{i}]" for i, r in enumerate(renditions)]
+
+    cmd = [settings.TRANSCODE_FFMPEG, "-hide_banner", "-nostdin", "-y", "-loglevel", "error",
+           "-i", str(source), "-filter_complex", ";".join(graph)]
+    stream_map = []
+    for i, r in enumerate(renditions):
+        kbps = r["video_kbps"]
+        cmd += ["-map", f"[v{i}]", f"-c:v:{i}", "libx264", f"-b:v:{i}", f"{kbps}k",
+                f"-maxrate:v:{i}", f"{kbps * 107 // 100}k", f"-bufsize:v:{i}", f"{kbps * 2}k"]
+        entry = f"v:{i}"
+        if info["has_audio"]:
+            cmd += ["-map", "0:a:0", f"-c:a:{i}", "aac", f"-b:a:{i}", f"{r['audio_kbps']}k"]
+            entry += f",a:{i}"
+        stream_map.append(f"{entry},name:{rendition_name(r)}")
+    cmd += [
+        "-preset", settings.TRANSCODE_PRESET,
+        "-threads", str(settings.TRANSCODE_FFMPEG_THREADS),
+        "-pix_fmt", "yuv420p",
+        "-sc_threshold", "0",
+        "-force_key_frames", f"expr:gte(t,n_forced*{segment})",
+        "-f", "hls",
+        "-hls_time", str(segment),
+        "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_filename", str(out_dir / "%v" / "seg_%05d.ts"),
+        "-master_pl_name", MASTER_PLAYLIST,
+        "-var_stream_map", " ".join(stream_map),
+        "-progress", "pipe:1", "-nostats",
+        str(out_dir / "%v" / "index.m3u8"),
+    ]
+    return cmd
+
+
+def poster_command(source: Path, out_path: Path, info: dict) -> List[str]:
+    # A frame a second in, as the first is often black
+    at = min(1.0, info["duration"] / 2)
+    height = min(settings.TRANSCODE_POSTER_HEIGHT, info["height"])
+    return [settings.TRANSCODE_FFMPEG, "-hide_banner", "-nostdin", "-y", "-loglevel", "error",
+            "-ss", f"{at:.3f}", "-i", str(source), "-frames:v", "1",
+            "-vf", f"scale=-2:{height}", "-q:v", "3", str(out_path)]
+
+
+def read_progress(lines: Iterable[str], duration: float, progress: ProgressCallback) -> None:
+    """Report the fraction done for every ``-progress`` block in ``lines``."""
+    for line in lines:
+        key, _, value = line.strip().partition("=")
+        # out_time_ms is in microseconds too, and older builds only have it
+        if key in ("out_time_us", "out_time_ms") and duration > 0 and value.isdigit():
+            progress(min(1.0, int(value) / 1_000_000 / duration))
+        elif key == "progress" and value == "end":
+            progress(1.0)
+
+
+def run(cmd: List[str], log_path: Path, duration: float = 0.0,
+        progress: Optional[ProgressCallback] = None) -> None:
+    """
+    Run ffmpeg, reporting progress. If ``progress`` raises (e.g. the job was
+    cancelled) ffmpeg is killed and the exception propagates.
+    """
+    with open(log_path, "ab") as log:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=log, text=True)
+        try:
+            read_progress(process.stdout, duration, progress or (lambda fraction: None))
+            returncode = process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+    if returncode != 0:
+        tail = log_path.read_bytes()[-500:].decode(errors="replace")
+        raise FFmpegError(f"ffmpeg exited with {returncode}: {tail}")
+
+
+def transcode(source: Path, out_dir: Path, progress: ProgressCallback) -> dict:
+    """
+    Write HLS renditions of ``source`` and a poster frame to ``out_dir``.
+    Returns the probed source info and the renditions written, with paths
+    relative to ``out_dir``.
+    """
+    info = probe(source)
+    # Heartbeat between probing and the first progress line
+    progress(0.0)
+    renditions = select_renditions(info["height"])
+    for r in renditions:
+        (out_dir / rendition_name(r)).mkdir(parents=True, exist_ok=True)
+    log_path = out_dir.parent / "ffmpeg.log"
+    run(hls_command(source, out_dir, info, renditions), log_path, info["duration"], progress)
+    run(poster_command(source, out_dir / POSTER, info), log_path)
+    progress(1.0)
+    return {
+        **info,
+        "master": MASTER_PLAYLIST,
+        "poster": POSTER,
+        "renditions": [
+            {"name": rendition_name(r), "height": r["height"],
+             "bandwidth": (r["video_kbps"] + (r["audio_kbps"] if info["has_audio"] else 0)) * 1000,
+             "playlist": f"{rendition_name(r)}/index.m3u8"}
+            for r in renditions
+        ],
+    }
@@ -0,0 +1,212 @@
+"""
+Maintenance jobs run by the worker's scheduler.
+
+Each job works through its rows in batches of ``MAINTENANCE_BATCH_SIZE``,
+one short transaction per batch, pausing ``MAINTENANCE_BATCH_PAUSE_SECONDS``
+between batches. On Postgres a batch selects its rows ``FOR UPDATE SKIP
+LOCKED`` under ``lock_timeout``, so it never waits behind (or blocks) a
+request touching the same rows for long; skipped rows are picked up on the
+next run. Every job returns the number of rows it changed.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+
+from sqlalchemy import case, delete, exists, select, text, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+from app.crud.upload import discard_upload
+from app.db.partitions import PARTITIONED_TABLES, archive_expired_partitions, ensure_partitions
+from app.models.token import RefreshToken, TokenRevocation
+from app.models.transcode import TranscodeJob
+from app.models.upload import UploadSession
+from app.models.user import User
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def run_in_batches(
+    db: Session,
+    select_ids: Select,
+    apply: Callable[[List[int]], None],
+    stop: Optional[threading.Event] = None,
+    batch_size: Optional[int] = None,
+    pause: Optional[float] = None,
+) -> int:
+    """
+    Repeatedly select up to ``batch_size`` ids with ``select_ids`` and pass
+    them to ``apply``, committing after each batch, until none are left or
+    ``stop`` is set.
+    """
+    batch_size = batch_size or settings.MAINTENANCE_BATCH_SIZE
+    pause = settings.MAINTENANCE_BATCH_PAUSE_SECONDS if pause is None else pause
+    stop = stop or threading.Event()
+    postgres = db.get_bind().dialect.name == "postgresql"
+    total = 0
+    while not stop.is_set():
+        if postgres:
+            db.execute(text(f"SET LOCAL lock_timeout = {int(settings.MAINTENANCE_LOCK_TIMEOUT_MS)}"))
+        ids = db.execute(
+            select_ids.limit(batch_size).with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not ids:
+            db.rollback()
+            break
+        apply(ids)
+        db.commit()
+        total += len(ids)
+        if len(ids) < batch_size:
+            break
+        stop.wait(pause)
+    return total
+
+
+def clear_expired_reset_tokens(db: Session, stop: Optional[threading.Event] = None) -> int:
+    def apply(ids: List[int]) -> None:
+        db.execute(
+            update(User).where(User.id.in_(ids))
+            .values(reset_token=None, reset_token_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    # Repeats the partial index condition so ix_users_reset_token_expires_at is used
+    select_ids = select(User.id).where(
+        User.reset_token.isnot(None), User.reset_token_expires_at < _utcnow()
+    )
+    return run_in_batches(db, select_ids, apply, stop)
+
+
+def clear_expired_verification_tokens(db: Session, stop: Optional[threading.Event] = None) -> int:
+    def apply(ids: List[int]) -> None:
+        db.execute(
+            update(User).where(User.id.in_(ids))
+            .values(verification_token=None, verification_token_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    select_ids = select(User.id).where(
+        User.verification_token.isnot(None), User.verification_token_expires_at < _utcnow()
+    )
+    return run_in_batches(db, select_ids, apply, stop)
+
+
+def delete_expired_refresh_tokens(db: Session, stop: Optional[threading.Event] = None) -> int:
+    def apply(ids: List[int]) -> None:
+        db.execute(
+            delete(RefreshToken).where(RefreshToken.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+
+    # Revoked tokens are kept until they expire so reuse is still detected
+    select_ids = select(RefreshToken.id).where(RefreshToken.expires_at < _utcnow())
+    return run_in_batches(db, select_ids, apply, stop)
+
+
+def delete_expired_revocations(db: Session, stop: Optional[threading.Event] = None) -> int:
+    def apply(ids: List[int]) -> None:
+        db.execute(
+            delete(TokenRevocation).where(TokenRevocation.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+
+    # Once expired, no token the entry covers can still be valid
+    select_ids = select(TokenRevocation.id).where(TokenRevocation.expires_at < _utcnow())
+    return run_in_batches(db, select_ids, apply, stop)
+
+
+def purge_unverified_accounts(db: Session, stop: Optional[threading.Event] = None) -> int:
+    """Delete accounts never verified within ``UNVERIFIED_ACCOUNT_RETENTION_DAYS``."""
+    if settings.UNVERIFIED_ACCOUNT_RETENTION_DAYS <= 0:
+        return 0
+    from app.crud.user import invalidate_user_cache
+
+    purged: List[int] = []
+
+    def apply(ids: List[int]) -> None:
+        # Explicitly, as SQLite does not enforce ON DELETE CASCADE
+        db.execute(
+            delete(RefreshToken).where(RefreshToken.user_id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(delete(User).where(User.id.in_(ids)).execution_options(synchronize_session=False))
+        purged.extend(ids)
+
+    now = _utcnow()
+    cutoff = now - timedelta(days=settings.UNVERIFIED_ACCOUNT_RETENTION_DAYS)
+    select_ids = select(User.id).where(
+        User.email_verified.is_(False),
+        User.created_at < cutoff,
+        User.is_superuser.isnot(True),
+        # Someone is still using the account; leave it alone
+        ~exists().where(RefreshToken.user_id == User.id, RefreshToken.expires_at > now),
+    )
+    try:
+        return run_in_batches(db, select_ids, apply, stop)
+    finally:
+        # After commit, so a concurrent read cannot cache the user again
+        for user_id in purged:
+            invalidate_user_cache(user_id)
+
+
+def delete_expired_uploads(db: Session, stop: Optional[threading.Event] = None) -> int:
+    """Abort the multipart uploads of abandoned upload sessions and delete them."""
+    def apply(ids: List[str]) -> None:
+        for upload in db.query(UploadSession).filter(UploadSession.id.in_(ids)):
+            discard_upload(upload)
+        db.execute(
+            delete(UploadSession).where(UploadSession.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+
+    # Finalized sessions only keep finalize idempotent until they expire
+    select_ids = select(UploadSession.id).where(UploadSession.expires_at < _utcnow())
+    return run_in_batches(db, select_ids, apply, stop)
+
+
+def requeue_stalled_transcodes(db: Session, stop: Optional[threading.Event] = None) -> int:
+    """
+    Requeue running transcodes whose worker stopped heartbeating, or fail
+    them once out of attempts. A worker that comes back has lost its lease.
+    """
+    def apply(ids: List[int]) -> None:
+        db.execute(
+            update(TranscodeJob).where(TranscodeJob.id.in_(ids))
+            .values(
+                status=case(
+                    (TranscodeJob.attempts >= settings.TRANSCODE_MAX_ATTEMPTS, "failed"),
+                    else_="queued",
+                ),
+                worker_id=None,
+                error="Worker stopped responding",
+                run_after=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    now = _utcnow()
+    # Repeats the partial index condition so ix_transcode_jobs_running_heartbeat is used
+    select_ids = select(TranscodeJob.id).where(
+        TranscodeJob.status == "running",
+        TranscodeJob.heartbeat_at < now - timedelta(seconds=settings.TRANSCODE_LEASE_SECONDS),
+    )
+    return run_in_batches(db, select_ids, apply, stop)
+
+
+def maintain_partitions(db: Session, stop: Optional[threading.Event] = None) -> int:
+    """
+    Create upcoming monthly partitions and archive expired ones (Postgres).
+    Returns the number of partitions created or archived.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return 0
+    changed = 0
+    for table, retention_setting in PARTITIONED_TABLES.items():
+        if stop is not None and stop.is_set():
+            break
+        changed += len(ensure_partitions(db, table))
+        changed += len(archive_expired_partitions(db, table, getattr(settings, retention_setting)))
+    return changed
@@ -0,0 +1,83 @@
+"""
+Leader election through a Postgres advisory lock.
+
+Every worker tries ``pg_try_advisory_lock`` on a dedicated connection; the
+one that gets it is leader for as long as that connection lives, so a
+crashed or partitioned leader releases the lock without any lease to
+expire. Other databases have no advisory locks: the only worker there is
+always leader.
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    def __init__(self, engine: Engine, key: int):
+        self.engine = engine
+        self.key = key
+        self.held = False
+        self._conn: Optional[Connection] = None
+
+    @property
+    def _advisory(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    def acquire(self) -> bool:
+        """Try to become leader without blocking; returns whether we are."""
+        if self.held:
+            return True
+        if not self._advisory:
+            self.held = True
+            return True
+        try:
+            self._conn = self.engine.connect()
+            self.held = bool(self._conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}
+            ).scalar())
+            # The lock belongs to the session, not this transaction
+            self._conn.commit()
+        except Exception as e:
+            logger.warning(f"Leader election failed: {e}")
+            self.held = False
+        if not self.held:
+            self._close()
+        return self.held
+
+    def check(self) -> bool:
+        """Whether we are still leader, i.e. the lock connection is alive."""
+        if not self.held or not self._advisory:
+            return self.held
+        try:
+            self._conn.execute(text("SELECT 1"))
+            self._conn.commit()
+        except Exception as e:
+            logger.warning(f"Lost the leader lock connection: {e}")
+            self.held = False
+            self._close()
+        return self.held
+
+    def release(self) -> None:
+        if self.held and self._advisory:
+            try:
+                self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+                self._conn.commit()
+            except Exception as e:
+                logger.warning(f"Releasing the leader lock failed: {e}")
+        self.held = False
+        self._close()
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            try:
+                # Invalidate rather than return to the pool, so a lock the
+                # unlock above missed cannot outlive us on a pooled connection
+                self._conn.invalidate()
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
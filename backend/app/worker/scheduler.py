@@ -0,0 +1,118 @@
+"""
+Interval scheduler for the maintenance jobs.
+
+Only the leader (see ``app.worker.leader``) runs jobs; standby workers retry
+the election every ``WORKER_LEADER_RETRY_SECONDS``. Jobs run one at a time,
+each in its own session, and a failing job is logged and retried at its
+next interval without affecting the others. A job interrupted by a
+leadership change is harmless: every job is idempotent and batched.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.worker import jobs
+from app.worker.leader import LeaderLock
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[[Session, threading.Event], int]
+
+
+class Job:
+    def __init__(self, name: str, func: JobFunc, interval: float):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.next_run = 0.0  # Due as soon as we become leader
+        self.last_result: Optional[dict] = None
+
+
+def default_jobs() -> List[Job]:
+    token_sweep = settings.TOKEN_SWEEP_INTERVAL_SECONDS
+    return [
+        Job("clear_expired_reset_tokens", jobs.clear_expired_reset_tokens, token_sweep),
+        Job("clear_expired_verification_tokens", jobs.clear_expired_verification_tokens, token_sweep),
+        Job("delete_expired_refresh_tokens", jobs.delete_expired_refresh_tokens, token_sweep),
+        Job("delete_expired_revocations", jobs.delete_expired_revocations, token_sweep),
+        Job("purge_unverified_accounts", jobs.purge_unverified_accounts,
+            settings.UNVERIFIED_PURGE_INTERVAL_SECONDS),
+        Job("delete_expired_uploads", jobs.delete_expired_uploads,
+            settings.UPLOAD_SWEEP_INTERVAL_SECONDS),
+        Job("requeue_stalled_transcodes", jobs.requeue_stalled_transcodes,
+            settings.TRANSCODE_STALL_SWEEP_INTERVAL_SECONDS),
+        Job("maintain_partitions", jobs.maintain_partitions,
+            settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS),
+    ]
+
+
+class Scheduler:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        leader: LeaderLock,
+        job_list: Optional[List[Job]] = None,
+        retry_interval: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self.leader = leader
+        self.jobs = default_jobs() if job_list is None else job_list
+        self.retry_interval = (
+            settings.WORKER_LEADER_RETRY_SECONDS if retry_interval is None else retry_interval
+        )
+        self.stop = threading.Event()
+
+    def _run_job(self, job: Job) -> dict:
+        start = time.perf_counter()
+        db = self.session_factory()
+        try:
+            rows = job.func(db, self.stop)
+            result = {"ok": True, "rows": rows}
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Job {job.name} failed: {e}")
+            result = {"ok": False, "error": str(e)}
+        finally:
+            db.close()
+        result["ms"] = round((time.perf_counter() - start) * 1000, 2)
+        if result["ok"] and result["rows"]:
+            logger.info(f"Job {job.name}: {result['rows']} rows in {result['ms']:.0f}ms")
+        return result
+
+    def run_pending(self, force: bool = False) -> Dict[str, dict]:
+        """Run the jobs that are due (or all of them with ``force``)."""
+        results = {}
+        for job in self.jobs:
+            if self.stop.is_set():
+                break
+            if not force and time.monotonic() < job.next_run:
+                continue
+            job.last_result = results[job.name] = self._run_job(job)
+            job.next_run = time.monotonic() + job.interval
+        return results
+
+    def _seconds_to_next_job(self) -> float:
+        next_run = min((job.next_run for job in self.jobs), default=float("inf"))
+        return max(0.0, next_run - time.monotonic())
+
+    def run_forever(self) -> None:
+        """Elect, run due jobs and sleep until ``stop`` is set."""
+        try:
+            while not self.stop.is_set():
+                if not self.leader.held:
+                    if not self.leader.acquire():
+                        self.stop.wait(self.retry_interval)
+                        continue
+                    logger.info("Became maintenance leader")
+                elif not self.leader.check():
+                    logger.warning("Lost maintenance leadership")
+                    continue
+                self.run_pending()
+                # Wake up at least every retry interval to check the lock
+                self.stop.wait(min(self._seconds_to_next_job(), self.retry_interval))
+        finally:
+            self.leader.release()
@@ -0,0 +1,314 @@
+"""
+Video transcoding queue and worker pool (``start_transcoder.py``).
+
+Finalizing a video upload queues a ``TranscodeJob`` in the same transaction
+(see app/crud/transcode.py). A ``TranscodePool`` runs
+``TRANSCODE_CONCURRENCY`` threads, each claiming the queued job with the
+lowest priority (the smallest source) using ``FOR UPDATE SKIP LOCKED``, so
+any number of pools on any number of hosts share the queue without handing
+out a job twice. Each thread drives one ffmpeg process; the pool's size is
+what bounds CPU use.
+
+While ffmpeg runs, progress is written every
+``TRANSCODE_PROGRESS_INTERVAL_SECONDS``. The same write is the job's
+heartbeat and the point where a cancellation or shutdown is noticed; the
+source download and the output upload heartbeat the same way, so no step
+of a long clip outlasts ``TRANSCODE_LEASE_SECONDS`` silently. A worker that
+stops heartbeating has its job requeued by the maintenance worker
+(``requeue_stalled_transcodes``). Outputs go to keys derived from the
+media id, with the master playlist written last, so a retry overwrites a
+failed attempt's partial output and players never see an incomplete set.
+"""
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from sqlalchemy import select, text, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.storage import get_object_store
+from app.models.media import Media
+from app.models.transcode import TranscodeJob
+from app.worker import ffmpeg
+
+logger = logging.getLogger(__name__)
+
+Transcoder = Callable[[Path, Path, ffmpeg.ProgressCallback], dict]
+
+CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+    ".jpg": "image/jpeg",
+}
+
+
+class Cancelled(Exception):
+    """The job was cancelled while it ran."""
+
+
+class Interrupted(Exception):
+    """The pool is shutting down, or the job's lease went to another worker."""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def output_prefix(media: Media) -> str:
+    return f"media/{media.user_id}/{media.id}/"
+
+
+def claim_next(db: Session, worker_id: str) -> Optional[TranscodeJob]:
+    """Mark the next due queued job running under ``worker_id`` and return it."""
+    now = _utcnow()
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"SET LOCAL lock_timeout = {int(settings.MAINTENANCE_LOCK_TIMEOUT_MS)}"))
+    job = db.execute(
+        select(TranscodeJob)
+        .where(TranscodeJob.status == "queued", TranscodeJob.run_after <= now)
+        .order_by(TranscodeJob.priority, TranscodeJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar_one_or_none()
+    if job is None:
+        db.rollback()
+        return None
+    job.status = "running"
+    job.attempts += 1
+    job.worker_id = worker_id
+    job.progress = 0.0
+    job.error = None
+    job.started_at = job.heartbeat_at = now
+    db.commit()
+    return job
+
+
+class Lease:
+    """A claimed job: its id and the attempt it was claimed for."""
+
+    def __init__(self, job: TranscodeJob):
+        self.job_id = job.id
+        self.media_id = job.media_id
+        self.attempt = job.attempts
+
+
+def _update_leased(db: Session, lease: Lease, **values) -> bool:
+    """
+    Update the job and commit if it is still running under the claimed
+    attempt; otherwise roll back and return False.
+    """
+    result = db.execute(
+        update(TranscodeJob)
+        .where(
+            TranscodeJob.id == lease.job_id,
+            TranscodeJob.status == "running",
+            TranscodeJob.attempts == lease.attempt,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        return False
+    db.commit()
+    return True
+
+
+class ProgressReporter:
+    """
+    The progress callback handed to the transcoder. Writes progress and the
+    heartbeat at most every ``interval`` seconds and raises ``Cancelled`` or
+    ``Interrupted`` there, which kills ffmpeg. Called without a fraction it
+    only heartbeats (during the download and upload).
+    """
+
+    def __init__(self, db: Session, lease: Lease, stop: threading.Event,
+                 interval: Optional[float] = None):
+        self.db = db
+        self.lease = lease
+        self.stop = stop
+        self.interval = settings.TRANSCODE_PROGRESS_INTERVAL_SECONDS if interval is None else interval
+        self._last = float("-inf")
+
+    def __call__(self, fraction: Optional[float] = None) -> None:
+        if self.stop.is_set():
+            raise Interrupted("shutting down")
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return
+        self._last = now
+        values = {"heartbeat_at": _utcnow()}
+        if fraction is not None:
+            values["progress"] = round(fraction, 4)
+        if not _update_leased(self.db, self.lease, **values):
+            raise Interrupted("lease lost")
+        cancel = self.db.execute(
+            select(TranscodeJob.cancel_requested).where(TranscodeJob.id == self.lease.job_id)
+        ).scalar()
+        if cancel:
+            raise Cancelled()
+
+
+def store_outputs(out_dir: Path, prefix: str,
+                  heartbeat: Callable[[], None] = lambda: None) -> None:
+    """
+    Upload everything in ``out_dir`` under ``prefix``; the master playlist
+    last. ``heartbeat`` is called before every file.
+    """
+    store = get_object_store()
+    master = out_dir / ffmpeg.MASTER_PLAYLIST
+    files = sorted(path for path in out_dir.rglob("*") if path.is_file() and path != master)
+    for path in files + [master]:
+        heartbeat()
+        key = prefix + path.relative_to(out_dir).as_posix()
+        store.upload(key, path, CONTENT_TYPES.get(path.suffix, "application/octet-stream"))
+
+
+class TranscodeWorker:
+    """Claims and runs jobs one at a time; ``TranscodePool`` runs several."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        worker_id: Optional[str] = None,
+        transcoder: Optional[Transcoder] = None,
+        stop: Optional[threading.Event] = None,
+    ):
+        self.session_factory = session_factory
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.transcoder = transcoder or ffmpeg.transcode
+        self.stop = stop or threading.Event()
+
+    def run_once(self) -> Optional[str]:
+        """Run the next due job; returns its resulting status, or None if none was due."""
+        db = self.session_factory()
+        try:
+            job = claim_next(db, self.worker_id)
+            if job is None:
+                return None
+            return self.process(db, job)
+        finally:
+            db.close()
+
+    def process(self, db: Session, job: TranscodeJob) -> str:
+        lease = Lease(job)
+        start = time.perf_counter()
+        try:
+            media = db.execute(select(Media).where(Media.id == lease.media_id)).scalar_one_or_none()
+            if media is None:
+                raise ValueError("Media no longer exists")
+            with tempfile.TemporaryDirectory(prefix="transcode-") as tmp:
+                source, out_dir = Path(tmp) / "source", Path(tmp) / "out"
+                out_dir.mkdir()
+                reporter = ProgressReporter(db, lease, self.stop)
+                get_object_store().download(media.file_path, source, lambda received: reporter())
+                result = self.transcoder(source, out_dir, reporter)
+                prefix = output_prefix(media)
+                store_outputs(out_dir, prefix, reporter)
+        except Cancelled:
+            db.rollback()
+            _update_leased(db, lease, status="cancelled", finished_at=_utcnow(), worker_id=None)
+            logger.info(f"Transcode of media {lease.media_id} cancelled")
+            return "cancelled"
+        except Interrupted as e:
+            db.rollback()
+            # Not the job's fault: give the attempt back
+            _update_leased(db, lease, status="queued", attempts=lease.attempt - 1, worker_id=None,
+                           run_after=_utcnow())
+            logger.info(f"Transcode of media {lease.media_id} interrupted: {e}")
+            return "interrupted"
+        except Exception as e:
+            db.rollback()
+            return self._fail(db, lease, e)
+
+        media.thumbnail_path = prefix + result["poster"]
+        media.media_metadata = {
+            **(media.media_metadata or {}),
+            "duration": result["duration"],
+            "width": result["width"],
+            "height": result["height"],
+            "hls": prefix + result["master"],
+            "renditions": [
+                {**r, "playlist": prefix + r["playlist"]} for r in result["renditions"]
+            ],
+        }
+        db.flush()
+        # The media fields are committed with the job's status, or not at all
+        if not _update_leased(db, lease, status="succeeded", progress=1.0, finished_at=_utcnow(),
+                              worker_id=None):
+            return "interrupted"
+        ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Transcoded media {lease.media_id} ({result['duration']:.1f}s) in {ms:.0f}ms")
+        return "succeeded"
+
+    def _fail(self, db: Session, lease: Lease, error: Exception) -> str:
+        message = str(error)[-1000:] or type(error).__name__
+        # Bad input will not get better on retry
+        permanent = isinstance(error, ValueError)
+        if permanent or lease.attempt >= settings.TRANSCODE_MAX_ATTEMPTS:
+            _update_leased(db, lease, status="failed", error=message, finished_at=_utcnow(),
+                           worker_id=None)
+            logger.error(f"Transcode of media {lease.media_id} failed: {message}")
+            return "failed"
+        delay = settings.TRANSCODE_RETRY_BACKOFF_SECONDS * 2 ** (lease.attempt - 1)
+        _update_leased(db, lease, status="queued", error=message, worker_id=None,
+                       run_after=_utcnow() + timedelta(seconds=delay))
+        logger.warning(f"Transcode of media {lease.media_id} failed, retrying in {delay:.0f}s: {message}")
+        return "queued"
+
+
+class TranscodePool:
+    """``concurrency`` threads, each running a ``TranscodeWorker`` until ``stop`` is set."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        concurrency: Optional[int] = None,
+        transcoder: Optional[Transcoder] = None,
+        poll_interval: Optional[float] = None,
+    ):
+        self.stop = threading.Event()
+        self.concurrency = concurrency or settings.TRANSCODE_CONCURRENCY
+        self.poll_interval = (
+            settings.TRANSCODE_POLL_INTERVAL_SECONDS if poll_interval is None else poll_interval
+        )
+        base = f"{socket.gethostname()}:{os.getpid()}"
+        self.workers = [
+            TranscodeWorker(session_factory, f"{base}:{i}", transcoder, self.stop)
+            for i in range(self.concurrency)
+        ]
+        self._threads: List[threading.Thread] = []
+
+    def _loop(self, worker: TranscodeWorker) -> None:
+        while not self.stop.is_set():
+            try:
+                status = worker.run_once()
+            except Exception as e:
+                # Lost the database; back off and try again
+                logger.error(f"Transcode worker {worker.worker_id}: {e}")
+                status = None
+            if status is None:
+                self.stop.wait(self.poll_interval)
+
+    def start(self) -> None:
+        for worker in self.workers:
+            thread = threading.Thread(target=self._loop, args=(worker,), name=worker.worker_id,
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def shutdown(self) -> None:
+        """Stop claiming; running jobs are killed at their next progress report and requeued."""
+        self.stop.set()
+        self.join()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark response compression: CPU time versus bytes saved per codec/level.
+
+The payload is a ``GET /users/`` style JSON listing.
+
+Usage:
+    python -m benchmarks.bench_compression [--rows 1000] [--repeat 20]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.compression import BrotliCodec, GzipCodec, ZstdCodec, available_codecs
+from app.core.responses import ModelResponse
+from app.schemas import user as user_schemas
+from benchmarks.bench_serialization import make_rows
+
+LEVELS = {
+    "gzip": (GzipCodec, [1, 6, 9]),
+    "br": (BrotliCodec, [1, 4, 6, 11]),
+    "zstd": (ZstdCodec, [1, 3, 9, 19]),
+}
+
+
+def run(rows: int = 1000, repeat: int = 20) -> List[dict]:
+    payload = ModelResponse(make_rows(rows), List[user_schemas.User]).body
+    available = available_codecs()
+    results = []
+    for name, (codec_cls, levels) in LEVELS.items():
+        if name not in available:
+            continue
+        for level in levels:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                codec = codec_cls(level)
+                compressed = codec.compress(payload) + codec.finish()
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            median = timings[len(timings) // 2]
+            results.append({
+                "codec": name,
+                "level": level,
+                "input_bytes": len(payload),
+                "output_bytes": len(compressed),
+                "ratio": len(payload) / len(compressed),
+                "median_ms": median * 1000,
+                "mb_per_s": len(payload) / median / 1e6,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat)
+    print(f"input: {results[0]['input_bytes']} bytes")
+    print(f"{'codec':<6}{'level':>6}{'bytes':>10}{'ratio':>8}{'ms':>9}{'MB/s':>9}")
+    for r in results:
+        print(f"{r['codec']:<6}{r['level']:>6}{r['output_bytes']:>10}"
+              f"{r['ratio']:>8.2f}{r['median_ms']:>9.2f}{r['mb_per_s']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Partition pruning and latency of the feed and profile grid queries.
+
+Needs ``BENCH_DATABASE_URL`` pointing at an ephemeral Postgres database: its
+public schema is recreated, the Alembic migrations are applied, monthly
+partitions are created ``--months`` back and ``--media`` rows spread over
+them by a single ``generate_series`` insert. Every query issued for a feed
+page and a profile grid page is then run under ``EXPLAIN (ANALYZE)`` and the
+partitions it actually read are listed; a page should read only the month
+(or months) it returns rows from. The same pages are also timed against a
+query without the month bounds, which has to probe every partition.
+
+Usage:
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_partitions [--media 2000000]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from argparse import Namespace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.crud import media as media_crud
+from app.db.partitions import add_months, ensure_partitions, month_start
+from app.models.media import Media
+from benchmarks.harness import measure, write_results
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+USERS_FILL = """
+INSERT INTO users (email, username, hashed_password, is_active, created_at)
+SELECT 'user' || i || '@example.com', 'user' || i, 'x', true, now()
+FROM generate_series(1, :users) AS i
+"""
+
+# Uniform over the last :months months; one item in 10 private
+MEDIA_FILL = """
+INSERT INTO media (user_id, file_path, media_type, is_private, created_at)
+SELECT 1 + (i % :users), 'bench/' || i || '.jpg', 'image', i % 10 = 0,
+       now() - random() * (:months * interval '30 days')
+FROM generate_series(1, :media) AS i
+"""
+
+_PARTITION_RE = re.compile(r" on (media_p\d{4}_\d{2})")
+
+
+def setup(url: str, users: int, media: int, months: int) -> float:
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    settings.DATABASE_URL = url
+    config = Config(cmd_opts=Namespace(x=[]))
+    config.set_main_option("script_location", str(BACKEND / "alembic"))
+    command.upgrade(config, "head")
+
+    start = time.perf_counter()
+    with Session(engine) as db:
+        first = add_months(month_start(datetime.now(timezone.utc)), -months)
+        ensure_partitions(db, "media", now=first, ahead=months + settings.PARTITION_MONTHS_AHEAD)
+    with engine.begin() as conn:
+        conn.execute(text(USERS_FILL), {"users": users})
+        conn.execute(text(MEDIA_FILL), {"users": users, "media": media, "months": months})
+        conn.execute(text("ANALYZE media"))
+    engine.dispose()
+    return time.perf_counter() - start
+
+
+def capture(db: Session, fn) -> List[Tuple[str, dict]]:
+    """Every statement ``fn(db)`` issues, with its parameters."""
+    captured = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    bind = db.get_bind()
+    event.listen(bind, "before_cursor_execute", listener)
+    try:
+        fn(db)
+    finally:
+        event.remove(bind, "before_cursor_execute", listener)
+    return captured
+
+
+def partitions_read(db: Session, fn) -> List[List[str]]:
+    """For each statement ``fn`` issues, the partitions EXPLAIN ANALYZE shows it reading."""
+    result = []
+    cursor = db.connection().connection.cursor()
+    try:
+        for statement, parameters in capture(db, fn):
+            cursor.execute("EXPLAIN (ANALYZE, COSTS OFF) " + statement, parameters)
+            plan = [row[0] for row in cursor.fetchall()]
+            # Subplans pruned at executor start-up show as "never executed"
+            read = [
+                match.group(1) for line in plan if "never executed" not in line
+                for match in [_PARTITION_RE.search(line)] if match
+            ]
+            result.append(sorted(set(read)))
+    finally:
+        cursor.close()
+    return result
+
+
+def unbounded_feed(db: Session, limit: int) -> List[Media]:
+    return (
+        db.query(Media).filter(Media.is_private.is_(False))
+        .order_by(Media.created_at.desc(), Media.id.desc()).limit(limit).all()
+    )
+
+
+def run(users: int = 10_000, media: int = 2_000_000, months: int = 24,
+        repeat: int = 100) -> Dict[str, dict]:
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        raise SystemExit("BENCH_DATABASE_URL must point at an ephemeral Postgres database")
+    fill_s = setup(url, users, media, months)
+    engine = create_engine(url)
+    db = sessionmaker(bind=engine)()
+    limit = settings.FEED_PAGE_SIZE
+    try:
+        _, cursor = media_crud.get_feed(db, limit=limit)
+        # A page from about a year back
+        old = db.execute(text(
+            "SELECT created_at, id FROM media WHERE created_at < now() - interval '365 days' "
+            "ORDER BY created_at DESC LIMIT 1"
+        )).first()
+        old_cursor = media_crud.encode_cursor(Media(created_at=old[0], id=old[1])) if old else cursor
+        pages = {
+            "feed.first": lambda db: media_crud.get_feed(db, limit=limit),
+            "feed.second": lambda db: media_crud.get_feed(db, cursor=cursor, limit=limit),
+            "feed.year_ago": lambda db: media_crud.get_feed(db, cursor=old_cursor, limit=limit),
+            "grid.first": lambda db: media_crud.get_profile_grid(db, 1, limit=limit),
+            "feed.unbounded": lambda db: unbounded_feed(db, limit),
+        }
+        results = {"setup": {"users": users, "media": media, "months": months, "fill_s": fill_s}}
+        for name, fn in pages.items():
+            results[name] = measure(lambda: fn(db), repeat)
+            results[name]["partitions"] = partitions_read(db, fn)
+    finally:
+        db.close()
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--media", type=int, default=2_000_000)
+    parser.add_argument("--months", type=int, default=24, help="Months of history to fill")
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = run(args.users, args.media, args.months, args.repeat)
+    setup_info = results.pop("setup")
+    print(f"{setup_info['media']} media over {setup_info['months']} months, "
+          f"filled in {setup_info['fill_s']:.1f}s")
+    print(f"\n{'page':<18}{'p50 ms':>10}{'p95 ms':>10}  partitions read per query")
+    for name, r in results.items():
+        read = "; ".join(",".join(p) or "-" for p in r["partitions"])
+        print(f"{name:<18}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}  {read}")
+    results["setup"] = setup_info
+    print(f"\nResults written to {write_results('partitions', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Latency of user search and username autocomplete on a synthetic user table.
+
+With ``BENCH_DATABASE_URL`` pointing at an ephemeral Postgres database the
+table is filled with ``--users`` rows (1M by default) by a single
+``generate_series`` insert, the migration's ``pg_trgm`` indexes are created
+and ``search_users``/``autocomplete_users`` are timed against them, along
+with the ``EXPLAIN`` plan of each query. Without it a SQLite database with
+``--sqlite-users`` rows is used, which only exercises the substring
+fallback.
+
+The in-memory handle trie is benchmarked on its own as well: build time,
+approximate size and lookup latency for ``AUTOCOMPLETE_TRIE_SIZE`` handles.
+
+Usage:
+    python -m benchmarks.bench_search [--users 1000000] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.autocomplete import HandleCache, PrefixTrie, set_handle_cache
+from app.core.config import settings
+from app.crud import user as user_crud
+from app.db.session import Base
+from app.models.user import User
+from benchmarks.harness import measure, write_results
+
+SEARCH_TERMS = ["ann", "smi", "user12", "zz", "john s", "a"]
+PREFIXES = ["a", "an", "ann", "user1", "user12345", "qx"]
+
+# Random handles like "user123456_kq"; full names drawn from a small vocabulary
+_FIRST = ["anna", "john", "maria", "li", "sam", "olga", "ravi", "zoe", "omar", "ines"]
+_LAST = ["smith", "garcia", "chen", "kumar", "novak", "silva", "brown", "ito", "khan", "berg"]
+
+POSTGRES_FILL = """
+INSERT INTO users (email, username, hashed_password, full_name, is_active, created_at)
+SELECT
+    'user' || i || '@example.com',
+    'user' || i || '_' || substr(md5(i::text), 1, 2),
+    'x',
+    (ARRAY{first})[1 + i % {n_first}] || ' ' || (ARRAY{last})[1 + (i / {n_first}) % {n_last}],
+    true,
+    now() - (i || ' seconds')::interval
+FROM generate_series(1, :users) AS i
+"""
+
+POSTGRES_INDEXES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (lower(username) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_full_name_trgm ON users USING gin (lower(full_name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_prefix ON users (lower(username) text_pattern_ops)",
+    "ANALYZE users",
+]
+
+
+def _pg_array(values: List[str]) -> str:
+    return "[" + ", ".join(f"'{v}'" for v in values) + "]"
+
+
+def fill_postgres(engine, users: int) -> float:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    sql = POSTGRES_FILL.format(
+        first=_pg_array(_FIRST), last=_pg_array(_LAST), n_first=len(_FIRST), n_last=len(_LAST)
+    )
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(text(sql), {"users": users})
+        for statement in POSTGRES_INDEXES:
+            conn.execute(text(statement))
+    return time.perf_counter() - start
+
+
+def fill_sqlite(engine, users: int) -> float:
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {
+                "email": f"user{i}@example.com",
+                "username": f"user{i}_" + "".join(rng.choices(string.ascii_lowercase, k=2)),
+                "hashed_password": "x",
+                "full_name": f"{rng.choice(_FIRST)} {rng.choice(_LAST)}",
+                "is_active": True,
+            }
+            for i in range(users)
+        ])
+    return time.perf_counter() - start
+
+
+def explain(db: Session, fn, *args) -> List[str]:
+    """The ``EXPLAIN`` plan of the last query ``fn`` issues (Postgres only)."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    bind = db.get_bind()
+    event.listen(bind, "before_cursor_execute", capture)
+    try:
+        fn(db, *args)
+    finally:
+        event.remove(bind, "before_cursor_execute", capture)
+    statement, parameters = captured[-1]
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute("EXPLAIN " + statement, parameters)
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def bench_database(db: Session, repeat: int, plans: bool) -> Dict[str, dict]:
+    # A trie that never answers, so autocomplete always goes to the database
+    set_handle_cache(HandleCache(max_handles=0, refresh_interval=float("inf")))
+    results = {}
+    for term in SEARCH_TERMS:
+        results[f"search[{term}]"] = measure(lambda: user_crud.search_users(db, term, 20), repeat)
+        if plans:
+            results[f"search[{term}]"]["plan"] = explain(db, user_crud.search_users, term, 20)
+    for prefix in PREFIXES:
+        results[f"autocomplete.db[{prefix}]"] = measure(
+            lambda: user_crud.autocomplete_users(db, prefix, 10), repeat
+        )
+    set_handle_cache(None)
+    return results
+
+
+def bench_trie(db: Session, repeat: int) -> Dict[str, dict]:
+    handles = HandleCache(
+        max_handles=settings.AUTOCOMPLETE_TRIE_SIZE,
+        refresh_interval=float("inf"),
+        top_k=settings.AUTOCOMPLETE_MAX_LIMIT,
+    )
+    start = time.perf_counter()
+    user_crud.refresh_handle_cache(db, handles)
+    results = {"trie.rebuild": {"handles": len(handles.trie),
+                                "ms": (time.perf_counter() - start) * 1000,
+                                "approx_bytes": trie_size(handles.trie)}}
+    for prefix in PREFIXES:
+        results[f"trie.lookup[{prefix}]"] = measure(lambda: handles.lookup(prefix, 10), repeat * 10)
+    return results
+
+
+def trie_size(trie: PrefixTrie) -> int:
+    """Approximate memory held by the trie's nodes and entry lists."""
+    total, stack = 0, [trie.root]
+    while stack:
+        node = stack.pop()
+        total += sys.getsizeof(node) + sys.getsizeof(node.top)
+        if node.children is not None:
+            total += sys.getsizeof(node.children)
+            stack.extend(node.children.values())
+    return total
+
+
+def run(users: int = 1_000_000, sqlite_users: int = 100_000,
+        repeat: int = 200) -> Dict[str, dict]:
+    url = os.getenv("BENCH_DATABASE_URL")
+    tmp = None
+    if url:
+        engine = create_engine(url)
+        fill_s = fill_postgres(engine, users)
+    else:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        engine = create_engine(f"sqlite:///{tmp.name}")
+        users = sqlite_users
+        fill_s = fill_sqlite(engine, users)
+    postgres = engine.dialect.name == "postgresql"
+    db = sessionmaker(bind=engine)()
+    try:
+        results = {"setup": {"dialect": engine.dialect.name, "users": users, "fill_s": fill_s}}
+        results.update(bench_database(db, repeat, plans=postgres))
+        results.update(bench_trie(db, repeat))
+    finally:
+        db.close()
+        engine.dispose()
+        if tmp is not None:
+            os.unlink(tmp.name)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1_000_000, help="Postgres table size")
+    parser.add_argument("--sqlite-users", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = run(args.users, args.sqlite_users, args.repeat)
+    setup = results.pop("setup")
+    print(f"{setup['dialect']}: {setup['users']} users, filled in {setup['fill_s']:.1f}s")
+    rebuild = results.pop("trie.rebuild")
+    print(f"trie: {rebuild['handles']} handles, built in {rebuild['ms']:.0f} ms, "
+          f"~{rebuild['approx_bytes'] / 1e6:.1f} MB")
+    print(f"\n{'query':<32}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, r in results.items():
+        print(f"{name:<32}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}")
+        for line in r.get("plan", []):
+            print(f"    {line}")
+    results["setup"], results["trie.rebuild"] = setup, rebuild
+    print(f"\nResults written to {write_results('search', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON serialization of user listings (``GET /users/``).
+
+Compares, per 1k ORM rows:
+  * fastapi_default - response_model validate + dump_python + stdlib json
+  * orjson_response - response_model validate + dump_python + ORJSONResponse
+  * model_response  - ModelResponse (TypeAdapter validate + dump_json)
+
+Usage:
+    python -m benchmarks.bench_serialization [--rows 1000] [--repeat 50]
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.core.responses import ModelResponse, type_adapter
+from app.models.user import User
+from app.schemas import user as user_schemas
+
+
+def make_rows(count: int) -> List[User]:
+    now = datetime.now(timezone.utc)
+    return [
+        User(
+            id=i,
+            email=f"user{i}@example.com",
+            username=f"user{i}",
+            hashed_password="x",
+            full_name=f"User Number {i}",
+            bio="Photographer, traveller and coffee enthusiast." * 2,
+            profile_picture=f"avatars/{i:08x}",
+            is_active=True,
+            is_superuser=False,
+            email_verified=bool(i % 2),
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def fastapi_default(rows):
+    adapter = type_adapter(List[user_schemas.User])
+    value = adapter.validate_python(rows, from_attributes=True)
+    return JSONResponse(jsonable_encoder(adapter.dump_python(value, mode="json"))).body
+
+
+def orjson_response(rows):
+    adapter = type_adapter(List[user_schemas.User])
+    value = adapter.validate_python(rows, from_attributes=True)
+    return ORJSONResponse(adapter.dump_python(value, mode="json")).body
+
+
+def model_response(rows):
+    return ModelResponse(rows, List[user_schemas.User]).body
+
+
+STRATEGIES = {
+    "fastapi_default": fastapi_default,
+    "orjson_response": orjson_response,
+    "model_response": model_response,
+}
+
+
+def run(rows: int = 1000, repeat: int = 50) -> dict:
+    data = make_rows(rows)
+    reference = json.loads(model_response(data))
+    results = {}
+    for name, strategy in STRATEGIES.items():
+        assert json.loads(strategy(data)) == reference, name
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            strategy(data)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        results[name] = {
+            "median_ms_per_1k_rows": timings[len(timings) // 2] * 1000 * 1000 / rows,
+            "min_ms_per_1k_rows": timings[0] * 1000 * 1000 / rows,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat)
+    baseline = results["fastapi_default"]["median_ms_per_1k_rows"]
+    print(f"{'strategy':<18}{'median ms/1k':>14}{'speedup':>10}")
+    for name, result in results.items():
+        median = result["median_ms_per_1k_rows"]
+        print(f"{name:<18}{median:>14.3f}{baseline / median:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Compare requests per second of the development and production launchers.
+
+Starts each server profile as a real process on a free local port, waits
+for ``/health`` and drives it over HTTP from several client processes, so
+the load generator is not the bottleneck for a multi-worker server:
+
+* ``dev``: ``uvicorn --reload``, as ``python start_server.py`` runs it
+* ``prod``: gunicorn with ``gunicorn_conf.py``, as ``start_server.py --prod``
+
+The default paths do not touch the database, so no Postgres is needed.
+
+Usage:
+    python -m benchmarks.bench_server [--profiles dev prod] [--duration 10]
+        [--concurrency 64] [--clients 4] [--paths /health /]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from benchmarks.harness import summarize, write_results
+
+PROFILES = {
+    "dev": lambda port: [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--reload",
+    ],
+    "prod": lambda port: [
+        sys.executable, "-m", "gunicorn", "-c", str(BASE_DIR / "gunicorn_conf.py"), "app.main:app",
+    ],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(profile: str, port: int, timeout: float = 30.0) -> subprocess.Popen:
+    env = dict(os.environ, BIND=f"127.0.0.1:{port}", ACCESS_LOG="", LOG_LEVEL="warning")
+    process = subprocess.Popen(
+        PROFILES[profile](port), cwd=BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{profile} server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"{profile} server did not become healthy within {timeout}s")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def _client(base_url: str, paths: List[str], duration: float,
+                  concurrency: int) -> Tuple[List[float], int]:
+    timings: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker(offset: int):
+            nonlocal errors
+            n = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(paths[n % len(paths)])
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                timings.append(time.perf_counter() - start)
+                n += 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return timings, errors
+
+
+def _client_process(args) -> Tuple[List[float], int]:
+    return asyncio.run(_client(*args))
+
+
+def drive(base_url: str, paths: List[str], duration: float,
+          concurrency: int, clients: int) -> Dict[str, float]:
+    per_client = max(1, concurrency // clients)
+    with multiprocessing.Pool(clients) as pool:
+        start = time.perf_counter()
+        parts = pool.map(_client_process, [(base_url, paths, duration, per_client)] * clients)
+        elapsed = time.perf_counter() - start
+    timings = [t for part, _ in parts for t in part]
+    stats = summarize(timings)
+    stats.update({
+        "requests": len(timings),
+        "errors": sum(errors for _, errors in parts),
+        "concurrency": per_client * clients,
+        "elapsed_s": elapsed,
+        "requests_per_s": len(timings) / duration,
+    })
+    return stats
+
+
+def run(profiles: List[str], paths: List[str], duration: float = 10.0,
+        concurrency: int = 64, clients: int = 4, warmup: float = 2.0) -> Dict[str, dict]:
+    results = {}
+    for profile in profiles:
+        port = free_port()
+        process = start_server(profile, port)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            drive(base_url, paths, warmup, concurrency, clients)
+            results[profile] = drive(base_url, paths, duration, concurrency, clients)
+        finally:
+            stop_server(process)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profiles", nargs="*", choices=list(PROFILES), default=list(PROFILES))
+    parser.add_argument("--paths", nargs="*", default=["/health", "/"])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = run(args.profiles, args.paths, args.duration, args.concurrency, args.clients)
+    print(f"{'profile':<10}{'req':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for profile, r in results.items():
+        print(f"{profile:<10}{r['requests']:>8}{r['requests_per_s']:>10.1f}{r['p50_ms']:>10.2f}"
+              f"{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['errors']:>8}")
+    print(f"\nResults written to {write_results('server', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Start-up cost of the API process, measured with ``python -X importtime``.
+
+Each run imports the application in a fresh interpreter, which is what a
+gunicorn worker respawn or a serverless cold start pays. Reports the
+cumulative import time of the module (median over runs), the slowest
+imports, and heavy optional subsystems that were loaded even though the
+app should only import them on first use.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat 5] [--top 15] [--module app.main]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from benchmarks.harness import write_results
+
+# Upper bound enforced by test_startup.py; override on slow machines
+IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "2500"))
+
+# Subsystems that must be imported lazily, not when the app module loads
+LAZY_MODULES = (
+    "fastapi_mail",
+    "passlib.context",
+    "jose.jwt",
+    "httpx",
+    "redis",
+    "jinja2",
+    "minio",
+    "PIL.Image",
+    "uvicorn",
+    "dotenv",
+)
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(output: str) -> Dict[str, Tuple[int, int]]:
+    """``{module: (self_us, cumulative_us)}`` from ``-X importtime`` output."""
+    times = {}
+    for line in output.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, _, module = match.groups()
+            times[module] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def import_once(module: str = "app.main") -> Tuple[Dict[str, Tuple[int, int]], List[str]]:
+    """Import ``module`` in a fresh interpreter; returns import times and loaded lazy modules."""
+    code = (
+        f"import sys, {module}\n"
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", code],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True,
+    )
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return parse_importtime(result.stderr), loaded
+
+
+def run(module: str = "app.main", repeat: int = 5, top: int = 15) -> Dict[str, object]:
+    totals: List[float] = []
+    runs = []
+    loaded: List[str] = []
+    for _ in range(repeat):
+        times, loaded = import_once(module)
+        totals.append(times[module][1] / 1000)
+        runs.append(times)
+    # Slowest modules by self time in the median run
+    median_run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    slowest = sorted(median_run.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    return {
+        "module": module,
+        "import_ms": statistics.median(totals),
+        "import_ms_min": min(totals),
+        "import_ms_max": max(totals),
+        "modules_imported": len(median_run),
+        "budget_ms": IMPORT_BUDGET_MS,
+        "eager_lazy_modules": loaded,
+        "slowest": [
+            {"module": name, "self_ms": s / 1000, "cumulative_ms": c / 1000}
+            for name, (s, c) in slowest
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = run(args.module, args.repeat, args.top)
+    print(f"import {results['module']}: {results['import_ms']:.1f} ms median "
+          f"({results['import_ms_min']:.1f}-{results['import_ms_max']:.1f}), "
+          f"{results['modules_imported']} modules, budget {results['budget_ms']:.0f} ms")
+    if results["eager_lazy_modules"]:
+        print(f"Loaded eagerly (should be lazy): {', '.join(results['eager_lazy_modules'])}")
+    print(f"\n{'module':<50}{'self ms':>10}{'cumul ms':>10}")
+    for row in results["slowest"]:
+        print(f"{row['module']:<50}{row['self_ms']:>10.1f}{row['cumulative_ms']:>10.1f}")
+    print(f"\nResults written to {write_results('startup', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files and flag regressions.
+
+Latency (p50) increases and throughput decreases beyond ``--threshold``
+percent are reported as regressions; the exit status is 1 if any exist.
+
+Usage:
+    python -m benchmarks.compare BASE.json NEW.json [--threshold 10]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+
+def compare(base: dict, new: dict, threshold: float) -> List[Tuple[str, str, float, float, float, bool]]:
+    rows = []
+    for name, new_stats in new["results"].items():
+        base_stats = base["results"].get(name)
+        if base_stats is None:
+            continue
+        for metric, higher_is_better in (("p50_ms", False), ("requests_per_s", True), ("ops_per_s", True)):
+            if metric not in new_stats or metric not in base_stats or not base_stats[metric]:
+                continue
+            change = (new_stats[metric] - base_stats[metric]) / base_stats[metric] * 100
+            regressed = change < -threshold if higher_is_better else change > threshold
+            rows.append((name, metric, base_stats[metric], new_stats[metric], change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("base", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args()
+
+    base = json.loads(args.base.read_text())
+    new = json.loads(args.new.read_text())
+    print(f"base: {base['environment'].get('commit')}  new: {new['environment'].get('commit')}")
+    rows = compare(base, new, args.threshold)
+    print(f"{'benchmark':<32}{'metric':<16}{'base':>12}{'new':>12}{'change':>10}")
+    for name, metric, old, current, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<32}{metric:<16}{old:>12.3f}{current:>12.3f}{change:>9.1f}%{flag}")
+    sys.exit(1 if any(row[-1] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
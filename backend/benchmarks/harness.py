@@ -0,0 +1,88 @@
+"""
+Shared helpers for the benchmark suite: timing, statistics and JSON results.
+
+Result files carry the git commit, Python version and machine so runs on
+different commits can be compared with ``python -m benchmarks.compare``.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """Latency statistics in milliseconds for a list of durations in seconds."""
+    ordered = sorted(timings)
+
+    def pct(p: float) -> float:
+        index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return ordered[index] * 1000
+
+    return {
+        "samples": len(ordered),
+        "min_ms": ordered[0] * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int = 100, warmup: int = 3) -> Dict[str, float]:
+    """Call ``fn`` ``repeat`` times after ``warmup`` calls and summarize."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    stats = summarize(timings)
+    stats["ops_per_s"] = 1000 / stats["mean_ms"] if stats["mean_ms"] else 0.0
+    return stats
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, object]:
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(suite: str, results: Dict[str, object],
+                  output: Optional[Path] = None) -> Path:
+    """Write ``results`` with environment metadata and return the file path."""
+    env = environment()
+    if output is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = RESULTS_DIR / f"{suite}-{env['commit'] or 'nocommit'}-{stamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"suite": suite, "environment": env, "results": results}, indent=2))
+    return output
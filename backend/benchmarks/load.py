@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+In-process load tests driving the API through an ASGI client.
+
+Each flow (register, login, me, list) is run with a fixed number of
+concurrent clients for a fixed number of requests, without a network or a
+separate server process, so results are reproducible on one machine.
+The database is a temporary SQLite file unless ``BENCH_DATABASE_URL`` is set;
+rate limiting is disabled for the run.
+
+Usage:
+    python -m benchmarks.load [--concurrency 16] [--requests 500] [--flows me list]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.cache import Cache, MemoryBackend, set_cache
+from app.core.rate_limit import MemoryRateLimitBackend, RateLimiter, set_rate_limiter
+from app.core.security import get_password_hash
+from app.db.session import Base, get_db
+from app.main import app
+from app.models.user import User
+from benchmarks.harness import summarize, write_results
+
+PASSWORD = "password123"
+
+
+async def drive(client: httpx.AsyncClient, request: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]],
+                total: int, concurrency: int) -> Dict[str, float]:
+    """Issue ``total`` requests from ``concurrency`` concurrent workers."""
+    counter = iter(range(total))
+    timings: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for n in counter:
+            start = time.perf_counter()
+            response = await request(client, n)
+            timings.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stats = summarize(timings)
+    stats.update({
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "requests_per_s": total / elapsed,
+    })
+    return stats
+
+
+def seed(session_factory, count: int) -> None:
+    hashed = get_password_hash(PASSWORD)
+    db = session_factory()
+    db.add(User(email="admin@example.com", username="admin",
+                hashed_password=hashed, is_superuser=True))
+    db.add_all(
+        User(email=f"load{i}@example.com", username=f"load{i}", hashed_password=hashed)
+        for i in range(count)
+    )
+    db.commit()
+    db.close()
+
+
+async def run_flows(flows: List[str], total: int, concurrency: int) -> Dict[str, dict]:
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        async def token_for(username: str) -> str:
+            response = await client.post(
+                "/api/v1/auth/login", data={"username": username, "password": PASSWORD}
+            )
+            return response.json()["access_token"]
+
+        user_headers = {"Authorization": f"Bearer {await token_for('load0')}"}
+        admin_headers = {"Authorization": f"Bearer {await token_for('admin')}"}
+
+        requests = {
+            "register": lambda c, n: c.post("/api/v1/auth/register", json={
+                "email": f"reg{n}@example.com", "username": f"reg{n}", "password": PASSWORD,
+            }),
+            "login": lambda c, n: c.post("/api/v1/auth/login", data={
+                "username": f"load{n % 100}", "password": PASSWORD,
+            }),
+            "me": lambda c, n: c.get("/api/v1/users/me", headers=user_headers),
+            "list": lambda c, n: c.get("/api/v1/users/?limit=100", headers=admin_headers),
+        }
+        results = {}
+        for flow in flows:
+            # bcrypt-bound flows are far slower; keep their run short
+            flow_total = total if flow in ("me", "list") else max(concurrency, total // 20)
+            results[flow] = await drive(client, requests[flow], flow_total, concurrency)
+        return results
+
+
+def run(flows: List[str], total: int = 500, concurrency: int = 16) -> Dict[str, dict]:
+    url = os.getenv("BENCH_DATABASE_URL")
+    tmpdir = None
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{tmpdir.name}/load.db"
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    seed(session_factory, 200)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    set_cache(Cache(MemoryBackend()))
+    set_rate_limiter(RateLimiter(MemoryRateLimitBackend(), enabled=False))
+    try:
+        return asyncio.run(run_flows(flows, total, concurrency))
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        set_cache(None)
+        set_rate_limiter(None)
+        engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+FLOWS = ["register", "login", "me", "list"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--flows", nargs="*", choices=FLOWS, default=FLOWS)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = run(args.flows, args.requests, args.concurrency)
+    print(f"{'flow':<10}{'req':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for flow, r in results.items():
+        print(f"{flow:<10}{r['requests']:>6}{r['requests_per_s']:>10.1f}{r['p50_ms']:>10.2f}"
+              f"{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['errors']:>8}")
+    print(f"\nResults written to {write_results('load', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
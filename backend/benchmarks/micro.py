@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for hashing, JWT, schema serialization and CRUD functions.
+
+CRUD benchmarks run against SQLite by default; set ``BENCH_DATABASE_URL``
+to an ephemeral Postgres database to measure against the real engine.
+
+Usage:
+    python -m benchmarks.micro [--repeat 100] [--output results.json]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.cache import Cache, MemoryBackend, set_cache
+from app.core.config import settings
+from app.core.responses import ModelResponse
+from app.core.security import create_access_token, get_password_hash, verify_password
+from app.crud import user as user_crud
+from app.db.session import Base
+from app.models.user import User
+from app.schemas import user as user_schemas
+from app.schemas.user import UserCreate
+from benchmarks.bench_serialization import make_rows
+from benchmarks.harness import measure, write_results
+
+
+def bench_security(repeat: int) -> Dict[str, dict]:
+    hashed = get_password_hash("password123")
+    token = create_access_token({"sub": "1"})
+    # bcrypt is deliberately slow; keep its sample count small
+    slow_repeat = max(3, repeat // 20)
+    return {
+        "password.hash": measure(lambda: get_password_hash("password123"), slow_repeat, 1),
+        "password.verify": measure(lambda: verify_password("password123", hashed), slow_repeat, 1),
+        "jwt.encode": measure(lambda: create_access_token({"sub": "1"}), repeat),
+        "jwt.decode": measure(
+            lambda: jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]),
+            repeat,
+        ),
+    }
+
+
+def bench_serialization(repeat: int) -> Dict[str, dict]:
+    one = make_rows(1)[0]
+    page = make_rows(100)
+    return {
+        "schema.user": measure(lambda: ModelResponse(one, user_schemas.User).body, repeat),
+        "schema.user_list_100": measure(
+            lambda: ModelResponse(page, List[user_schemas.User]).body, repeat
+        ),
+    }
+
+
+def bench_crud(repeat: int) -> Dict[str, dict]:
+    url = os.getenv("BENCH_DATABASE_URL")
+    tmpdir = None
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{tmpdir.name}/bench.db"
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    set_cache(Cache(MemoryBackend(), jitter=0))
+
+    # Pre-hash once so the CRUD numbers are not dominated by bcrypt
+    hashed = get_password_hash("password123")
+    for i in range(1000):
+        db.add(User(
+            email=f"bench{i}@example.com", username=f"bench{i}", hashed_password=hashed,
+        ))
+    db.commit()
+    counter = iter(range(10**9))
+
+    def create():
+        n = next(counter)
+        user_crud.create_user(db, UserCreate(
+            email=f"new{n}@example.com", username=f"new{n}", password="password123",
+        ))
+
+    def uncached_by_id():
+        db.expunge_all()
+        set_cache(Cache(MemoryBackend(), local=None, enabled=False))
+        user_crud.get_user_by_id(db, user_id=500)
+
+    cache = Cache(MemoryBackend(), jitter=0)
+
+    def cached_by_id():
+        db.expunge_all()
+        set_cache(cache)
+        user_crud.get_user_by_id(db, user_id=500)
+
+    try:
+        return {
+            "crud.get_user_by_email": measure(
+                lambda: user_crud.get_user_by_email(db, email="bench500@example.com"), repeat
+            ),
+            "crud.get_user_by_username": measure(
+                lambda: user_crud.get_user_by_username(db, username="bench500"), repeat
+            ),
+            "crud.get_user_by_id.uncached": measure(uncached_by_id, repeat),
+            "crud.get_user_by_id.cached": measure(cached_by_id, repeat),
+            "crud.get_users_100": measure(lambda: user_crud.get_users(db, limit=100), repeat),
+            "crud.create_user": measure(create, max(3, repeat // 20), 1),
+        }
+    finally:
+        set_cache(None)
+        db.close()
+        engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+SUITES = {
+    "security": bench_security,
+    "serialization": bench_serialization,
+    "crud": bench_crud,
+}
+
+
+def run(repeat: int = 100, only: List[str] = None) -> Dict[str, dict]:
+    results = {}
+    for name, suite in SUITES.items():
+        if only and name not in only:
+            continue
+        results.update(suite(repeat))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--only", nargs="*", choices=list(SUITES))
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.only)
+    print(f"{'benchmark':<32}{'p50 ms':>10}{'p95 ms':>10}{'ops/s':>12}")
+    for name, stats in results.items():
+        print(f"{name:<32}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['ops_per_s']:>12.1f}")
+    print(f"\nResults written to {write_results('micro', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Shared pytest fixtures.
+
+Tests run against an in-memory SQLite database and the in-memory cache
+backend, and storage goes to an in-memory object store, so no Postgres,
+Redis, MinIO or SMTP server is needed.
+"""
+import os
+
+# Cheap bcrypt cost for tests; must be set before app.core.security is imported
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# No Postgres or MinIO to warm up or probe; test_lifespan.py and
+# test_health.py exercise those paths directly
+os.environ.setdefault("WARMUP_ENABLED", "false")
+os.environ.setdefault("HEALTH_PROBES_ENABLED", "false")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.autocomplete import HandleCache, set_handle_cache
+from app.core.cache import Cache, MemoryBackend, set_cache
+from app.core.rate_limit import MemoryRateLimitBackend, RateLimiter, set_rate_limiter
+from app.core.revocation import RevocationList, set_revocation_list
+from app.core.storage import MemoryObjectStore, set_object_store
+from app.db.session import Base, get_db
+from app.models.user import User  # noqa: F401 - registers the model
+from app.models.token import RefreshToken, TokenRevocation  # noqa: F401
+from app.models.media import Media  # noqa: F401
+from app.models.interaction import Interaction  # noqa: F401
+from app.models.upload import UploadSession  # noqa: F401
+from app.models.transcode import TranscodeJob  # noqa: F401
+
+pytest_plugins = ["app.db.query_budget"]
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(autouse=True)
+def cache():
+    """Give every test a fresh in-memory cache."""
+    cache = Cache(MemoryBackend(), jitter=0)
+    set_cache(cache)
+    yield cache
+    set_cache(None)
+
+
+@pytest.fixture(autouse=True)
+def rate_limiter():
+    """Give every test fresh rate limit buckets."""
+    limiter = RateLimiter(MemoryRateLimitBackend())
+    set_rate_limiter(limiter)
+    yield limiter
+    set_rate_limiter(None)
+
+
+@pytest.fixture(autouse=True)
+def revocations():
+    """Give every test an empty revocation list."""
+    revocations = RevocationList(capacity=1000)
+    set_revocation_list(revocations)
+    yield revocations
+    set_revocation_list(None)
+
+
+@pytest.fixture(autouse=True)
+def handles():
+    """Give every test an empty autocomplete trie."""
+    handles = HandleCache(max_handles=1000, refresh_interval=300.0, top_k=10)
+    set_handle_cache(handles)
+    yield handles
+    set_handle_cache(None)
+
+
+@pytest.fixture(autouse=True)
+def object_store():
+    """Give every test an empty in-memory object store."""
+    store = MemoryObjectStore()
+    set_object_store(store)
+    yield store
+    set_object_store(None)
+
+
+@pytest.fixture
+def client(db):
+    """A TestClient for the API with ``get_db`` bound to the SQLite session."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    app.dependency_overrides[get_db] = lambda: db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
@@ -0,0 +1,91 @@
+"""
+Gunicorn configuration for production.
+
+    gunicorn -c gunicorn_conf.py app.main:app
+
+or ``python start_server.py --prod``. Every setting can be overridden
+through the environment variable named next to it.
+
+The app is imported once in the master (``preload_app``) and workers are
+forked from it, so code and import-time data are shared copy-on-write.
+Anything holding sockets (the DB pool) is reset in each worker after the
+fork.
+"""
+import gc
+import multiprocessing
+import os
+
+
+def _int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def default_workers(cpu_count: int, workers_per_core: float = 2.0, max_workers: int = 0) -> int:
+    """``workers_per_core`` per CPU plus one, capped at ``max_workers`` if set."""
+    workers = max(2, int(workers_per_core * cpu_count) + 1)
+    return min(workers, max_workers) if max_workers > 0 else workers
+
+
+# --- Server socket ---------------------------------------------------------
+bind = os.getenv("BIND") or f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+# Pending connections queued by the kernel while all workers are busy
+backlog = _int("BACKLOG", 2048)
+
+# --- Workers ---------------------------------------------------------------
+# uvicorn's worker (which picks uvloop and httptools when they are installed)
+# with the SIGTERM pre-stop delay, see app/core/server.py
+worker_class = "app.core.server.UvicornWorker"
+workers = _int("WEB_CONCURRENCY", 0) or default_workers(
+    multiprocessing.cpu_count(),
+    float(os.getenv("WORKERS_PER_CORE", "2")),
+    _int("MAX_WORKERS", 0),
+)
+preload_app = os.getenv("PRELOAD_APP", "true").lower() in ("1", "true", "yes")
+
+# Recycle workers after this many requests (plus jitter, so they do not all
+# restart together) to bound the effect of slow memory growth
+max_requests = _int("MAX_REQUESTS", 10000)
+max_requests_jitter = _int("MAX_REQUESTS_JITTER", 1000)
+
+timeout = _int("TIMEOUT", 60)
+graceful_timeout = _int("GRACEFUL_TIMEOUT", 30)
+# Longer than a typical load balancer idle timeout (60s), so the balancer,
+# not the app, closes idle connections
+keepalive = _int("KEEPALIVE", 75)
+
+# --- Logging ---------------------------------------------------------------
+loglevel = os.getenv("LOG_LEVEL", "info")
+accesslog = os.getenv("ACCESS_LOG", "-") or None
+errorlog = os.getenv("ERROR_LOG", "-")
+
+
+# --- Hooks -----------------------------------------------------------------
+
+def on_starting(server):
+    # Stale per-process metric files from a previous run would be summed in
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith(".db"):
+                os.remove(os.path.join(directory, name))
+
+
+def pre_fork(server, worker):
+    # Move everything the preloaded app allocated into the permanent
+    # generation so the collector does not touch (and copy) those pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app.db.session import engine
+
+    # Connections opened in the master must not be shared with workers
+    engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,6 +1,33 @@
 #!/usr/bin/env python3
+"""
+Start the API server.
+
+    python start_server.py          # development: one process, auto-reload
+    python start_server.py --prod   # production: gunicorn, see gunicorn_conf.py
+"""
+import argparse
+import os
+from pathlib import Path
 
 import uvicorn
 
+BASE_DIR = Path(__file__).resolve().parent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--prod", action="store_true", help="Run under gunicorn with uvicorn workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    args = parser.parse_args()
+
+    if args.prod:
+        os.environ.setdefault("BIND", f"{args.host}:{args.port}")
+        os.chdir(BASE_DIR)
+        os.execvp("gunicorn", ["gunicorn", "-c", str(BASE_DIR / "gunicorn_conf.py"), "app.main:app"])
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, reload=True)
+
+
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Start a video transcoding worker pool.
+
+    python start_transcoder.py                  # TRANSCODE_CONCURRENCY ffmpeg processes
+    python start_transcoder.py --concurrency 4  # run on as many hosts as needed
+
+Needs ffmpeg and ffprobe on PATH (or TRANSCODE_FFMPEG / TRANSCODE_FFPROBE).
+"""
+import argparse
+import logging
+import shutil
+import signal
+import sys
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.worker.transcode import TranscodePool
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=settings.TRANSCODE_CONCURRENCY)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    for tool in (settings.TRANSCODE_FFMPEG, settings.TRANSCODE_FFPROBE):
+        if shutil.which(tool) is None:
+            sys.exit(f"{tool} not found")
+
+    pool = TranscodePool(SessionLocal, concurrency=args.concurrency)
+    # Running jobs are killed at their next progress report and requeued
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: pool.stop.set())
+    pool.start()
+    logging.info(f"Transcoding with {pool.concurrency} workers")
+    pool.stop.wait()
+    pool.join()
+
+
+if __name__ == "__main__":
+    main()
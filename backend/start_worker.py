@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Start the background maintenance worker.
+
+    python start_worker.py          # run until SIGTERM/SIGINT; safe to run on several hosts
+    python start_worker.py --once   # run every job once if leader, then exit (cron)
+"""
+import argparse
+import logging
+import signal
+
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.worker.leader import LeaderLock
+from app.worker.scheduler import Scheduler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--once", action="store_true", help="Run every job once and exit")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+
+    scheduler = Scheduler(SessionLocal, LeaderLock(engine, settings.WORKER_LEADER_LOCK_KEY))
+    if args.once:
+        if not scheduler.leader.acquire():
+            logging.info("Not the maintenance leader; nothing to do")
+            return
+        try:
+            scheduler.run_pending(force=True)
+        finally:
+            scheduler.leader.release()
+        return
+
+    # A job in progress stops after its current batch
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: scheduler.stop.set())
+    scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Tests for profile picture uploads against the in-memory object store.
+Rendering runs in a thread pool here instead of processes.
+"""
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from app.core import avatars
+from app.core.config import settings
+from app.core.images import DiskCache, ImagePipeline, set_image_pipeline
+from app.core.security import create_access_token
+from app.models.user import User
+
+
+@pytest.fixture(autouse=True)
+def pipeline(tmp_path):
+    pipeline = ImagePipeline(executor=ThreadPoolExecutor(1), disk=DiskCache(tmp_path, 1_000_000))
+    set_image_pipeline(pipeline)
+    yield pipeline
+    pipeline.close()
+    set_image_pipeline(None)
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="alice@example.com", username="alice", hashed_password="x",
+                profile_picture="https://example.com/alice.png")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def auth(user):
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+def encode(image, fmt="JPEG", **params):
+    out = io.BytesIO()
+    image.save(out, fmt, **params)
+    return out.getvalue()
+
+
+def portrait():
+    # White, with a red band where a face would be, well above the middle
+    image = Image.new("RGB", (600, 1200), (255, 255, 255))
+    image.paste((255, 0, 0), (0, 200, 600, 280))
+    return image
+
+
+def upload(client, user, data, content_type="image/jpeg"):
+    return client.put("/api/v1/users/me/avatar", content=data,
+                      headers={**auth(user), "Content-Type": content_type})
+
+
+def test_upload_stores_immutable_renditions(client, db, user, object_store):
+    exif = Image.Exif()
+    exif[0x010F] = "Camera Maker"
+    response = upload(client, user, encode(portrait(), exif=exif))
+    assert response.status_code == 200
+    body = response.json()
+    prefix = body["profile_picture"]
+    assert prefix.startswith(f"avatars/{user.id}/")
+    assert set(body["avatar"]) == {str(size) for size in settings.AVATAR_SIZES}
+    assert body["avatar"]["160"]["webp"].endswith(f"/{prefix}/160.webp")
+
+    keys = object_store.list(prefix + "/")
+    assert len(keys) == len(settings.AVATAR_SIZES) * len(settings.AVATAR_FORMATS)
+    data, content_type, cache_control = object_store.objects[f"{prefix}/320.jpeg"]
+    assert content_type == "image/jpeg" and cache_control == settings.AVATAR_CACHE_CONTROL
+    image = Image.open(io.BytesIO(data))
+    assert image.size == (320, 320) and not image.getexif()
+    # Cropped around the upper part of the portrait, so the band is at the top
+    assert image.getpixel((160, 10))[1] < 50 and image.getpixel((160, 160))[1] > 200
+    assert Image.open(io.BytesIO(object_store.get(f"{prefix}/64.webp"))).size == (64, 64)
+
+    # The same picture maps to the same keys
+    assert upload(client, user, encode(portrait(), exif=exif)).json()["profile_picture"] == prefix
+    assert len(object_store.list("avatars/")) == len(keys)
+
+
+def test_new_picture_replaces_the_old_set(client, db, user, object_store):
+    first = upload(client, user, encode(portrait())).json()["profile_picture"]
+    png = encode(Image.new("RGBA", (100, 80), (0, 0, 255, 128)), "PNG")
+    second = upload(client, user, png, "image/png").json()["profile_picture"]
+    assert second != first
+    assert object_store.list(first + "/") == []
+    # Never upscaled: a small picture is stored at its own size
+    image = Image.open(io.BytesIO(object_store.get(f"{second}/320.webp")))
+    assert image.size == (80, 80)
+
+    response = client.delete("/api/v1/users/me/avatar", headers=auth(user))
+    assert response.json()["profile_picture"] is None and response.json()["avatar"] is None
+    assert object_store.list("avatars/") == []
+
+
+def test_invalid_uploads_are_rejected(client, user, object_store, monkeypatch):
+    assert upload(client, user, b"not an image").status_code == 422
+    tiny = upload(client, user, encode(Image.new("RGB", (32, 32))))
+    assert tiny.status_code == 422 and "smaller than" in tiny.json()["detail"]
+    assert upload(client, user, b"x", "application/pdf").status_code == 415
+
+    monkeypatch.setattr(settings, "AVATAR_MAX_UPLOAD_SIZE", 100)
+    assert upload(client, user, b"x" * 101).status_code == 413
+    assert object_store.objects == {}
+
+
+def test_external_pictures_are_left_alone(user, object_store):
+    assert avatars.avatar_urls(user.profile_picture) is None
+    object_store.put("avatars/2/abc/64.webp", b"x")
+    avatars.remove_avatar(user.id, "avatars/2/abc")
+    assert object_store.list("avatars/") == ["avatars/2/abc/64.webp"]
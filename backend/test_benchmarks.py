@@ -0,0 +1,26 @@
+"""
+Smoke tests keeping the benchmark suite runnable.
+"""
+import json
+
+from benchmarks import compare, micro
+from benchmarks.harness import measure, write_results
+
+
+def test_measure_reports_latency_percentiles():
+    stats = measure(lambda: sum(range(100)), repeat=20, warmup=1)
+    assert stats["samples"] == 20
+    assert stats["min_ms"] <= stats["p50_ms"] <= stats["p95_ms"] <= stats["max_ms"]
+
+
+def test_micro_results_round_trip_and_compare(tmp_path):
+    results = micro.run(repeat=3, only=["serialization"])
+    path = write_results("micro", results, tmp_path / "micro.json")
+    data = json.loads(path.read_text())
+    assert set(data["results"]) == {"schema.user", "schema.user_list_100"}
+    assert data["environment"]["python"]
+
+    slower = json.loads(path.read_text())
+    slower["results"]["schema.user"]["p50_ms"] *= 2
+    rows = compare.compare(data, slower, threshold=10)
+    assert ("schema.user", "p50_ms") in [(r[0], r[1]) for r in rows if r[-1]]
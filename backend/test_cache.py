@@ -0,0 +1,190 @@
+"""
+Tests for the two-tier cache and its use by the user CRUD functions.
+"""
+import threading
+import time
+
+import pytest
+
+from app.core.cache import Cache, LocalLRU, MemoryBackend, get_serializer
+from app.crud import user as user_crud
+from app.schemas.user import UserCreate, UserUpdate
+
+
+def test_get_or_set_caches_loader_result(cache):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"value": 42}
+
+    assert cache.get_or_set("k", loader) == {"value": 42}
+    assert cache.get_or_set("k", loader) == {"value": 42}
+    assert len(calls) == 1
+
+
+def test_ttl_expiry():
+    cache = Cache(MemoryBackend(), local=LocalLRU(maxsize=0), jitter=0)
+    cache.set("k", "v", ttl=0.05)
+    assert cache.get("k") == "v"
+    time.sleep(0.06)
+    assert cache.get("k") is None
+
+
+def test_tag_invalidation_drops_both_tiers(cache):
+    cache.set("a", 1, tags=["t1"])
+    cache.set("b", 2, tags=["t1", "t2"])
+    cache.set("c", 3, tags=["t2"])
+    cache.invalidate_tags("t1")
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_single_flight_collapses_concurrent_misses(cache):
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return "v"
+
+    def worker():
+        barrier.wait()
+        assert cache.get_or_set("hot", loader) == "v"
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+
+
+def test_single_flight_holds_while_callers_wait(cache):
+    # Nothing is cached (None), so each waiter loads in turn; never two at once
+    running, peak = [0], [0]
+    guard = threading.Lock()
+
+    def loader():
+        with guard:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.03)
+        with guard:
+            running[0] -= 1
+        return None
+
+    threads = [threading.Thread(target=cache.get_or_set, args=("cold", loader))
+               for _ in range(6)]
+    for t in threads:
+        t.start()
+        time.sleep(0.01)  # Callers arrive while earlier ones hold or wait
+    for t in threads:
+        t.join()
+    assert peak[0] == 1
+    assert cache._inflight == {}
+
+
+def test_redis_tag_sets_expire_with_their_keys(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # Lua scripting
+    import redis
+
+    from app.core.cache import RedisBackend
+
+    monkeypatch.setattr(redis.Redis, "from_url", lambda url: fakeredis.FakeRedis())
+    backend = RedisBackend("redis://test")
+    tag = backend._tag_key("user:1")
+
+    backend.set("a", b"1", ttl=10, tags=["user:1"])
+    assert 9000 < backend.client.pttl(tag) <= 10000
+    # Extended for a longer-lived member, never shortened by a shorter one
+    backend.set("b", b"2", ttl=60, tags=["user:1"])
+    backend.set("c", b"3", ttl=1, tags=["user:1"])
+    assert backend.client.pttl(tag) > 59000
+    backend.set("d", b"4", tags=["user:1"])
+    assert backend.client.pttl(tag) == -1
+
+    assert backend.invalidate_tags("user:1") == ["a", "b", "c", "d"]
+    assert not backend.client.exists(tag, backend._key("b"))
+
+
+def test_serializers_round_trip():
+    envelope = [{"id": 1, "name": "x", "tags": ["a"]}, 0.01, 1234.5]
+    for name in ("json", "orjson", "msgpack"):
+        serializer = get_serializer(name)
+        assert serializer.loads(serializer.dumps(envelope)) == envelope
+
+
+def test_get_user_by_id_served_from_cache(db, cache, engine):
+    created = user_crud.create_user(db, UserCreate(
+        email="cached@example.com", username="cached", password="password123"
+    ))
+    user_crud.get_user_by_id(db, user_id=created.id)
+    db.expunge_all()
+
+    statements = []
+    from sqlalchemy import event
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        user = user_crud.get_user_by_id(db, user_id=created.id)
+        assert user.username == "cached"
+        assert statements == []
+        # Credentials are not cached and load lazily
+        assert user.hashed_password
+        assert len(statements) == 1
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+
+def test_get_user_by_id_queries_once_for_concurrent_misses(db, cache, engine):
+    created = user_crud.create_user(db, UserCreate(
+        email="hot@example.com", username="hot", password="password123"
+    ))
+    cache.clear()
+    from sqlalchemy import event
+    from sqlalchemy.orm import sessionmaker
+
+    queries = []
+
+    def count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            queries.append(statement)
+            time.sleep(0.05)
+
+    barrier = threading.Barrier(4)
+    usernames = []
+
+    def worker():
+        session = sessionmaker(bind=engine)()
+        barrier.wait()
+        usernames.append(user_crud.get_user_by_id(session, user_id=created.id).username)
+        session.close()
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert usernames == ["hot"] * 4
+    assert len(queries) == 1
+
+
+def test_update_user_invalidates_cache(db, cache):
+    created = user_crud.create_user(db, UserCreate(
+        email="stale@example.com", username="stale", password="password123"
+    ))
+    user = user_crud.get_user_by_id(db, user_id=created.id)
+    user_crud.update_user(db, db_user=user, user_in=UserUpdate(bio="new bio"))
+    db.expunge_all()
+    assert user_crud.get_user_by_id(db, user_id=created.id).bio == "new bio"
@@ -0,0 +1,82 @@
+"""
+Tests for the response compression middleware.
+"""
+import gzip
+
+import brotli
+import pytest
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, choose_encoding
+
+BIG = "snapwave " * 1000
+
+
+@pytest.fixture
+def compressed_client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse(BIG)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" + b"0" * 4000, media_type="image/png")
+
+    @app.get("/stream")
+    def stream():
+        def chunks():
+            for _ in range(10):
+                yield BIG[:1000]
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def test_choose_encoding_respects_q_values():
+    offered = ["zstd", "br", "gzip"]
+    assert choose_encoding("gzip, br", offered) == "br"
+    assert choose_encoding("gzip;q=1.0, br;q=0.5", offered) == "gzip"
+    assert choose_encoding("*", offered) == "zstd"
+    assert choose_encoding("identity", offered) is None
+    assert choose_encoding("br;q=0", ["br"]) is None
+
+
+@pytest.mark.parametrize("encoding,decode", [
+    ("gzip", gzip.decompress),
+    ("br", brotli.decompress),
+    ("zstd", lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)),
+])
+def test_negotiated_codecs(compressed_client, encoding, decode):
+    request = compressed_client.build_request(
+        "GET", "/big", headers={"Accept-Encoding": encoding}
+    )
+    response = compressed_client.send(request, stream=True)
+    raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) == len(raw) < len(BIG)
+    assert decode(raw).decode() == BIG
+
+
+def test_small_and_precompressed_bodies_are_skipped(compressed_client):
+    small = compressed_client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    image = compressed_client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in image.headers
+
+
+def test_streaming_responses_compressed_incrementally(compressed_client):
+    response = compressed_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == BIG[:1000] * 10
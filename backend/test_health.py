@@ -0,0 +1,119 @@
+"""
+Tests for the background dependency probes behind /ready.
+"""
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app.core import health
+from app.core.config import settings
+from app.core.health import HealthMonitor, ProbeSkipped
+from app.main import app
+
+
+def failing():
+    raise ConnectionError("connection refused")
+
+
+def skipped():
+    raise ProbeSkipped("not configured")
+
+
+def test_critical_failure_makes_worker_unavailable():
+    monitor = HealthMonitor(
+        {"database": lambda: {}, "cache": lambda: {}, "storage": failing, "smtp": skipped},
+        critical=["database", "cache"],
+    )
+    results = asyncio.run(monitor.run_once())
+    assert results["storage"]["status"] == "error"
+    assert results["storage"]["error"] == "connection refused"
+    assert results["smtp"]["status"] == "skipped"
+    assert all("latency_ms" in r for r in results.values())
+    assert monitor.snapshot()["status"] == "degraded"
+
+    monitor.probes["database"] = failing
+    asyncio.run(monitor.run_once())
+    assert monitor.failing() == ["database"]
+    assert monitor.snapshot()["status"] == "unavailable"
+
+
+def test_slow_probe_times_out():
+    monitor = HealthMonitor({"database": lambda: time.sleep(0.5)}, timeout=0.05, critical=["database"])
+    results = asyncio.run(monitor.run_once())
+    assert results["database"]["status"] == "error"
+    assert "timed out" in results["database"]["error"]
+
+
+def test_hung_probe_is_not_started_again_until_it_returns():
+    release = threading.Event()
+    calls = []
+
+    def hung():
+        calls.append(threading.current_thread().name)
+        release.wait(5)
+        return {}
+
+    monitor = HealthMonitor({"database": hung}, timeout=0.05, critical=["database"])
+    assert "timed out" in asyncio.run(monitor.run_once())["database"]["error"]
+    assert "still running" in asyncio.run(monitor.run_once())["database"]["error"]
+    # Its own thread, not one from the pool requests run in
+    assert calls == ["health-probe-database"]
+
+    release.set()
+    monitor._calls["database"][1].join(1)
+    assert asyncio.run(monitor.run_once())["database"]["status"] == "ok"
+    assert len(calls) == 2
+
+
+def test_stale_results_are_unavailable():
+    monitor = HealthMonitor({"database": lambda: {}}, interval=0.01, timeout=0.01, critical=["database"])
+    assert monitor.snapshot()["status"] == "unavailable"
+    asyncio.run(monitor.run_once())
+    assert monitor.snapshot()["status"] == "ready"
+    monitor.last_run -= 1
+    assert monitor.snapshot()["status"] == "unavailable"
+
+
+def test_database_probe_reports_exhausted_pool(monkeypatch):
+    from app.db import session
+
+    engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=1, max_overflow=0)
+    monkeypatch.setattr(session, "engine", engine)
+    assert health.probe_database() == {"pool_checked_out": 0, "pool_capacity": 1}
+    with engine.connect():
+        try:
+            health.probe_database()
+        except RuntimeError as e:
+            assert "exhausted" in str(e)
+        else:
+            raise AssertionError("exhausted pool was reported healthy")
+    engine.dispose()
+
+
+def test_ready_serves_cached_probe_results(monkeypatch):
+    calls = []
+
+    def counting():
+        calls.append(1)
+        return {}
+
+    monkeypatch.setattr(settings, "HEALTH_PROBES_ENABLED", True)
+    health.set_health_monitor(HealthMonitor(
+        {"database": counting, "cache": counting}, interval=60, critical=["database", "cache"]
+    ))
+    try:
+        with TestClient(app) as client:
+            for _ in range(5):
+                response = client.get("/ready")
+                assert response.status_code == 200
+            body = response.json()
+            assert body["status"] == "ready"
+            assert set(body["checks"]) == {"database", "cache"}
+            # One probe round at start-up, none per request
+            assert len(calls) == 2
+    finally:
+        health.set_health_monitor(None)
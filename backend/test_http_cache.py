@@ -0,0 +1,62 @@
+"""
+Tests for ETag / Last-Modified handling on the user profile endpoints.
+"""
+import time
+
+from sqlalchemy import event
+
+from test_responses import login, register
+
+
+def test_users_me_conditional_get(client, engine):
+    register(client)
+    headers = login(client)
+
+    response = client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    assert "Last-Modified" in response.headers
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get(
+            "/api/v1/users/me", headers={**headers, "If-None-Match": etag}
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    # Served from the cached principal without touching the database
+    assert statements == []
+
+
+def test_etag_changes_after_update(client):
+    register(client)
+    headers = login(client)
+    etag = client.get("/api/v1/users/me", headers=headers).headers["ETag"]
+
+    # SQLite's CURRENT_TIMESTAMP has one second resolution (Postgres' now() does not)
+    time.sleep(1.1)
+    client.put("/api/v1/users/me", headers=headers, json={"bio": "hello"})
+    response = client.get("/api/v1/users/me", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["bio"] == "hello"
+    assert response.headers["ETag"] != etag
+
+
+def test_user_detail_if_modified_since(client):
+    register(client)
+    headers = login(client)
+    me = client.get("/api/v1/users/me", headers=headers)
+    user_id = me.json()["id"]
+
+    response = client.get(
+        f"/api/v1/users/{user_id}",
+        headers={**headers, "If-Modified-Since": me.headers["Last-Modified"]},
+    )
+    assert response.status_code == 304
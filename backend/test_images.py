@@ -0,0 +1,165 @@
+"""
+Tests for signed image URLs and the derivative pipeline. Rendering runs in a
+thread pool here instead of processes.
+"""
+import asyncio
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from PIL import Image
+
+from app.core import images
+from app.core.config import settings
+from app.core.images import DiskCache, ImagePipeline, image_url, set_image_pipeline
+from app.schemas.media import Media
+
+KEY = "media/1/photo.jpg"
+
+
+@pytest.fixture(autouse=True)
+def pipeline(tmp_path):
+    pipeline = ImagePipeline(executor=ThreadPoolExecutor(2), disk=DiskCache(tmp_path, 10_000_000))
+    set_image_pipeline(pipeline)
+    yield pipeline
+    pipeline.close()
+    set_image_pipeline(None)
+
+
+@pytest.fixture
+def photo(object_store):
+    out = io.BytesIO()
+    Image.new("RGB", (2000, 1000), (200, 40, 40)).save(out, "JPEG")
+    object_store.put(KEY, out.getvalue(), "image/jpeg")
+    return out.getvalue()
+
+
+def open_image(data):
+    return Image.open(io.BytesIO(data))
+
+
+def test_signed_urls_serve_whitelisted_variants(client, photo, object_store):
+    url = image_url(KEY, "320x320")
+    assert url.startswith(f"/api/v1/images/{KEY}?")
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "image/webp"
+    assert response.headers["Cache-Control"].endswith(", immutable")
+    image = open_image(response.content)
+    assert image.format == "WEBP" and image.size == (320, 320)
+
+    response = client.get(image_url(KEY, "640x0", "jpeg", 85))
+    image = open_image(response.content)
+    assert image.format == "JPEG" and image.size == (640, 320)
+    assert object_store.get("derivatives/media/1/photo.jpg/640x0-q85.jpeg") == response.content
+
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_tampered_expired_and_unlisted_urls_are_rejected(client, photo):
+    url = image_url(KEY, "320x320")
+    assert client.get(url.replace("q=75", "q=85")).status_code == 403
+    assert client.get(url.replace("photo.jpg", "other.jpg")).status_code == 403
+
+    query = parse_qs(urlsplit(url).query)
+    expired = url.replace(f"exp={query['exp'][0]}", f"exp={int(time.time()) - 1}")
+    assert client.get(expired).status_code == 403
+    assert client.get(image_url(KEY, "333x333")).status_code == 400
+
+    assert client.get(image_url("media/1/missing.jpg", "320x320")).status_code == 404
+
+
+def test_url_expiry_is_rounded_to_a_day(monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_URL_TTL_SECONDS", 3600)
+    assert images.url_expiry(86400 * 10 + 5) == 86400 * 11
+    assert image_url(KEY, "320x320") == image_url(KEY, "320x320")
+
+
+def test_concurrent_requests_render_once(photo, pipeline, object_store, monkeypatch):
+    calls = []
+    render = images.render
+
+    def counting(*args):
+        calls.append(args[1:])
+        time.sleep(0.05)
+        return render(*args)
+
+    monkeypatch.setattr(images, "render", counting)
+
+    async def fetch():
+        return await asyncio.gather(*[pipeline.get(KEY, 160, 160, "webp", 75) for _ in range(5)])
+
+    results = asyncio.run(fetch())
+    assert len(calls) == 1 and len(set(results)) == 1 and pipeline._inflight == {}
+
+    # Later requests are served from disk, then from the bucket
+    assert asyncio.run(pipeline.get(KEY, 160, 160, "webp", 75)) == results[0]
+    pipeline.disk = DiskCache(pipeline.disk.directory / "other", 10_000_000)
+    assert asyncio.run(pipeline.get(KEY, 160, 160, "webp", 75)) == results[0]
+    assert len(calls) == 1
+
+
+def test_render_handles_orientation_alpha_and_garbage():
+    out = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees
+    Image.new("RGB", (400, 200)).save(out, "JPEG", exif=exif)
+    assert open_image(images.render(out.getvalue(), 160, 0, "webp", 75)).size == (160, 320)
+
+    out = io.BytesIO()
+    Image.new("RGBA", (100, 100), (0, 0, 0, 0)).save(out, "PNG")
+    image = open_image(images.render(out.getvalue(), 640, 0, "jpeg", 75))
+    # Never upscaled; transparency flattened onto white
+    assert image.size == (100, 100) and image.getpixel((50, 50)) > (250, 250, 250)
+
+    with pytest.raises(ValueError):
+        images.render(b"not an image", 160, 160, "webp", 75)
+
+
+def test_truncated_sources_are_refused_without_rendering_again(client, photo, object_store,
+                                                              monkeypatch):
+    object_store.put(KEY, photo[:len(photo) // 2], "image/jpeg")
+    with pytest.raises(ValueError):
+        images.render(object_store.get(KEY), 160, 160, "webp", 75)
+
+    calls = []
+    render = images.render
+
+    def counting(*args):
+        calls.append(args[1:])
+        return render(*args)
+
+    monkeypatch.setattr(images, "render", counting)
+    assert client.get(image_url(KEY, "320x320")).status_code == 422
+    # Remembered for the source, so other sizes are refused as well
+    assert client.get(image_url(KEY, "320x320")).status_code == 422
+    assert client.get(image_url(KEY, "640x0")).status_code == 422
+    assert len(calls) == 1
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path, 350)
+    for name in ("a", "b", "c"):
+        cache.set(name, name.encode() * 100)
+        path = cache._path(name)
+        os.utime(path, (time.time() - 100 + ord(name), time.time() - 100 + ord(name)))
+    assert cache.get("a") is not None  # Touched: now the most recent
+
+    cache.set("d", b"d" * 100)
+    # Trimmed to 90% of the budget: only the oldest file goes
+    assert cache.get("b") is None
+    assert [cache.get(name) for name in "acd"] == [b"a" * 100, b"c" * 100, b"d" * 100]
+
+
+def test_media_carries_signed_preset_urls():
+    media = Media(id=1, user_id=1, media_type="image", file_path=KEY, created_at=time.time())
+    assert set(media.images) == set(settings.IMAGE_PRESETS)
+    assert media.images["grid"] == image_url(KEY, settings.IMAGE_PRESETS["grid"])
+
+    video = Media(id=2, user_id=1, media_type="video", file_path="media/1/clip.mp4",
+                  created_at=time.time())
+    assert video.images is None
@@ -0,0 +1,96 @@
+"""
+Tests for the bulk user import CLI.
+"""
+import io
+import json
+
+from app.cli import import_users
+from app.cli.import_users import UserImporter, read_records
+from app.core.security import get_password_hash, verify_password
+from app.crud import user as user_crud
+from app.models.user import User
+
+CSV = """email,username,password,hashed_password,full_name,email_verified
+Ann@Example.com,ann,password123,,Ann Lee,true
+bob@example.com,bob,,{bob_hash},,false
+ANN@example.com,ann2,password123,,,
+carol@example.com,Ann,password123,,,
+dave@example.com,da,password123,,,
+erin@example.com,erin,short,,,
+frank@example.com,frank,,not-a-hash,,
+"""
+
+
+def run_import(db, text, fmt="csv", **kwargs):
+    rejects = io.StringIO()
+    stats = UserImporter(db, rejects, **kwargs).run(read_records(io.StringIO(text), fmt))
+    return stats, [json.loads(line) for line in rejects.getvalue().splitlines()]
+
+
+def test_csv_import_validates_and_rejects(db):
+    bob_hash = get_password_hash("bobs-password")
+    stats, rejects = run_import(db, CSV.format(bob_hash=bob_hash), workers=0, batch_size=2)
+
+    assert (stats.read, stats.imported, stats.rejected) == (7, 2, 5)
+    ann = user_crud.get_user_by_username(db, "ann")
+    assert ann.email == "ann@example.com" and ann.full_name == "Ann Lee"
+    assert ann.email_verified and ann.is_active and not ann.is_superuser
+    assert verify_password("password123", ann.hashed_password)
+    assert user_crud.get_user_by_email(db, "bob@example.com").hashed_password == bob_hash
+
+    errors = {r["line"]: r["error"] for r in rejects}
+    assert errors[4] == "duplicate email in input"
+    assert errors[5] == "duplicate username in input"
+    assert errors[6].startswith("username:")
+    assert errors[7].startswith("password:")
+    assert errors[8] == "hashed_password is not in a recognised scheme"
+    # Plain passwords never reach the reject file
+    assert all("password" not in r["record"] for r in rejects)
+
+
+def test_ndjson_import_skips_existing_accounts(db):
+    db.add(User(email="taken@example.com", username="taken", hashed_password="x"))
+    db.commit()
+    lines = [
+        {"email": "TAKEN@example.com", "username": "fresh1", "password": "password123"},
+        {"email": "fresh@example.com", "username": "Taken", "password": "password123"},
+        {"email": "new@example.com", "username": "newbie", "password": "password123"},
+    ]
+    text = "\n".join(json.dumps(line) for line in lines) + "\n{not json\n[1]\n"
+    stats, rejects = run_import(db, text, fmt="ndjson", workers=0)
+
+    assert (stats.imported, stats.rejected) == (1, 4)
+    errors = {r["line"]: r["error"] for r in rejects}
+    assert errors[1] == errors[2] == "email or username already registered"
+    assert errors[4].startswith("invalid JSON")
+    assert errors[5] == "record is not an object"
+    assert db.query(User).count() == 2
+
+
+def test_hashes_in_process_pool(db):
+    text = "".join(
+        json.dumps({"email": f"u{i}@example.com", "username": f"user{i}", "password": "password123"}) + "\n"
+        for i in range(6)
+    )
+    stats, rejects = run_import(db, text, fmt="ndjson", workers=2, batch_size=4)
+    assert (stats.imported, rejects) == (6, [])
+    assert stats.rows_per_second > 0
+    assert all(verify_password("password123", u.hashed_password) for u in db.query(User))
+
+
+def test_main_writes_reject_file(tmp_path, engine, monkeypatch, capsys):
+    from sqlalchemy.orm import sessionmaker
+    from app.db import session
+
+    monkeypatch.setattr(session, "SessionLocal", sessionmaker(bind=engine))
+    source = tmp_path / "users.ndjson"
+    source.write_text(
+        json.dumps({"email": "a@example.com", "username": "alice", "password": "password123"}) + "\n"
+        + json.dumps({"email": "bad", "username": "bob", "password": "password123"}) + "\n"
+    )
+    stats = import_users.main([str(source), "--workers", "0"])
+
+    assert stats["imported"] == 1 and stats["rejected"] == 1
+    rejects = (tmp_path / "users.ndjson.rejects.ndjson").read_text().splitlines()
+    assert json.loads(rejects[0])["line"] == 2
+    assert "rows/s" in capsys.readouterr().out
@@ -0,0 +1,93 @@
+"""
+Tests for start-up warm-up, readiness and shutdown draining.
+"""
+import asyncio
+import os
+import signal
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+from fastapi.testclient import TestClient
+
+from app.core import lifespan
+from app.core.config import settings
+from app.core.server import Server
+from app.main import app
+
+
+def test_ready_only_between_startup_and_shutdown():
+    with TestClient(app) as client:
+        assert client.get("/health").json() == {"status": "healthy"}
+        assert client.get("/ready").status_code == 200
+
+    # Lifespan has shut down: still alive, but no longer ready
+    client = TestClient(app)
+    assert client.get("/health").status_code == 200
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"status": "draining"}
+
+
+def test_warm_up_steps(engine, monkeypatch):
+    from app.db import session
+
+    monkeypatch.setattr(session, "engine", engine)
+    results = asyncio.run(lifespan.warm_up([
+        ("database", lambda: lifespan.warm_database(2)),
+        ("templates", lifespan.warm_templates),
+        ("password_hashing", lifespan.warm_password_hashing),
+        ("jwt", lifespan.warm_jwt),
+        ("cache", lifespan.warm_cache),
+        ("autocomplete", lifespan.warm_autocomplete),
+        ("broken", lambda: 1 / 0),
+    ]))
+    assert results["database"] == {"ok": True, "result": 2, "ms": results["database"]["ms"]}
+    assert results["templates"]["result"] == 2
+    assert results["password_hashing"]["result"] == "bcrypt"
+    assert results["jwt"]["ok"] and results["cache"]["ok"]
+    assert results["autocomplete"] == {"ok": True, "result": 0, "ms": results["autocomplete"]["ms"]}
+    assert results["broken"]["ok"] is False
+    assert "division by zero" in results["broken"]["error"]
+
+
+def test_drain_waits_for_in_flight_requests(monkeypatch):
+    monkeypatch.setattr(lifespan.state, "in_flight", 1)
+    assert asyncio.run(lifespan.drain(0.1)) is False
+    monkeypatch.setattr(lifespan.state, "in_flight", 0)
+    assert asyncio.run(lifespan.drain(0.1)) is True
+
+
+@pytest.mark.parametrize("loop", ["asyncio", "uvloop"])
+def test_sigterm_reports_not_ready_before_the_server_stops(loop, monkeypatch):
+    if loop == "uvloop":
+        pytest.importorskip("uvloop")
+    monkeypatch.setattr(settings, "SHUTDOWN_PRESTOP_SECONDS", 0.3)
+    monkeypatch.setattr(lifespan.state, "ready", True)
+    monkeypatch.setattr(lifespan.state, "draining", False)
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = Server(uvicorn.Config(app, loop=loop, lifespan="off", log_level="warning"))
+    seen = {}
+
+    def terminate():
+        while not server.started:
+            time.sleep(0.01)
+        seen["start"] = time.monotonic()
+        os.kill(os.getpid(), signal.SIGTERM)
+        time.sleep(0.1)
+        seen["ready"], seen["stopping"] = lifespan.state.ready, server.should_exit
+
+    thread = threading.Thread(target=terminate)
+    thread.start()
+    try:
+        server.run(sockets=[sock])
+    finally:
+        asyncio.set_event_loop_policy(None)
+        sock.close()
+    thread.join()
+    # Not ready straight away, but serving until the delay has passed
+    assert seen["ready"] is False and seen["stopping"] is False
+    assert time.monotonic() - seen["start"] >= 0.3
@@ -0,0 +1,198 @@
+"""
+Tests for monthly partition maintenance and the partition-pruned feed and
+profile grid queries.
+"""
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.crud import media as media_crud
+from app.db import partitions
+from app.db.profiler import profile_queries
+from app.models.media import Media
+from app.models.user import User
+from app.worker import jobs
+
+NOW = datetime.now(timezone.utc)
+
+
+def add_user(db, name):
+    user = User(email=f"{name}@example.com", username=name, hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def add_media(db, user, ages, private=()):
+    """One item per age (a timedelta before now); indexes in ``private`` are private."""
+    items = [
+        Media(user_id=user.id, file_path=f"{user.username}/{i}.jpg", media_type="image",
+              is_private=i in private, created_at=NOW - age)
+        for i, age in enumerate(ages)
+    ]
+    db.add_all(items)
+    db.commit()
+    return items
+
+
+def auth(user):
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+def read_all(fetch, limit):
+    ids, cursor, pages = [], None, 0
+    while True:
+        items, cursor = fetch(cursor=cursor, limit=limit)
+        ids += [item.id for item in items]
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+class FakePartitionDB:
+    """Answers the pg_inherits query with ``bounds`` and records other statements."""
+
+    def __init__(self, bounds, fail_on=None):
+        self.bounds = bounds
+        self.fail_on = fail_on
+        self.executed = []
+        self.commits = 0
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if "pg_inherits" in sql:
+            return type("Result", (), {"all": lambda _: list(self.bounds)})()
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError("canceling statement due to lock timeout")
+        self.executed.append(sql)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.executed = [sql for sql in self.executed if sql.startswith("SET LOCAL")]
+
+
+def bound(month):
+    return (f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') "
+            f"TO ('{partitions.add_months(month, 1):%Y-%m-%d} 00:00:00+00')")
+
+
+def test_month_arithmetic():
+    month = partitions.month_start(datetime(2026, 12, 31, 23, 59, tzinfo=timezone(timedelta(hours=-5))))
+    assert month == datetime(2027, 1, 1, tzinfo=timezone.utc)
+    assert partitions.add_months(month, -1) == datetime(2026, 12, 1, tzinfo=timezone.utc)
+    assert partitions.add_months(month, 14) == datetime(2028, 3, 1, tzinfo=timezone.utc)
+    assert partitions.partition_name("media", month) == "media_p2027_01"
+    create, attach = partitions.create_partition_sql("media", month)
+    assert create.startswith("CREATE TABLE IF NOT EXISTS media_p2027_01 (LIKE media")
+    assert attach.endswith("FOR VALUES FROM ('2027-01-01T00:00:00+00:00') TO ('2027-02-01T00:00:00+00:00')")
+
+
+def test_ensure_partitions_creates_only_missing_months():
+    now = datetime(2026, 10, 19, tzinfo=timezone.utc)
+    october = partitions.month_start(now)
+    db = FakePartitionDB([("media_p2026_10", bound(october))])
+
+    created = partitions.ensure_partitions(db, "media", now=now, ahead=2)
+
+    assert created == ["media_p2026_11", "media_p2026_12"]
+    attached = [sql for sql in db.executed if "ATTACH" in sql]
+    assert len(attached) == 2 and db.commits == 2
+    assert all(sql.startswith("SET LOCAL lock_timeout") for sql in db.executed if "ATTACH" not in sql
+               and "CREATE TABLE" not in sql)
+
+
+def test_archive_detaches_only_expired_partitions():
+    now = datetime(2026, 10, 19, tzinfo=timezone.utc)
+    months = [partitions.add_months(partitions.month_start(now), -i) for i in range(5, -1, -1)]
+    db = FakePartitionDB([(partitions.partition_name("media", m), bound(m)) for m in months])
+
+    assert partitions.archive_expired_partitions(db, "media", 0, now=now) == []
+    # Keeps the current month and the three before it
+    archived = partitions.archive_expired_partitions(db, "media", 3, now=now)
+    assert archived == ["media_p2026_05", "media_p2026_06"]
+    assert "ALTER TABLE media DETACH PARTITION media_p2026_05" in db.executed
+    assert f"ALTER TABLE media_p2026_06 SET SCHEMA {settings.PARTITION_ARCHIVE_SCHEMA}" in db.executed
+
+    # A lock timeout leaves the partition for the next run
+    db = FakePartitionDB([(partitions.partition_name("media", m), bound(m)) for m in months],
+                         fail_on="DETACH PARTITION media_p2026_05")
+    assert partitions.archive_expired_partitions(db, "media", 3, now=now) == ["media_p2026_06"]
+
+
+def test_maintain_partitions_is_a_no_op_without_postgres(db):
+    assert jobs.maintain_partitions(db) == 0
+
+
+def test_feed_pages_newest_first_across_months(db, monkeypatch):
+    monkeypatch.setattr(settings, "FEED_SCAN_MONTHS", 2)
+    alice, bob = add_user(db, "alice"), add_user(db, "bob")
+    ages = [timedelta(minutes=i) for i in range(3)] + [timedelta(days=40 + i) for i in range(4)]
+    ages += [timedelta(days=200), timedelta(days=400)]
+    items = add_media(db, alice, ages, private={1})
+    items += add_media(db, bob, [timedelta(seconds=30), timedelta(days=95)])
+    public = sorted((m for m in items if not m.is_private), key=lambda m: m.created_at, reverse=True)
+
+    ids, pages = read_all(lambda **page: media_crud.get_feed(db, **page), limit=3)
+    assert ids == [m.id for m in public]
+    assert pages == 4
+
+    # Ties on created_at are broken by id, so nothing is skipped or repeated
+    tied = add_media(db, bob, [timedelta(days=2)] * 5)
+    ids, _ = read_all(lambda **page: media_crud.get_feed(db, **page), limit=2)
+    assert len(ids) == len(set(ids)) == len(public) + len(tied)
+
+
+def test_feed_queries_are_bounded_to_one_month(db):
+    alice = add_user(db, "alice")
+    add_media(db, alice, [timedelta(seconds=i) for i in range(5)])
+
+    with profile_queries() as profile:
+        items, cursor = media_crud.get_feed(db, limit=3)
+    # A page filled from the current month is a single, month-bounded query
+    assert len(items) == 3 and cursor is not None
+    assert profile.count == 1
+    statement = profile.statements[0][0]
+    assert "media.created_at >= ?" in statement and "media.created_at < ?" in statement
+
+    with profile_queries() as profile:
+        items, cursor = media_crud.get_feed(db, cursor=cursor, limit=3)
+    assert len(items) == 2 and cursor is None
+    # The current month, the FEED_SCAN_MONTHS - 1 before it, then the rest
+    assert profile.count == settings.FEED_SCAN_MONTHS + 1
+    assert all("media.created_at >= ?" in s for s, _ in profile.statements[:-1])
+
+
+def test_profile_grid_shows_private_media_to_owner_only(client, db):
+    alice, bob = add_user(db, "alice"), add_user(db, "bob")
+    items = add_media(db, alice, [timedelta(hours=i) for i in range(4)], private={0})
+
+    own = client.get(f"/api/v1/users/{alice.id}/media", headers=auth(alice))
+    assert own.status_code == 200
+    assert [m["id"] for m in own.json()["items"]] == [m.id for m in items]
+
+    other = client.get(f"/api/v1/users/{alice.id}/media?limit=2", headers=auth(bob)).json()
+    assert [m["id"] for m in other["items"]] == [items[1].id, items[2].id]
+    rest = client.get(f"/api/v1/users/{alice.id}/media?limit=2&cursor={other['next_cursor']}",
+                      headers=auth(bob)).json()
+    assert [m["id"] for m in rest["items"]] == [items[3].id] and rest["next_cursor"] is None
+
+    assert client.get("/api/v1/users/999/media", headers=auth(bob)).status_code == 404
+
+
+def test_feed_endpoint(client, db):
+    alice = add_user(db, "alice")
+    item = add_media(db, alice, [timedelta(minutes=1)])[0]
+    page = client.get("/api/v1/media/feed", headers=auth(alice)).json()
+    assert page["next_cursor"] is None
+    assert page["items"][0]["id"] == item.id and page["items"][0]["file_path"] == "alice/0.jpg"
+
+    response = client.get("/api/v1/media/feed?cursor=garbage", headers=auth(alice))
+    assert response.status_code == 400
+    # Numeric but past datetime's range
+    response = client.get("/api/v1/media/feed?cursor=99999999999999999999-1", headers=auth(alice))
+    assert response.status_code == 400
+    response = client.get(f"/api/v1/users/{alice.id}/media?cursor=99999999999999999999-1",
+                          headers=auth(alice))
+    assert response.status_code == 400
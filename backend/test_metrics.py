@@ -0,0 +1,40 @@
+"""
+Tests for the Prometheus instrumentation.
+"""
+from prometheus_client import REGISTRY
+
+from app.core.metrics import instrument_engine
+from test_responses import login, register
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_metrics_endpoint_reports_routes_and_db_usage(client, engine):
+    instrument_engine(engine)
+    route = "/api/v1/users/me"
+    before = sample("snapwave_http_requests_total", method="GET", route=route, status="200")
+    before_db = sample("snapwave_db_queries_per_request_count", route=route)
+    before_emails = sample("snapwave_emails_total", template="email_verification", outcome="simulated")
+
+    register(client)
+    client.get("/api/v1/users/me", headers=login(client))
+
+    assert sample("snapwave_http_requests_total", method="GET", route=route, status="200") == before + 1
+    assert sample("snapwave_db_queries_per_request_count", route=route) == before_db + 1
+    assert sample("snapwave_emails_total", template="email_verification", outcome="simulated") == before_emails + 1
+    assert sample("snapwave_http_requests_in_progress", method="GET") == 0
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'snapwave_http_request_duration_seconds_bucket{le="0.005",method="GET",route="/api/v1/users/me"}' in response.text
+    assert "snapwave_db_queries_total" in response.text
+
+
+def test_unmatched_routes_share_one_label(client):
+    before = sample("snapwave_http_requests_total", method="GET", route="unmatched", status="404")
+    client.get("/no/such/path/123")
+    client.get("/no/such/path/456")
+    assert sample("snapwave_http_requests_total", method="GET", route="unmatched", status="404") == before + 2
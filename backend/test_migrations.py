@@ -0,0 +1,134 @@
+"""
+Tests for the online migration helpers and the migration dry run.
+"""
+import io
+import os
+from argparse import Namespace
+
+import sqlalchemy as sa
+from alembic import command, op
+from alembic.config import Config
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from app.core.config import settings
+from app.db import migrations
+from app.db.migrations import MigrationPlan
+
+BACKEND = os.path.dirname(os.path.abspath(__file__))
+
+
+def render_postgres(apply):
+    """SQL the helpers in ``apply`` emit for Postgres in offline mode."""
+    buffer = io.StringIO()
+    ctx = MigrationContext.configure(
+        dialect_name="postgresql",
+        opts={"as_sql": True, "output_buffer": buffer, "literal_binds": True},
+    )
+    with Operations.context(ctx):
+        apply()
+    return buffer.getvalue()
+
+
+class FakeStatsPlan(MigrationPlan):
+    """A 5M row, 2GB users table; every WHERE matches 120k rows."""
+
+    def table_stats(self, table):
+        return (5_000_000, 2 * 1024 ** 3) if table == "users" else None
+
+    def estimate_rows(self, sql):
+        return 120_000
+
+
+def test_helpers_fall_back_to_plain_operations():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, email VARCHAR)"))
+        conn.execute(text("INSERT INTO t (email) VALUES ('A@x.com'), ('b@x.com'), ('C@X.com')"))
+        with Operations.context(MigrationContext.configure(conn)):
+            assert migrations.backfill("t", "email = lower(email)", "email <> lower(email)") == 2
+            migrations.create_index_concurrently("ix_t_email", "t", ["email"], unique=True)
+            migrations.with_lock_retries(lambda: op.add_column("t", sa.Column("bio", sa.String())))
+        assert [i["name"] for i in inspect(conn).get_indexes("t")] == ["ix_t_email"]
+        assert "bio" in [c["name"] for c in inspect(conn).get_columns("t")]
+        assert conn.execute(text("SELECT email FROM t ORDER BY id")).scalars().all() == [
+            "a@x.com", "b@x.com", "c@x.com"
+        ]
+        with Operations.context(MigrationContext.configure(conn)):
+            migrations.drop_index_concurrently("ix_t_email", "t")
+        assert inspect(conn).get_indexes("t") == []
+
+
+def test_postgres_helpers_run_outside_the_migration_transaction():
+    sql = render_postgres(lambda: (
+        migrations.create_index_concurrently("ix_users_bio", "users", ["bio"]),
+        migrations.backfill("users", "bio = ''", "bio IS NULL", batch_size=500),
+        migrations.drop_index_concurrently("ix_users_bio", "users"),
+    ))
+    statements = [s.strip() for s in sql.split(";") if s.strip()]
+    assert statements == [
+        "COMMIT",
+        "SET statement_timeout = 0",
+        "SET lock_timeout = 0",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_bio ON users (bio)",
+        "RESET lock_timeout",
+        "RESET statement_timeout",
+        "BEGIN",
+        "COMMIT",
+        "UPDATE users SET bio = '' WHERE id IN (SELECT id FROM users WHERE bio IS NULL "
+        "LIMIT 500 FOR UPDATE SKIP LOCKED)",
+        "BEGIN",
+        "COMMIT",
+        "DROP INDEX CONCURRENTLY IF EXISTS ix_users_bio",
+        "BEGIN",
+    ]
+
+
+def test_plan_flags_statements_blocking_a_large_table():
+    plan = FakeStatsPlan()
+    plan.add_script("r1", render_postgres(lambda: (
+        op.create_index("ix_users_bio", "users", ["bio"]),
+        migrations.create_index_concurrently("ix_users_bio2", "users", ["bio"]),
+        migrations.backfill("users", "bio = ''", "bio IS NULL", batch_size=1000),
+    )))
+    plan.add_script("r2", render_postgres(lambda: (
+        op.add_column("users", sa.Column("bio", sa.String())),
+        op.alter_column("users", "bio", nullable=False),
+        op.execute("UPDATE users SET bio = '' WHERE bio IS NULL"),
+        op.create_index("ix_new_thing", "new_table", ["x"]),
+    )))
+    by_sql = {p.sql.split(" ON ")[0].split(" WHERE ")[0]: p for p in plan.statements}
+
+    plain = by_sql["CREATE INDEX ix_users_bio"]
+    assert (plain.lock, plain.blocks, plain.rows) == ("SHARE", "writes", 5_000_000)
+    assert plain.seconds > 30 and plain.warning
+    concurrent = by_sql["CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_bio2"]
+    assert concurrent.blocks == "schema changes" and not concurrent.warning
+    batched, unbatched = [p for p in plan.statements if p.sql.startswith("UPDATE")]
+    assert not batched.warning and batched.note.startswith("120 batches of 1000")
+
+    assert not by_sql["ALTER TABLE users ADD COLUMN bio VARCHAR"].warning
+    set_not_null = by_sql["ALTER TABLE users ALTER COLUMN bio SET NOT NULL"]
+    assert set_not_null.lock == "ACCESS EXCLUSIVE" and set_not_null.warning
+    assert unbatched.warning and "use backfill" in unbatched.note
+    # Tables created by the same run have no statistics and cost nothing
+    assert not by_sql["CREATE INDEX ix_new_thing"].warning
+
+    assert len(plan.warnings) == 3
+    report = plan.report()
+    assert report.startswith("r1:") and "3 statement(s)" in report
+
+
+def test_dry_run_executes_nothing(tmp_path, monkeypatch, capsys):
+    url = f"sqlite:///{tmp_path / 'dry_run.db'}"
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    config = Config(cmd_opts=Namespace(x=["dry_run=true"]))
+    config.set_main_option("script_location", os.path.join(BACKEND, "alembic"))
+
+    command.upgrade(config, "head")
+
+    report = capsys.readouterr().out
+    assert "c821532bc4eb:" in report and "7d3e5f1a9b2c:" in report
+    assert "CREATE INDEX ix_users_reset_token_expires_at" in report
+    assert inspect(create_engine(url)).get_table_names() == []
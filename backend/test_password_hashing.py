@@ -0,0 +1,45 @@
+"""
+Tests for configurable password hashing and transparent rehash on login.
+"""
+from app.core import security
+from app.core.security import build_crypt_context
+from app.crud import user as user_crud
+from app.schemas.user import UserCreate
+
+
+def create_user(db):
+    return user_crud.create_user(db, UserCreate(
+        email="hash@example.com", username="hasher", password="password123"
+    ))
+
+
+def test_new_hashes_use_configured_rounds(db):
+    user = create_user(db)
+    assert user.hashed_password.startswith("$2b$04$")
+
+
+def test_login_rehashes_outdated_bcrypt_cost(db, monkeypatch):
+    user = create_user(db)
+    old_hash = user.hashed_password
+    monkeypatch.setattr(security, "pwd_context", build_crypt_context(["bcrypt"], bcrypt_rounds=5))
+
+    assert user_crud.authenticate_user(db, "hasher", "wrong-password") is None
+    assert user.hashed_password == old_hash
+
+    assert user_crud.authenticate_user(db, "hasher", "password123") is not None
+    assert user.hashed_password.startswith("$2b$05$")
+    # No further rehash once the hash is current
+    current = user.hashed_password
+    user_crud.authenticate_user(db, "hasher", "password123")
+    assert user.hashed_password == current
+
+
+def test_switching_scheme_keeps_old_hashes_verifying(db, monkeypatch):
+    create_user(db)
+    monkeypatch.setattr(security, "pwd_context", build_crypt_context(
+        ["argon2"], bcrypt_rounds=4, argon2_time_cost=1, argon2_memory_cost=1024
+    ))
+    user = user_crud.authenticate_user(db, "hash@example.com", "password123")
+    assert user is not None
+    assert user.hashed_password.startswith("$argon2id$")
+    assert user_crud.authenticate_user(db, "hasher", "password123") is not None
@@ -0,0 +1,80 @@
+"""
+Tests for the sampling profiler endpoint and span hooks.
+"""
+import asyncio
+import threading
+import time
+
+from app.api.v1.admin import profile_worker
+from app.core import tracing
+from app.core.config import settings
+from app.core.sampler import StackSampler
+from app.core.security import get_password_hash
+from app.crud import user as user_crud
+from test_responses import login, register
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def test_thread_sampler_collapses_stacks():
+    worker = threading.Thread(target=busy_loop, args=(0.3,), name="busy")
+    with StackSampler(interval=0.005, mode="thread") as sampler:
+        worker.start()
+        worker.join()
+    assert sampler.sample_count > 10
+    output = sampler.collapsed()
+    line = next(l for l in output.splitlines() if "busy_loop" in l)
+    stack, count = line.rsplit(" ", 1)
+    assert stack.startswith("busy;")
+    assert int(count) > 0
+
+
+def test_signal_sampler_measures_cpu():
+    with StackSampler(interval=0.002, mode="signal") as sampler:
+        busy_loop(0.2)
+    assert sampler.mode == "signal"
+    assert "busy_loop" in sampler.collapsed()
+
+
+def test_profile_endpoint_requires_superuser(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    register(client)
+    headers = login(client)
+    response = client.get("/api/v1/admin/profile?seconds=0.1", headers=headers)
+    assert response.status_code == 403
+
+    user = user_crud.get_user_by_username(db, username="alice")
+    user.is_superuser = True
+    db.commit()
+    user_crud.invalidate_user_cache(user.id)
+
+    response = client.get("/api/v1/admin/profile?seconds=0.2&interval_ms=5", headers=headers)
+    assert response.status_code == 200
+    assert int(response.headers["X-Profile-Samples"]) > 0
+
+
+def test_profile_endpoint_on_a_main_thread_loop(monkeypatch):
+    # As under uvicorn/gunicorn: TestClient runs the app in a portal thread instead
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    response = asyncio.run(profile_worker(seconds=0.05, interval_ms=5, mode="auto", current_user=None))
+    assert response.status_code == 200
+    assert response.headers["X-Profile-Mode"] == "signal"
+
+
+def test_spans_are_noops_when_disabled():
+    seen = []
+    hook = lambda name, duration: seen.append(name)
+    tracing.add_span_hook(hook)
+    try:
+        get_password_hash("password123")
+        assert seen == []
+        tracing.set_tracing_enabled(True)
+        get_password_hash("password123")
+        assert seen == ["password.hash"]
+    finally:
+        tracing.set_tracing_enabled(False)
+        tracing.remove_span_hook(hook)
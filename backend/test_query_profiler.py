@@ -0,0 +1,56 @@
+"""
+Tests for the per-request query profiler and the query budget plugin.
+"""
+import pytest
+
+from app.crud import user as user_crud
+from app.db.profiler import profile_queries
+from app.schemas.user import UserCreate
+from test_responses import login, register
+
+
+def test_profile_reports_duplicate_statements(db):
+    for i in range(3):
+        user_crud.create_user(db, UserCreate(
+            email=f"n{i}@example.com", username=f"nplus{i}", password="password123"
+        ))
+    with profile_queries() as profile:
+        # Deliberate N+1: one lookup per username
+        for i in range(3):
+            user_crud.get_user_by_username(db, username=f"nplus{i}")
+    assert profile.count == 3
+    assert list(profile.duplicates().values()) == [3]
+    assert profile.total_time > 0
+
+
+def test_profiler_headers(client, monkeypatch):
+    from app.main import app
+    from app.db.profiler import QueryProfilerMiddleware
+
+    middleware = app.middleware_stack
+    while not isinstance(middleware, QueryProfilerMiddleware):
+        middleware = middleware.app
+    monkeypatch.setattr(middleware, "enabled", True)
+
+    response = client.get("/api/v1/users/me")
+    assert response.headers["X-DB-Query-Count"] == "0"
+    assert "X-DB-Time-Ms" in response.headers
+
+
+@pytest.mark.query_budget(2, endpoint="POST /api/v1/auth/password-reset/request")
+def test_password_reset_request_query_budget(client):
+    register(client)
+    response = client.post(
+        "/api/v1/auth/password-reset/request", json={"email": "alice@example.com"}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.query_budget(0, endpoint="GET /api/v1/users/me")
+def test_users_me_is_served_from_cache(client):
+    register(client)
+    headers = login(client)
+    # Warm the cached principal, then every request must be query free
+    client.get("/api/v1/users/1", headers=headers)
+    for _ in range(3):
+        assert client.get("/api/v1/users/me", headers=headers).status_code == 200
@@ -0,0 +1,68 @@
+"""
+Tests for rate limiting on the authentication endpoints.
+"""
+import pytest
+
+from app.core.rate_limit import MemoryRateLimitBackend, Rate, parse_limits, parse_rate
+from app.crud import user as user_crud
+
+
+def test_parse_rate():
+    assert parse_rate("5/minute") == Rate(5, 60)
+    assert parse_rate("10/30seconds") == Rate(10, 30)
+    assert parse_limits("ip:20/minute,account:5/hour") == {
+        "ip": Rate(20, 60),
+        "account": Rate(5, 3600),
+    }
+    with pytest.raises(ValueError):
+        parse_rate("5 per minute")
+
+
+def test_token_bucket_refuses_then_refills(monkeypatch):
+    backend = MemoryRateLimitBackend()
+    now = [1000.0]
+    monkeypatch.setattr("app.core.rate_limit.time.monotonic", lambda: now[0])
+    rate = Rate(2, 10)
+
+    assert backend.hit("k", rate).allowed
+    assert backend.hit("k", rate).allowed
+    decision = backend.hit("k", rate)
+    assert not decision.allowed
+    assert decision.retry_after == pytest.approx(5)
+
+    now[0] += 5
+    assert backend.hit("k", rate).allowed
+
+
+def test_login_throttled_per_account_before_password_check(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        "app.crud.user.authenticate_user",
+        lambda db, username, password: calls.append(username),
+    )
+    for _ in range(5):
+        response = client.post(
+            "/api/v1/auth/login", data={"username": "Victim", "password": "wrong-password"}
+        )
+        assert response.status_code == 401
+
+    response = client.post(
+        "/api/v1/auth/login", data={"username": "victim", "password": "wrong-password"}
+    )
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert len(calls) == 5
+
+
+def test_register_throttled_per_ip(client, db, rate_limiter):
+    for i in range(5):
+        response = client.post("/api/v1/auth/register", json={
+            "email": f"user{i}@example.com", "username": f"user{i}", "password": "password123",
+        })
+        assert response.headers["X-RateLimit-Remaining"] == str(4 - i)
+    response = client.post("/api/v1/auth/register", json={
+        "email": "user9@example.com", "username": "user9", "password": "password123",
+    })
+    assert response.status_code == 429
+    assert user_crud.get_user_by_username(db, username="user9") is None
+    assert rate_limiter.stats[("register", "ip", "rejected")] == 1
@@ -0,0 +1,55 @@
+"""
+Tests for the JSON response fast path.
+"""
+from typing import List
+
+from app.core.responses import ModelResponse
+from app.schemas import user as user_schemas
+
+
+def register(client, name="alice"):
+    return client.post("/api/v1/auth/register", json={
+        "email": f"{name}@example.com", "username": name, "password": "password123",
+    })
+
+
+def login(client, name="alice"):
+    response = client.post(
+        "/api/v1/auth/login", data={"username": name, "password": "password123"}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_register_response_shape(client):
+    response = register(client)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["user"]["username"] == "alice"
+    assert "hashed_password" not in body["user"]
+    assert body["message"].startswith("User registered successfully")
+    assert body["debug_token"]
+
+
+def test_model_response_matches_response_model(client, db):
+    register(client)
+    response = client.get("/api/v1/users/me", headers=login(client))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+
+    from app.crud import user as user_crud
+    expected = user_schemas.User.model_validate(
+        user_crud.get_user_by_username(db, username="alice")
+    ).model_dump(mode="json")
+    assert response.json() == expected
+
+
+def test_model_response_serializes_lists(db):
+    from app.crud import user as user_crud
+    from app.schemas.user import UserCreate
+
+    for i in range(3):
+        user_crud.create_user(db, UserCreate(
+            email=f"u{i}@example.com", username=f"user{i}", password="password123"
+        ))
+    response = ModelResponse(user_crud.get_users(db), List[user_schemas.User])
+    assert response.body.startswith(b'[{"email":"u0@example.com"')
@@ -0,0 +1,198 @@
+"""
+Tests for user search and the autocomplete handle trie.
+"""
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.core.autocomplete import HandleCache, PrefixTrie
+from app.core.security import create_access_token
+from app.crud import user as user_crud
+from app.db.profiler import profile_queries
+from app.models.user import User
+
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def add_users(db, specs):
+    """``specs`` is ``[(username, full_name)]``; later entries joined more recently."""
+    users = []
+    for i, (username, full_name) in enumerate(specs):
+        user = User(
+            email=f"{username}@example.com", username=username, full_name=full_name,
+            hashed_password="x", created_at=BASE_TIME + timedelta(minutes=i),
+        )
+        db.add(user)
+        users.append(user)
+    db.commit()
+    return users
+
+
+def auth(user):
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+def test_trie_matches_brute_force():
+    rng = random.Random(7)
+    handles = {
+        "".join(rng.choice("abc_") for _ in range(rng.randint(1, 8))): rng.random()
+        for _ in range(2000)
+    }
+    trie = PrefixTrie(top_k=5)
+    for handle, score in handles.items():
+        trie.insert(handle, score, handle.upper())
+    assert len(trie) == len(handles)
+
+    for prefix in ["", "a", "ab", "abc", "c_", "_b_a", "zzz"] + rng.sample(sorted(handles), 50):
+        expected = sorted(
+            (h for h in handles if h.startswith(prefix)), key=lambda h: (-handles[h], h)
+        )[:5]
+        assert trie.complete(prefix) == [(h, h.upper()) for h in expected]
+
+
+def test_trie_is_case_insensitive():
+    trie = PrefixTrie(top_k=3)
+    trie.insert("Alice", 1.0)
+    assert trie.complete("AL") == [("Alice", None)]
+
+
+def test_handle_cache_lookup_falls_back_when_not_authoritative():
+    cache = HandleCache(max_handles=3, top_k=5)
+    assert cache.lookup("a", 2) is None  # never built
+
+    cache.rebuild([(1, "anna", 3.0, "A"), (2, "andy", 2.0, "B"), (3, "bob", 1.0, "C")])
+    assert cache.lookup("an", 2) == [("anna", "A"), ("andy", "B")]
+    # Fewer matches than asked for: the database may know more
+    assert cache.lookup("an", 3) is None
+    assert cache.lookup("zz", 1) is None
+    assert cache.lookup("an", 10) is None  # above top_k
+
+
+def test_handle_cache_applies_changes_until_rebuilt():
+    cache = HandleCache(top_k=5)
+    cache.rebuild([(1, "anna", 3.0, "A"), (2, "andy", 2.0, "B"), (3, "ann", 1.0, "C")])
+
+    cache.update(4, "annie", 4.0, "D")
+    assert cache.lookup("an", 2) == [("annie", "D"), ("anna", "A")]
+    cache.update(3, "ann", 1.0, "C2")
+    assert cache.lookup("an", 2) == [("annie", "D"), ("anna", "A")]
+    # A changed handle among the matches hides the one that would replace it
+    assert cache.lookup("an", 3) is None
+    cache.remove(1)
+    assert cache.lookup("an", 1) is None
+
+    # Changes made while a rebuild was reading the rows survive it
+    started = time.monotonic()
+    cache.update(5, "anya", 5.0, "E")
+    cache.rebuild([(1, "zed", 3.0, "A"), (3, "ann", 1.0, "C")], started=started)
+    assert cache.lookup("an", 1) == [("anya", "E")]
+    assert cache.lookup("z", 1) == [("zed", "A")]
+    cache.rebuild([(3, "ann", 1.0, "C")])
+    assert cache.lookup("an", 1) == [("ann", "C")]
+
+    # Too many changes: the database answers until the next rebuild
+    for i in range(cache.max_changes + 1):
+        cache.update(100 + i, f"x{i}", 0.0, None)
+    assert cache.lookup("an", 1) is None and cache.needs_refresh()
+
+
+def test_search_matches_username_and_full_name(db):
+    add_users(db, [
+        ("alice", "Alice Smith"),
+        ("malice", None),
+        ("bob", "Bob Alison"),
+        ("carol", "Carol Jones"),
+    ])
+    assert [u.username for u in user_crud.search_users(db, "ali")] == ["alice", "bob", "malice"]
+    assert [u.username for u in user_crud.search_users(db, "JONES")] == ["carol"]
+    assert user_crud.search_users(db, "   ") == []
+
+
+def test_search_escapes_like_wildcards(db):
+    add_users(db, [("a_b", None), ("axb", None), ("100pct", "100% real")])
+    assert [u.username for u in user_crud.search_users(db, "a_")] == ["a_b"]
+    assert [u.username for u in user_crud.search_users(db, "0%")] == ["100pct"]
+
+
+def test_search_excludes_inactive_users(db):
+    alice, _ = add_users(db, [("alice", None), ("alina", None)])
+    alice.is_active = False
+    db.commit()
+    assert [u.username for u in user_crud.search_users(db, "ali")] == ["alina"]
+
+
+def test_autocomplete_uses_trie(db, handles):
+    add_users(db, [("sam", None), ("samantha", None), ("sandy", None), ("samuel", None)])
+    user_crud.refresh_handle_cache(db)
+
+    with profile_queries() as profile:
+        results = user_crud.autocomplete_users(db, "SAM", limit=3)
+    assert profile.count == 0
+    assert [r["username"] for r in results] == ["samuel", "samantha", "sam"]
+
+    # Only three handles match, so asking for more goes to the database
+    with profile_queries() as profile:
+        results = user_crud.autocomplete_users(db, "SAM", limit=5)
+    assert profile.count == 1 and len(results) == 3
+
+
+def test_autocomplete_sees_user_writes(db, handles):
+    from app.schemas.user import UserCreate, UserUpdate
+
+    add_users(db, [(f"kim{i}", None) for i in range(3)])
+    user_crud.refresh_handle_cache(db)
+    new = user_crud.create_user(db, UserCreate(
+        email="kimberly@example.com", username="kimberly", password="Secret123!"
+    ))
+    with profile_queries() as profile:
+        results = user_crud.autocomplete_users(db, "kim", limit=3)
+    assert profile.count == 0
+    assert [r["username"] for r in results] == ["kimberly", "kim2", "kim1"]
+
+    user_crud.update_user(db, new, UserUpdate(profile_picture="avatars/1/abc"))
+    assert user_crud.autocomplete_users(db, "kim", limit=1)[0]["profile_picture"] == "avatars/1/abc"
+    user_crud.update_user(db, new, UserUpdate(is_active=False))
+    assert [r["username"] for r in user_crud.autocomplete_users(db, "kim", limit=3)] == [
+        "kim2", "kim1", "kim0"
+    ]
+
+
+def test_autocomplete_falls_back_to_database(db, handles):
+    users = add_users(db, [(f"user{i:02d}", None) for i in range(20)])
+    handles.max_handles = 5
+    user_crud.refresh_handle_cache(db)
+
+    # The trie only holds user15..user19; user0x needs the database
+    results = user_crud.autocomplete_users(db, "user0", limit=3)
+    assert [r["username"] for r in results] == ["user09", "user08", "user07"]
+    assert results[0]["id"] == users[9].id
+
+
+def test_search_endpoint(client, db):
+    alice, _ = add_users(db, [("alice", "Alice Smith"), ("alina", "Alina Brown")])
+    response = client.get("/api/v1/users/search", params={"q": "smith"}, headers=auth(alice))
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": alice.id, "username": "alice", "full_name": "Alice Smith", "profile_picture": None,
+         "avatar": None}
+    ]
+    assert client.get("/api/v1/users/search", params={"q": "ali"}).status_code == 401
+    assert client.get("/api/v1/users/search", headers=auth(alice)).status_code == 422
+
+
+def test_autocomplete_endpoint_caps_limit(client, db):
+    users = add_users(db, [(f"zed{i:02d}", None) for i in range(30)])
+    response = client.get(
+        "/api/v1/users/autocomplete", params={"prefix": "ZE", "limit": 100}, headers=auth(users[0])
+    )
+    assert response.status_code == 200
+    assert [r["username"] for r in response.json()] == [f"zed{i:02d}" for i in range(29, 19, -1)]
+
+
+def test_autocomplete_endpoint_rebuilds_the_trie_after_responding(client, db, handles):
+    users = add_users(db, [("ava", None), ("avery", None)])
+    response = client.get(
+        "/api/v1/users/autocomplete", params={"prefix": "av"}, headers=auth(users[0])
+    )
+    assert [r["username"] for r in response.json()] == ["avery", "ava"]
+    assert len(handles.trie) == 2 and not handles.needs_refresh() and not handles.refreshing
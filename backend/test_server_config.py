@@ -0,0 +1,30 @@
+"""
+Tests for the production gunicorn configuration.
+"""
+import importlib
+
+import gunicorn_conf
+
+
+def test_default_workers_scale_with_cpus():
+    assert gunicorn_conf.default_workers(1) == 3
+    assert gunicorn_conf.default_workers(4) == 9
+    assert gunicorn_conf.default_workers(4, workers_per_core=1) == 5
+    assert gunicorn_conf.default_workers(16, max_workers=8) == 8
+
+
+def test_environment_overrides(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    monkeypatch.setenv("BIND", "127.0.0.1:9000")
+    monkeypatch.setenv("MAX_REQUESTS", "500")
+    monkeypatch.setenv("PRELOAD_APP", "false")
+    try:
+        conf = importlib.reload(gunicorn_conf)
+        assert conf.workers == 3
+        assert conf.bind == "127.0.0.1:9000"
+        assert conf.max_requests == 500
+        assert conf.preload_app is False
+        assert conf.worker_class == "app.core.server.UvicornWorker"
+    finally:
+        monkeypatch.undo()
+        importlib.reload(gunicorn_conf)
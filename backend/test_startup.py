@@ -0,0 +1,11 @@
+"""
+Start-up budget for the API process.
+"""
+from benchmarks.bench_startup import IMPORT_BUDGET_MS, import_once
+
+
+def test_app_import_is_lazy_and_within_budget():
+    times, loaded = import_once("app.main")
+    # Email, hashing, JWT crypto, storage and HTTP clients load on first use
+    assert loaded == []
+    assert times["app.main"][1] / 1000 < IMPORT_BUDGET_MS
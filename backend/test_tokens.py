@@ -0,0 +1,129 @@
+"""
+Tests for refresh token rotation and access token revocation.
+"""
+import importlib
+
+from app.core.revocation import BloomFilter, RevocationList, user_key
+from app.core.security import create_access_token, decode_access_token
+from app.crud import token as token_crud
+from app.crud import user as user_crud
+from app.models.token import RefreshToken
+from app.schemas.user import UserUpdate
+
+
+def register_and_login(client, name="alice"):
+    client.post("/api/v1/auth/register", json={
+        "email": f"{name}@example.com", "username": name, "password": "password123",
+    })
+    response = client.post(
+        "/api/v1/auth/login", data={"username": name, "password": "password123"}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def auth(tokens):
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"jti:{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other:{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_access_token_claims():
+    payload = decode_access_token(create_access_token({"sub": "1"}))
+    assert payload["type"] == "access"
+    assert payload["jti"]
+    assert payload["iat"] <= payload["exp"]
+
+
+def test_login_returns_refresh_token(client):
+    tokens = register_and_login(client)
+    assert tokens["refresh_token"]
+    assert tokens["expires_in"] == 15 * 60
+    assert client.get("/api/v1/users/me", headers=auth(tokens)).status_code == 200
+
+
+def test_refresh_rotates_and_detects_reuse(client):
+    tokens = register_and_login(client)
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert client.get("/api/v1/users/me", headers=auth(rotated)).status_code == 200
+
+    # Replaying the old token revokes the family, including the new token
+    replay = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert replay.status_code == 401
+    again = client.post("/api/v1/auth/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert again.status_code == 401
+
+
+def test_concurrent_refreshes_with_one_token_count_as_reuse(client, db, monkeypatch):
+    # app.crud.token is the TokenCRUD wrapper; patch the module itself
+    module = importlib.import_module("app.crud.token")
+    tokens = register_and_login(client)
+    read = module.get_refresh_token
+
+    def stale_read(db, token):
+        # Read before the other refresh commits: still looks unused
+        row = read(db, token)
+        db.expunge(row)
+        monkeypatch.setattr(module, "get_refresh_token", read)
+        assert token_crud.rotate_refresh_token(db, token) is not None
+        return row
+
+    monkeypatch.setattr(module, "get_refresh_token", stale_read)
+    assert token_crud.rotate_refresh_token(db, tokens["refresh_token"]) is None
+    # The family is revoked, including the token the other refresh was given
+    db.expire_all()
+    family = read(db, tokens["refresh_token"]).family_id
+    assert db.query(RefreshToken).filter_by(family_id=family, revoked_at=None).count() == 0
+
+
+def test_logout_revokes_access_and_refresh_token(client):
+    tokens = register_and_login(client)
+    response = client.post(
+        "/api/v1/auth/logout", json={"refresh_token": tokens["refresh_token"]}, headers=auth(tokens)
+    )
+    assert response.status_code == 200
+    assert client.get("/api/v1/users/me", headers=auth(tokens)).status_code == 401
+    refresh = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refresh.status_code == 401
+
+
+def test_deactivation_revokes_tokens_without_user_query(client, db):
+    tokens = register_and_login(client)
+    user = user_crud.get_user_by_username(db, username="alice")
+    user_crud.update_user(db, user, UserUpdate(is_active=False))
+    assert client.get("/api/v1/users/me", headers=auth(tokens)).status_code == 401
+
+
+def test_revocation_propagates_between_workers(client, db, revocations):
+    tokens = register_and_login(client)
+    user = user_crud.get_user_by_username(db, username="alice")
+    token_crud.sync_revocations(db, revocations)
+
+    # Another worker revokes the user; this worker only sees the DB row
+    other_worker = RevocationList(capacity=1000)
+    from app.core import revocation
+    revocation.set_revocation_list(other_worker)
+    token_crud.revoke_user_tokens(db, user.id)
+    revocation.set_revocation_list(revocations)
+    assert not revocations.might_contain(user_key(user.id))
+
+    token_crud.sync_revocations(db, revocations)
+    assert revocations.might_contain(user_key(user.id))
+    assert client.get("/api/v1/users/me", headers=auth(tokens)).status_code == 401
+
+    # Tokens issued after the revocation are unaffected
+    fresh = client.post(
+        "/api/v1/auth/login", data={"username": "alice", "password": "password123"}
+    ).json()
+    assert client.get("/api/v1/users/me", headers=auth(fresh)).status_code == 200
@@ -0,0 +1,296 @@
+"""
+Tests for the video transcoding queue and worker. The worker runs with a fake
+transcoder, except in the last test, which transcodes a generated clip when
+ffmpeg is installed.
+"""
+import shutil
+import subprocess
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.crud import transcode as transcode_crud
+from app.crud import upload as upload_crud
+from app.models.media import Media
+from app.models.transcode import TranscodeJob
+from app.models.user import User
+from app.schemas.upload import UploadCreate
+from app.worker import ffmpeg, jobs
+from app.worker.transcode import TranscodeWorker
+
+NOW = datetime.now(timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def every_progress_report(monkeypatch):
+    monkeypatch.setattr(settings, "TRANSCODE_PROGRESS_INTERVAL_SECONDS", 0)
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="alice@example.com", username="alice", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def sessions(engine):
+    return sessionmaker(bind=engine)
+
+
+def auth(user):
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+def add_video(db, user, object_store, size=100):
+    media = Media(user_id=user.id, file_path=f"media/{user.id}/clip-{size}.mp4", media_type="video")
+    db.add(media)
+    db.flush()
+    object_store.put(media.file_path, b"x" * size)
+    job = transcode_crud.enqueue_transcode(db, media, size=size)
+    db.commit()
+    return media, job
+
+
+def fake_transcoder(calls=None, fractions=(0.5,), before=None):
+    def transcode(source, out_dir, progress):
+        if calls is not None:
+            calls.append(source.read_bytes())
+        for fraction in fractions:
+            if before:
+                before()
+            progress(fraction)
+        (out_dir / "360p").mkdir()
+        (out_dir / "360p" / "index.m3u8").write_text("#EXTM3U\n")
+        (out_dir / "360p" / "seg_00000.ts").write_bytes(b"ts")
+        (out_dir / ffmpeg.MASTER_PLAYLIST).write_text("#EXTM3U\n")
+        (out_dir / ffmpeg.POSTER).write_bytes(b"jpg")
+        return {"duration": 2.0, "width": 320, "height": 240, "has_audio": True,
+                "master": ffmpeg.MASTER_PLAYLIST, "poster": ffmpeg.POSTER,
+                "renditions": [{"name": "360p", "height": 360, "bandwidth": 896000,
+                                "playlist": "360p/index.m3u8"}]}
+    return transcode
+
+
+def test_finalizing_a_video_queues_one_transcode(db, user, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_PART_SIZE", 100)
+    for content_type in ("video/mp4", "image/jpeg"):
+        upload = upload_crud.create_upload(
+            db, user.id, UploadCreate(content_type=content_type, length=40)
+        )
+        upload_crud.append_chunk(db, upload, b"v" * 40)
+        media = upload_crud.finalize_upload(db, upload)
+
+    job = db.query(TranscodeJob).one()
+    assert job.status == "queued" and job.priority == 40 and job.media_id != media.id
+    video = db.query(Media).filter(Media.id == job.media_id).one()
+    assert transcode_crud.enqueue_transcode(db, video).id == job.id
+    assert db.query(TranscodeJob).count() == 1
+
+
+def test_shortest_clips_run_first(db, user, object_store, sessions):
+    add_video(db, user, object_store, size=300)
+    add_video(db, user, object_store, size=100)
+    _, later = add_video(db, user, object_store, size=10)
+    later.run_after = NOW + timedelta(minutes=5)
+    db.commit()
+
+    calls = []
+    worker = TranscodeWorker(sessions, transcoder=fake_transcoder(calls))
+    while worker.run_once():
+        pass
+    assert [len(source) for source in calls] == [100, 300]
+
+
+def test_worker_stores_renditions_master_last(db, user, object_store, sessions):
+    media, job = add_video(db, user, object_store)
+    progress = []
+    worker = TranscodeWorker(sessions, transcoder=fake_transcoder(
+        before=lambda: progress.append(db.get(TranscodeJob, job.id).progress)))
+
+    assert worker.run_once() == "succeeded"
+    db.expire_all()
+    assert db.get(TranscodeJob, job.id).status == "succeeded"
+    assert db.get(TranscodeJob, job.id).progress == 1.0
+    prefix = f"media/{user.id}/{media.id}/"
+    assert list(object_store.objects)[-1] == prefix + "master.m3u8"
+    assert prefix + "360p/seg_00000.ts" in object_store.objects
+
+    media = db.get(Media, media.id)
+    assert media.thumbnail_path == prefix + "poster.jpg"
+    assert media.media_metadata["hls"] == prefix + "master.m3u8"
+    assert media.media_metadata["renditions"][0]["playlist"] == prefix + "360p/index.m3u8"
+
+
+def test_cancel_running_and_queued_jobs(client, db, user, object_store, sessions):
+    media, job = add_video(db, user, object_store)
+
+    def cancel():
+        other = sessions()
+        transcode_crud.cancel_transcode(other, other.get(TranscodeJob, job.id))
+        other.close()
+
+    worker = TranscodeWorker(sessions, transcoder=fake_transcoder(fractions=(0.1, 0.2),
+                                                                  before=cancel))
+    assert worker.run_once() == "cancelled"
+    assert list(object_store.objects) == [media.file_path]
+    db.expire_all()
+
+    url = f"/api/v1/media/{media.id}/transcode"
+    assert client.get(url, headers=auth(user)).json()["status"] == "cancelled"
+    assert client.post(url, headers=auth(user)).json()["status"] == "queued"
+    response = client.delete(url, headers=auth(user))
+    assert response.json()["status"] == "cancelled"
+    assert client.get("/api/v1/media/999/transcode", headers=auth(user)).status_code == 404
+
+
+def test_failures_retry_with_backoff(db, user, object_store, sessions, monkeypatch):
+    monkeypatch.setattr(settings, "TRANSCODE_MAX_ATTEMPTS", 2)
+    _, job = add_video(db, user, object_store)
+
+    def broken(source, out_dir, progress):
+        raise RuntimeError("ffmpeg exited with 1")
+
+    worker = TranscodeWorker(sessions, transcoder=broken)
+    assert worker.run_once() == "queued"
+    db.expire_all()
+    assert job.attempts == 1 and job.error == "ffmpeg exited with 1"
+    # Not due until the backoff has passed
+    assert worker.run_once() is None
+
+    job.run_after = NOW - timedelta(seconds=1)
+    db.commit()
+    assert worker.run_once() == "failed"
+
+    # Unreadable input is not retried
+    def no_video(source, out_dir, progress):
+        raise ValueError("No video stream")
+
+    add_video(db, user, object_store, size=50)
+    assert TranscodeWorker(sessions, transcoder=no_video).run_once() == "failed"
+
+
+def test_stalled_jobs_are_requeued(db, user, object_store, sessions):
+    _, job = add_video(db, user, object_store)
+    stalled = []
+
+    def stall():
+        if not stalled:
+            other = sessions()
+            job_row = other.get(TranscodeJob, job.id)
+            job_row.heartbeat_at = NOW - timedelta(seconds=settings.TRANSCODE_LEASE_SECONDS + 1)
+            other.commit()
+            stalled.append(jobs.requeue_stalled_transcodes(other))
+            other.close()
+
+    # The sweep requeues the job under the worker, which then stops
+    worker = TranscodeWorker(sessions, transcoder=fake_transcoder(before=stall))
+    assert worker.run_once() == "interrupted"
+    assert stalled == [1]
+    db.expire_all()
+    assert job.status == "queued" and job.error == "Worker stopped responding"
+
+    assert TranscodeWorker(sessions, transcoder=fake_transcoder()).run_once() == "succeeded"
+
+
+def test_download_and_upload_heartbeat(db, user, object_store, sessions, monkeypatch):
+    _, job = add_video(db, user, object_store)
+    swept = []
+
+    def age_heartbeat():
+        other = sessions()
+        other.get(TranscodeJob, job.id).heartbeat_at = (
+            NOW - timedelta(seconds=settings.TRANSCODE_LEASE_SECONDS + 1))
+        other.commit()
+        other.close()
+
+    def sweep():
+        other = sessions()
+        swept.append(jobs.requeue_stalled_transcodes(other))
+        other.close()
+
+    download, upload = object_store.download, object_store.upload
+
+    def slow_download(*args):
+        age_heartbeat()
+        download(*args)
+
+    def slow_upload(key, path, content_type):
+        # Every file starts with a fresh heartbeat, however long the last one took
+        sweep()
+        upload(key, path, content_type)
+        age_heartbeat()
+
+    monkeypatch.setattr(object_store, "download", slow_download)
+    monkeypatch.setattr(object_store, "upload", slow_upload)
+    worker = TranscodeWorker(sessions, transcoder=fake_transcoder(before=sweep))
+    assert worker.run_once() == "succeeded"
+    assert swept == [0] * 5
+
+
+def test_shutdown_gives_the_attempt_back(db, user, object_store, sessions):
+    _, job = add_video(db, user, object_store)
+    stop = threading.Event()
+    worker = TranscodeWorker(sessions, transcoder=fake_transcoder(before=stop.set), stop=stop)
+    assert worker.run_once() == "interrupted"
+    db.expire_all()
+    assert job.status == "queued" and job.attempts == 0
+
+
+def test_hls_command_and_progress_parsing(monkeypatch):
+    monkeypatch.setattr(settings, "TRANSCODE_RENDITIONS", [
+        {"height": 360, "video_kbps": 800, "audio_kbps": 96},
+        {"height": 1080, "video_kbps": 5000, "audio_kbps": 160},
+    ])
+    renditions = ffmpeg.select_renditions(720)
+    assert [r["height"] for r in renditions] == [360]
+    assert [r["height"] for r in ffmpeg.select_renditions(144)] == [360]
+
+    info = {"duration": 10.0, "width": 1920, "height": 1080, "has_audio": False}
+    cmd = ffmpeg.hls_command(Path("in.mp4"), Path("out"), info, ffmpeg.select_renditions(1080))
+    assert cmd[cmd.index("-var_stream_map") + 1] == "v:0,name:360p v:1,name:1080p"
+    assert "0:a:0" not in cmd
+    assert cmd[cmd.index("-filter_complex") + 1] == (
+        "[0:v]split=2[s0][s1];[s0]scale=-2:360[v0];[s1]scale=-2:1080[v1]"
+    )
+
+    seen = []
+    ffmpeg.read_progress(["frame=10\n", "out_time_us=2500000\n", "progress=continue\n",
+                          "out_time_us=N/A\n", "progress=end\n"], 10.0, seen.append)
+    assert seen == [0.25, 1.0]
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+                    reason="ffmpeg is not installed")
+def test_ffmpeg_transcodes_a_sample_clip(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TRANSCODE_RENDITIONS", [
+        {"height": 120, "video_kbps": 100, "audio_kbps": 32},
+        {"height": 240, "video_kbps": 300, "audio_kbps": 64},
+    ])
+    monkeypatch.setattr(settings, "TRANSCODE_SEGMENT_SECONDS", 1)
+    source = tmp_path / "sample.mp4"
+    subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "lavfi", "-i",
+         "testsrc=duration=2:size=320x240:rate=15", "-f", "lavfi", "-i", "sine=duration=2",
+         "-c:v", "libx264", "-c:a", "aac", "-shortest", str(source)],
+        check=True,
+    )
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    progress = []
+
+    result = ffmpeg.transcode(source, out_dir, progress.append)
+
+    assert result["has_audio"] and abs(result["duration"] - 2.0) < 0.5
+    assert [r["name"] for r in result["renditions"]] == ["120p", "240p"]
+    master = (out_dir / "master.m3u8").read_text()
+    assert "120p/index.m3u8" in master and "240p/index.m3u8" in master
+    assert list((out_dir / "240p").glob("seg_*.ts"))
+    assert (out_dir / "poster.jpg").stat().st_size > 0
+    assert progress and progress[-1] == 1.0
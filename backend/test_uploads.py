@@ -0,0 +1,220 @@
+"""
+Tests for resumable uploads against the in-memory object store.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.crud import upload as upload_crud
+from app.crud.upload import UploadConflict
+from app.models.media import Media
+from app.models.upload import UploadSession
+from app.models.user import User
+from app.schemas.upload import UploadCreate
+from app.worker import jobs
+
+DATA = bytes(range(256)) * 4 + b"tail"
+CHUNK = {"Content-Type": "application/offset+octet-stream"}
+
+
+@pytest.fixture(autouse=True)
+def small_parts(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_PART_SIZE", 100)
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="alice@example.com", username="alice", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def auth(user):
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+def new_upload(db, user, length=len(DATA)):
+    upload_in = UploadCreate(filename="clip one.mp4", content_type="video/mp4", length=length)
+    return upload_crud.create_upload(db, user.id, upload_in)
+
+
+def patch(client, user, upload_id, offset, data):
+    return client.patch(f"/api/v1/media/uploads/{upload_id}", content=data,
+                        headers={**auth(user), **CHUNK, "Upload-Offset": str(offset)})
+
+
+def test_upload_in_uneven_chunks(client, db, user, object_store):
+    response = client.post("/api/v1/media/uploads", headers=auth(user), json={
+        "filename": "clip.mp4", "content_type": "video/mp4", "length": len(DATA), "title": "Clip",
+    })
+    assert response.status_code == 201
+    assert response.headers["Upload-Offset"] == "0" and response.headers["Tus-Resumable"] == "1.0.0"
+    upload_id = response.json()["id"]
+    assert response.headers["Location"].endswith(f"/api/v1/media/uploads/{upload_id}")
+
+    offset = 0
+    for size in (30, 170, 99, 1, 450, len(DATA)):
+        response = patch(client, user, upload_id, offset, DATA[offset:offset + size])
+        assert response.status_code == 204
+        offset = int(response.headers["Upload-Offset"])
+        head = client.head(f"/api/v1/media/uploads/{upload_id}", headers=auth(user))
+        assert int(head.headers["Upload-Offset"]) == offset
+        if offset == len(DATA):
+            break
+
+    session = db.get(UploadSession, upload_id)
+    # Every part but the last is UPLOAD_PART_SIZE; the rest waits as a tail
+    assert [size for _, _, size in session.parts] == [100] * 10
+    assert session.tail_size == len(DATA) - 1000
+    assert object_store.list(f"uploads/{upload_id}/") == [session.tail_key]
+
+    response = client.post(f"/api/v1/media/uploads/{upload_id}/complete", headers=auth(user))
+    assert response.status_code == 200
+    media = response.json()
+    assert media["title"] == "Clip" and media["media_type"] == "video"
+    assert media["metadata"] == {"content_type": "video/mp4", "size": len(DATA), "filename": "clip.mp4"}
+    assert object_store.get(media["file_path"]) == DATA
+    assert object_store.list(f"uploads/{upload_id}/") == [] and object_store.uploads == {}
+
+    # Finalizing again returns the same media
+    again = client.post(f"/api/v1/media/uploads/{upload_id}/complete", headers=auth(user))
+    assert again.json()["id"] == media["id"]
+    assert db.query(Media).count() == 1
+
+
+def test_append_rejects_bad_requests(client, db, user):
+    upload = new_upload(db, user)
+    assert patch(client, user, upload.id, 0, DATA[:50]).status_code == 204
+
+    stale = patch(client, user, upload.id, 0, DATA[:50])
+    assert stale.status_code == 409 and stale.headers["Upload-Offset"] == "50"
+    too_long = patch(client, user, upload.id, 50, DATA[50:] + b"extra")
+    assert too_long.status_code == 413
+    wrong_type = client.patch(f"/api/v1/media/uploads/{upload.id}", content=b"x",
+                              headers={**auth(user), "Upload-Offset": "50"})
+    assert wrong_type.status_code == 415
+    early = client.post(f"/api/v1/media/uploads/{upload.id}/complete", headers=auth(user))
+    assert early.status_code == 409
+
+    bob = User(email="bob@example.com", username="bob", hashed_password="x")
+    db.add(bob)
+    db.commit()
+    assert client.head(f"/api/v1/media/uploads/{upload.id}", headers=auth(bob)).status_code == 404
+
+    response = client.post("/api/v1/media/uploads", headers=auth(user), json={
+        "content_type": "application/pdf", "length": 10,
+    })
+    assert response.status_code == 415
+
+
+def test_failed_part_keeps_completed_parts(db, user, object_store, monkeypatch):
+    upload = new_upload(db, user)
+    upload_crud.append_chunk(db, upload, DATA[:40])
+
+    calls = []
+    upload_part = object_store.upload_part
+
+    def flaky(*args):
+        calls.append(args[2])
+        if len(calls) == 3:
+            raise ConnectionError("storage went away")
+        return upload_part(*args)
+
+    monkeypatch.setattr(object_store, "upload_part", flaky)
+    with pytest.raises(ConnectionError):
+        upload_crud.append_chunk(db, upload, DATA[40:500])
+    monkeypatch.undo()
+
+    # As another worker would see it: the two parts stored before the failure count
+    other = sessionmaker(bind=db.get_bind())()
+    session = other.get(UploadSession, upload.id)
+    assert session.upload_offset == 200 and len(session.parts) == 2
+    upload_crud.append_chunk(other, session, DATA[200:])
+    media = upload_crud.finalize_upload(other, session)
+    assert object_store.get(media.file_path) == DATA
+    other.close()
+
+
+def test_finalize_recovers_after_completing_in_storage(db, user, object_store):
+    upload = new_upload(db, user)
+    upload_crud.append_chunk(db, upload, DATA)
+    parts = [(number, etag) for number, etag, _ in upload.parts]
+    parts.append((len(parts) + 1, object_store.upload_part(
+        upload.object_key, upload.storage_upload_id, len(parts) + 1, DATA[1000:])))
+    # A previous attempt completed the multipart upload, then died
+    object_store.complete_multipart(upload.object_key, upload.storage_upload_id, parts)
+
+    media = upload_crud.finalize_upload(db, upload)
+    assert media.file_path == upload.object_key and upload.status == "completed"
+
+
+def test_concurrent_append_conflicts(db, user):
+    upload = new_upload(db, user)
+    other = sessionmaker(bind=db.get_bind())()
+    upload_crud.append_chunk(other, other.get(UploadSession, upload.id), DATA[:10])
+    other.close()
+
+    with pytest.raises(UploadConflict):
+        upload_crud.append_chunk(db, upload, DATA[:10])
+
+
+def test_append_during_another_append_writes_nothing(db, user, object_store, monkeypatch):
+    upload = new_upload(db, user)
+    sessions = sessionmaker(bind=db.get_bind())
+    upload_part = object_store.upload_part
+    writes, rejected = [], []
+
+    def racing(key, upload_id, number, data):
+        if not writes:
+            # A second PATCH at the same offset arrives while this part is in flight
+            other = sessions()
+            try:
+                upload_crud.append_chunk(other, other.get(UploadSession, upload.id), b"B" * 150)
+            except UploadConflict:
+                rejected.append(True)
+            other.close()
+        writes.append((number, data[:1]))
+        return upload_part(key, upload_id, number, data)
+
+    monkeypatch.setattr(object_store, "upload_part", racing)
+    upload_crud.append_chunk(db, upload, DATA[:250])
+    assert rejected == [True]
+    assert writes == [(1, DATA[:1]), (2, DATA[100:101])]
+    assert upload.locked_until is None and upload.upload_offset == 250
+
+    # A lease left behind by a dead worker lapses
+    upload.locked_until = datetime.now(timezone.utc) + timedelta(seconds=30)
+    db.commit()
+    with pytest.raises(UploadConflict):
+        upload_crud.append_chunk(db, upload, DATA[250:300])
+    upload.locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.commit()
+    upload_crud.append_chunk(db, upload, DATA[250:300])
+    assert upload.upload_offset == 300
+
+
+def test_expired_uploads_are_swept(client, db, user, object_store):
+    upload = new_upload(db, user)
+    upload_crud.append_chunk(db, upload, DATA[:150])
+    kept = new_upload(db, user)
+    upload.expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.commit()
+
+    assert client.head(f"/api/v1/media/uploads/{upload.id}", headers=auth(user)).status_code == 404
+    assert jobs.delete_expired_uploads(db) == 1
+    assert db.query(UploadSession).all() == [kept]
+    assert list(object_store.uploads) == [kept.storage_upload_id]
+    assert object_store.list("uploads/") == []
+
+
+def test_delete_upload(client, db, user, object_store):
+    upload = new_upload(db, user)
+    upload_crud.append_chunk(db, upload, DATA[:10])
+    response = client.delete(f"/api/v1/media/uploads/{upload.id}", headers=auth(user))
+    assert response.status_code == 204
+    assert object_store.uploads == {} and object_store.objects == {}
+    assert db.query(UploadSession).count() == 0
@@ -0,0 +1,72 @@
+"""
+Tests for case-insensitive email and username lookups.
+"""
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.crud import user as user_crud
+from app.db.profiler import profile_queries
+from app.models.user import User
+from app.schemas.user import UserCreate
+
+
+def register(client, email="Foo@Example.com", username="FooBar"):
+    return client.post("/api/v1/auth/register", json={
+        "email": email, "username": username, "password": "password123",
+    })
+
+
+def login(client, username):
+    return client.post(
+        "/api/v1/auth/login", data={"username": username, "password": "password123"}
+    )
+
+
+def test_login_ignores_case(client):
+    assert register(client).status_code == 200
+    for name in ("foo@example.com", "FOO@EXAMPLE.COM", "foobar", "FOOBAR", " FooBar "):
+        assert login(client, name).status_code == 200, name
+    assert login(client, "foobaz").status_code == 401
+
+
+def test_registration_rejects_case_variants(client):
+    assert register(client).status_code == 200
+    response = register(client, email="FOO@example.com", username="other")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+    response = register(client, email="other@example.com", username="foobar")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already taken"
+
+
+def test_email_is_stored_lower_case_and_username_keeps_case(db):
+    user = user_crud.create_user(db, UserCreate(
+        email="Mixed.Case@Example.COM", username="MixedCase", password="password123",
+    ))
+    assert user.email == "mixed.case@example.com"
+    assert user.username == "MixedCase"
+
+
+def test_unique_indexes_reject_case_duplicates(db):
+    db.add(User(email="a@example.com", username="Alice", hashed_password="x"))
+    db.commit()
+    db.add(User(email="b@example.com", username="ALICE", hashed_password="x"))
+    with pytest.raises(IntegrityError):
+        db.commit()
+
+
+def test_lookups_use_lower_indexes(db):
+    db.add(User(email="a@example.com", username="Alice", hashed_password="x"))
+    db.commit()
+    with profile_queries() as profile:
+        assert user_crud.get_user_by_email(db, "A@Example.com").username == "Alice"
+        assert user_crud.get_user_by_username(db, "aLICE").email == "a@example.com"
+
+    cursor = db.connection().connection.cursor()
+    for (statement, _), index in zip(
+        profile.statements, ("ix_users_email_lower", "ix_users_username_lower")
+    ):
+        # Placeholder values only; the plan does not depend on them
+        cursor.execute("EXPLAIN QUERY PLAN " + statement, ("x",) + (1,) * (statement.count("?") - 1))
+        plan = [row[-1] for row in cursor.fetchall()]
+        assert any(index in step for step in plan), plan
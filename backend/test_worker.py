@@ -0,0 +1,153 @@
+"""
+Tests for the maintenance worker: batched jobs, scheduler and leader lock.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.token import RefreshToken, TokenRevocation
+from app.models.user import User
+from app.worker import jobs
+from app.worker.leader import LeaderLock
+from app.worker.scheduler import Job, Scheduler
+
+NOW = datetime.now(timezone.utc)
+
+
+def add_user(db, name, **fields):
+    user = User(email=f"{name}@example.com", username=name, hashed_password="x", **fields)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_run_in_batches_stops_between_batches(db):
+    for i in range(5):
+        add_user(db, f"user{i}", reset_token=f"t{i}")
+    select_ids = select(User.id).where(User.reset_token.isnot(None)).order_by(User.id)
+    batches = []
+
+    def apply(ids):
+        batches.append(ids)
+        db.query(User).filter(User.id.in_(ids)).update({User.reset_token: None})
+
+    assert jobs.run_in_batches(db, select_ids, apply, batch_size=2, pause=0) == 5
+    assert [len(ids) for ids in batches] == [2, 2, 1]
+
+    for user in db.query(User):
+        user.reset_token = "again"
+    db.commit()
+    stop = threading.Event()
+    batches.clear()
+    # Each batch is committed before stop is checked
+    assert jobs.run_in_batches(
+        db, select_ids, lambda ids: (apply(ids), stop.set()), stop, batch_size=2, pause=0
+    ) == 2
+    assert db.query(User).filter(User.reset_token.isnot(None)).count() == 3
+
+
+def test_clear_expired_tokens(db, monkeypatch):
+    monkeypatch.setattr(settings, "MAINTENANCE_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "MAINTENANCE_BATCH_PAUSE_SECONDS", 0)
+    for i in range(5):
+        add_user(db, f"expired{i}", reset_token=f"r{i}", reset_token_expires_at=NOW - timedelta(hours=1),
+                 verification_token=f"v{i}", verification_token_expires_at=NOW - timedelta(hours=1))
+    fresh = add_user(db, "fresh", reset_token="r", reset_token_expires_at=NOW + timedelta(hours=1),
+                     verification_token="v", verification_token_expires_at=NOW + timedelta(hours=1))
+
+    assert jobs.clear_expired_reset_tokens(db) == 5
+    assert jobs.clear_expired_verification_tokens(db) == 5
+    assert jobs.clear_expired_reset_tokens(db) == 0
+    remaining = db.query(User).filter(
+        (User.reset_token.isnot(None)) | (User.verification_token.isnot(None))
+    ).all()
+    assert remaining == [fresh]
+    assert db.query(User).filter(User.reset_token_expires_at.isnot(None)).count() == 1
+
+
+def test_delete_expired_refresh_tokens_and_revocations(db):
+    user = add_user(db, "alice")
+    for i, delta in enumerate((-2, -1, 1)):
+        db.add(RefreshToken(user_id=user.id, token_hash=f"h{i}", family_id="f",
+                            expires_at=NOW + timedelta(days=delta)))
+        db.add(TokenRevocation(kind="jti", value=f"j{i}", revoked_at=NOW - timedelta(days=3),
+                               expires_at=NOW + timedelta(days=delta)))
+    db.commit()
+
+    assert jobs.delete_expired_refresh_tokens(db) == 2
+    assert jobs.delete_expired_revocations(db) == 2
+    assert [t.token_hash for t in db.query(RefreshToken)] == ["h2"]
+    assert [r.value for r in db.query(TokenRevocation)] == ["j2"]
+
+
+def test_purge_unverified_accounts(db, monkeypatch):
+    old = NOW - timedelta(days=40)
+    stale = add_user(db, "stale", created_at=old)
+    add_user(db, "verified", created_at=old, email_verified=True)
+    add_user(db, "recent", created_at=NOW - timedelta(days=1))
+    add_user(db, "admin", created_at=old, is_superuser=True)
+    active = add_user(db, "active", created_at=old)
+    db.add(RefreshToken(user_id=active.id, token_hash="h", family_id="f",
+                        expires_at=NOW + timedelta(days=1)))
+    db.add(RefreshToken(user_id=stale.id, token_hash="old", family_id="g",
+                        expires_at=NOW - timedelta(days=1)))
+    db.commit()
+
+    # Disabled by default
+    assert jobs.purge_unverified_accounts(db) == 0
+
+    monkeypatch.setattr(settings, "UNVERIFIED_ACCOUNT_RETENTION_DAYS", 30)
+    assert jobs.purge_unverified_accounts(db) == 1
+    assert sorted(u.username for u in db.query(User)) == ["active", "admin", "recent", "verified"]
+    assert db.query(RefreshToken).filter(RefreshToken.token_hash == "old").count() == 0
+
+
+def test_scheduler_runs_due_jobs_and_isolates_failures(engine):
+    calls = []
+
+    def ok(db, stop):
+        calls.append("ok")
+        return 3
+
+    def broken(db, stop):
+        raise RuntimeError("boom")
+
+    scheduler = Scheduler(
+        sessionmaker(bind=engine), LeaderLock(engine, 1),
+        [Job("broken", broken, 60), Job("ok", ok, 60)],
+    )
+    results = scheduler.run_pending()
+    assert results["broken"]["ok"] is False and results["broken"]["error"] == "boom"
+    assert results["ok"]["rows"] == 3
+    # Not due again until their interval has passed
+    assert scheduler.run_pending() == {}
+    assert set(scheduler.run_pending(force=True)) == {"broken", "ok"}
+    assert calls == ["ok", "ok"]
+
+
+def test_scheduler_only_runs_jobs_as_leader(engine):
+    class Follower(LeaderLock):
+        def acquire(self):
+            attempts.append(1)
+            if len(attempts) == 3:
+                scheduler.stop.set()
+            return False
+
+    attempts = []
+    ran = []
+    scheduler = Scheduler(
+        sessionmaker(bind=engine), Follower(engine, 1),
+        [Job("job", lambda db, stop: ran.append(1) or 0, 60)], retry_interval=0,
+    )
+    scheduler.run_forever()
+    assert len(attempts) == 3 and ran == []
+
+
+def test_leader_lock_without_advisory_locks(engine):
+    lock = LeaderLock(engine, 1)
+    assert lock.acquire() and lock.check()
+    lock.release()
+    assert not lock.held
@@ -2,7 +2,7 @@
 
 import React, { createContext, useContext, useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
-import { authService, userService } from '@/services/api';
+import { authService, clearTokens, userService } from '@/services/api';
 
 interface User {
   id: number;
@@ -42,7 +42,7 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
           const userData = await userService.getProfile();
           setUser(userData);
         } catch (err) {
-          localStorage.removeItem('token');
+          clearTokens();
         }
       }
       setLoading(false);
@@ -58,6 +58,9 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
       setError(null);
       const response = await authService.login(email, password);
       localStorage.setItem('token', response.access_token);
+      if (response.refresh_token) {
+        localStorage.setItem('refreshToken', response.refresh_token);
+      }
       
       // Get user profile
       const userData = await userService.getProfile();
@@ -89,7 +92,9 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
 
   // Logout function
   const logout = () => {
-    localStorage.removeItem('token');
+    // Revoke the refresh token server-side; local state is cleared regardless
+    authService.logout().catch(() => {});
+    clearTokens();
     setUser(null);
     router.push('/login');
   };
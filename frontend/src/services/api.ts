@@ -19,14 +19,50 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Access tokens are short-lived (ACCESS_TOKEN_EXPIRE_MINUTES). On a 401 the
+// refresh token is exchanged for a new pair and the request retried once.
+// Refresh tokens are single-use, so concurrent 401s share one refresh.
+let refreshing: Promise<string> | null = null;
+
+export const clearTokens = () => {
+  localStorage.removeItem('token');
+  localStorage.removeItem('refreshToken');
+};
+
+const refreshAccessToken = async (): Promise<string> => {
+  const refreshToken = localStorage.getItem('refreshToken');
+  if (!refreshToken) {
+    throw new Error('No refresh token');
+  }
+  // Plain axios, so a failed refresh does not come back through the interceptor
+  const response = await axios.post(`${API_URL}/auth/refresh`, { refresh_token: refreshToken });
+  localStorage.setItem('token', response.data.access_token);
+  if (response.data.refresh_token) {
+    localStorage.setItem('refreshToken', response.data.refresh_token);
+  }
+  return response.data.access_token;
+};
+
 // Response interceptor for handling errors
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const request = error.config;
+    const isAuthCall = request?.url?.startsWith('/auth/');
     // Handle 401 Unauthorized errors (token expired)
-    if (error.response?.status === 401) {
-      localStorage.removeItem('token');
-      window.location.href = '/login';
+    if (error.response?.status === 401 && request && !request._retried && !isAuthCall) {
+      request._retried = true;
+      try {
+        refreshing = refreshing || refreshAccessToken().finally(() => {
+          refreshing = null;
+        });
+        const token = await refreshing;
+        request.headers.Authorization = `Bearer ${token}`;
+        return api(request);
+      } catch (refreshError) {
+        clearTokens();
+        window.location.href = '/login';
+      }
     }
     return Promise.reject(error);
   }
@@ -47,6 +83,20 @@ export const authService = {
     return response.data;
   },
   
+  logout: async () => {
+    // Read both tokens now: the caller clears them before the request
+    // interceptor runs, so the access token is sent explicitly
+    const token = localStorage.getItem('token');
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (refreshToken) {
+      await api.post(
+        '/auth/logout',
+        { refresh_token: refreshToken },
+        token ? { headers: { Authorization: `Bearer ${token}` } } : undefined
+      );
+    }
+  },
+
   register: async (userData: any) => {
     const response = await api.post('/auth/register', userData);
     return response.data;